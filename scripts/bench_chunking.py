@@ -0,0 +1,68 @@
+"""Micro-benchmark: batched ``chunk_with_metadata`` vs the original per-paragraph loop.
+
+Usage: python scripts/bench_chunking.py [paragraphs] [repeats]
+"""
+import sys
+import time
+
+from tinychatbot import qa_service as qs
+
+
+def legacy_chunk_with_metadata(text, path, chunk_size_tokens=700, overlap_tokens=150):
+    # Original implementation: the encoder is looked up and every chunk decoded
+    # separately, once per paragraph.
+    import tiktoken
+
+    chunks = []
+    for p_idx, page_text in enumerate(text.split("\f"), start=1):
+        paras = [p for p in page_text.split("\n\n") if p.strip()]
+        for para_idx, para in enumerate(paras, start=1):
+            try:
+                enc = tiktoken.encoding_for_model(qs.Config.LLM_MODEL)
+            except Exception:
+                enc = tiktoken.get_encoding("cl100k_base")
+            toks = enc.encode(para)
+            step = max(1, chunk_size_tokens - overlap_tokens)
+            for sc_idx, i in enumerate(range(0, len(toks), step)):
+                sc = enc.decode(toks[i : i + chunk_size_tokens])
+                meta = {"source": path, "page": p_idx, "para": para_idx}
+                chunks.append((sc, {**meta, "chunk_index": sc_idx}))
+    return chunks
+
+
+def make_transcript(paragraphs: int) -> str:
+    lines = []
+    for i in range(paragraphs):
+        speaker = "Interviewer" if i % 2 else "Guest"
+        lines.append(f"{speaker}: " + "so, um, what we did there was " * (5 + i % 40))
+        if i % 25 == 24:
+            lines.append("\f")
+    return "\n\n".join(lines)
+
+
+def bench(fn, text, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn(text, "transcript.txt")
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if qs._get_encoder(qs.Config.LLM_MODEL) is None:
+        sys.exit("tiktoken encoding unavailable; nothing to compare")
+    text = make_transcript(paragraphs)
+
+    legacy, expected = bench(legacy_chunk_with_metadata, text, repeats)
+    batched, got = bench(qs.chunk_with_metadata, text, repeats)
+    assert got == expected, "batched chunker output differs from legacy"
+    print(f"{paragraphs} paragraphs, {len(got)} chunks")
+    print(f"legacy : {legacy * 1000:8.1f} ms")
+    print(f"batched: {batched * 1000:8.1f} ms  ({legacy / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Recall/latency/memory comparison of the numpy store's quantization modes.
+
+Usage: python scripts/bench_quantization.py [vectors] [dim] [queries]
+
+Vectors are synthetic (clustered Gaussians), so absolute recall differs from real
+embeddings; the relative cost of each mode is what this measures.
+"""
+import sys
+import time
+
+import numpy as np
+
+from tinychatbot.numpy_store import NumpyVectorStore
+
+MODES = [
+    ("none", False),
+    ("float16", False),
+    ("int8", False),
+    ("int8", True),
+    ("binary", False),
+    ("binary", True),
+]
+
+
+def make_corpus(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 100), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 1536
+    n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    top_k = 10
+
+    corpus = make_corpus(n, dim)
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.integers(0, n, size=n_queries)] + 0.3 * rng.normal(
+        size=(n_queries, dim)
+    ).astype(np.float32)
+    ids = [str(i) for i in range(n)]
+
+    truth = None
+    print(f"{n} vectors x {dim} dims, {n_queries} queries, recall@{top_k}")
+    print(f"{'mode':<16}{'bytes/vec':>10}{'recall':>8}{'ms/query':>10}")
+    for quantization, rescore in MODES:
+        store = NumpyVectorStore(quantization=quantization, rescore=rescore)
+        store.upsert_many(ids, corpus)
+        start = time.perf_counter()
+        results = [{h["id"] for h in store.query(q, top_k)} for q in queries]
+        elapsed = (time.perf_counter() - start) * 1000 / n_queries
+        if truth is None:
+            truth = results
+        recall = np.mean([len(r & t) / top_k for r, t in zip(results, truth)])
+        label = quantization + ("+rescore" if rescore else "")
+        print(f"{label:<16}{store.nbytes // n:>10}{recall:>8.3f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,19 @@
 
 __all__ = [
     "app",
+    "bm25",
     "config",
+    "dedup",
     "documents",
+    "embedding_cache",
+    "extraction_cache",
+    "faiss_store",
+    "filters",
+    "ivf_store",
     "llm_client",
+    "metadata_table",
+    "numpy_store",
+    "persistence",
     "personas",
     "qa_service",
     "vector_store",
@@ -1,7 +1,8 @@
 import json
 import os
 import sys
-from typing import Any, Optional, Type
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional, Type
 
 import gradio as gr
 import requests
@@ -57,13 +58,29 @@ record_unknown_question_json = {
 tools = [{"type": "function", "function": record_unknown_question_json}]
 
 
+def _retrieval_query(message: str, history: list, turns: int = 2) -> str:
+    """Retrieval query for a chat turn: the message plus the user's last ``turns``
+    messages, so follow-ups like "and its price?" still find their topic.
+    """
+    previous = [
+        m["content"]
+        for m in history or []
+        if isinstance(m, dict)
+        and m.get("role") == "user"
+        and isinstance(m.get("content"), str)
+    ]
+    return "\n".join(previous[-turns:] + [message])
+
+
 class ContentAgent:
     """Reads a folder of documents and answers questions as a subject-matter expert on that content.
 
     Behavior:
     - Loads text from PDFs and text/markdown files under CONTENT_DIR (env) or 'content' by default.
     - Requires the content directory to exist.
-    - System prompt instructs the model to act as an SME.
+    - System prompt instructs the model to act as an SME. With PROMPT_MODE=retrieval it
+      carries only the chunks retrieved for the conversation (within
+      PROMPT_TOKEN_BUDGET) instead of an excerpt of every document.
     """
 
     def __init__(
@@ -198,8 +215,21 @@ class ContentAgent:
             )
         return results
 
-    def system_prompt(self) -> str:
-        """Build a system prompt that instructs the model to act as an SME using only the provided documents."""
+    def system_prompt(
+        self,
+        message: str | None = None,
+        history: list | None = None,
+        hits: list | None = None,
+    ) -> str:
+        """Build a system prompt that instructs the model to act as an SME using only the provided documents.
+
+        With ``Config.PROMPT_MODE == "retrieval"`` and a ``message``, the documents
+        section holds the chunks retrieved for the conversation (``hits`` from
+        ``qa_service.retrieve`` when the caller already has them), so its size stays
+        constant as the corpus grows.
+        """
+        from .config import Config
+
         prompt_lines = [
             "You are a helpful, accurate subject-matter expert. Answer user questions using ONLY the information contained in the provided documents.",
             "Do not impersonate any person. If the answer is not contained in the documents, say you don't know and offer to record the question.",
@@ -222,6 +252,12 @@ class ContentAgent:
             prompt_lines.append(persona.system_prompt)
             prompt_lines.append("")
 
+        if message is not None and Config.PROMPT_MODE == "retrieval":
+            if hits is None:
+                hits = self.retrieve(message, history or [])
+            prompt_lines.extend(self._excerpt_lines(hits))
+            return "\n".join(prompt_lines)
+
         prompt_lines.append(
             "The documents available are listed below (filename followed by an excerpt):"
         )
@@ -236,13 +272,54 @@ class ContentAgent:
 
         return "\n".join(prompt_lines)
 
-    def chat(self, message, history):
-        messages = (
-            [{"role": "system", "content": self.system_prompt()}]
+    def retrieve(self, message: str, history: list, top_k: int | None = None) -> list:
+        """Retrieve chunks for a chat turn (the message plus recent user turns).
+
+        Failures are logged and yield no hits, so the chat itself still works.
+        """
+        from .config import Config
+
+        try:
+            return qs.retrieve(
+                _retrieval_query(message, history), top_k=top_k or Config.PROMPT_TOP_K
+            )
+        except Exception as e:
+            logger.warning(f"Retrieval for '{message}' failed: {e}")
+            return []
+
+    def _excerpt_lines(self, hits: list) -> list[str]:
+        """Prompt lines with the retrieved chunks, within the token budget."""
+        from .config import Config
+
+        excerpts = qs.fit_to_budget(
+            [h.get("text", "") for h in hits], Config.PROMPT_TOKEN_BUDGET
+        )
+
+        lines = [
+            "The most relevant document excerpts for this conversation are below (filename, location, excerpt):",
+            "",
+        ]
+        for hit, excerpt in zip(hits, excerpts):
+            meta = hit.get("metadata") or {}
+            label = os.path.relpath(meta.get("source", "unknown"), self.content_dir)
+            if meta.get("page") is not None:
+                label += f", page {meta['page']}"
+            lines.append(f"--- {label} ---")
+            lines.append(excerpt.replace("\n", " "))
+            lines.append("")
+        if not excerpts:
+            lines.append("(No matching excerpts were found.)")
+        return lines
+
+    def _messages(self, message, history, hits=None) -> list:
+        return (
+            [{"role": "system", "content": self.system_prompt(message, history, hits)}]
             + history
             + [{"role": "user", "content": message}]
         )
-        # Ensure an OpenAI client is available if the selected LLM provider needs it.
+
+    def _ensure_client(self):
+        """Ensure an OpenAI client is available if the selected LLM provider needs it."""
         if self.openai is None:
             llm_provider = os.getenv("LLM_PROVIDER", "openai").lower()
             if llm_provider == "openai":
@@ -254,6 +331,11 @@ class ContentAgent:
                     raise RuntimeError("openai package is not installed")
                 # pass the api_key explicitly to avoid the library reading env in unexpected ways
                 self.openai = self._openai_class(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def chat(self, message, history, hits=None):
+        """Answer ``message``; ``hits`` are reused for the retrieval prompt if given."""
+        messages = self._messages(message, history, hits)
+        self._ensure_client()
         done = False
         while not done:
             from .config import Config
@@ -272,40 +354,141 @@ class ContentAgent:
 
         return response.choices[0].message.content
 
+    def chat_stream(self, message, history, hits=None) -> Iterator[str]:
+        """Like ``chat`` but yields content deltas as the model produces them.
+
+        Tool calls arrive as fragments spread over many chunks; they are assembled
+        per call index, executed once the model finishes with ``tool_calls``, and the
+        conversation continues streaming with the tool results.
+        """
+        from .config import Config
+
+        messages = self._messages(message, history, hits)
+        self._ensure_client()
+        while True:
+            stream = self.openai.chat.completions.create(
+                model=Config.LLM_MODEL, messages=messages, tools=tools, stream=True
+            )
+            calls: dict[int, dict] = {}
+            finish_reason = None
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    yield delta.content
+                for part in delta.tool_calls or []:
+                    call = calls.setdefault(
+                        part.index, {"id": None, "name": "", "arguments": ""}
+                    )
+                    call["id"] = part.id or call["id"]
+                    if part.function is not None:
+                        call["name"] += part.function.name or ""
+                        call["arguments"] += part.function.arguments or ""
+                finish_reason = choice.finish_reason or finish_reason
+            if finish_reason != "tool_calls" or not calls:
+                return
+            tool_calls = [
+                SimpleNamespace(
+                    id=c["id"],
+                    function=SimpleNamespace(name=c["name"], arguments=c["arguments"]),
+                )
+                for _, c in sorted(calls.items())
+            ]
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": c.id,
+                            "type": "function",
+                            "function": {
+                                "name": c.function.name,
+                                "arguments": c.function.arguments,
+                            },
+                        }
+                        for c in tool_calls
+                    ],
+                }
+            )
+            messages.extend(self.handle_tool_call(tool_calls))
+
+
+# Retrieved chunks cited under each UI answer
+CITATION_TOP_K = 5
+
+
+def _turn_hits(agent: ContentAgent, message: str, history: list) -> list:
+    """One retrieval per UI turn, large enough for both the prompt and the citations."""
+    from .config import Config
+
+    top_k = CITATION_TOP_K
+    if Config.PROMPT_MODE == "retrieval":
+        top_k = max(top_k, Config.PROMPT_TOP_K)
+    return agent.retrieve(message, history, top_k=top_k)
+
+
+def _citations(agent: ContentAgent, hits: list) -> str:
+    """Citation block appended to an answer (empty when there are no sources)."""
+    try:
+        sources = qs.format_sources(hits[:CITATION_TOP_K])
+    except Exception:
+        sources = []
+    if not sources:
+        return ""
+
+    # Format citations: show filename plus page/para when available
+    citation_lines = ["\n\nCitations:"]
+    for s in sources:
+        src = s.get("source", "unknown")
+        parts = [
+            os.path.relpath(src, agent.content_dir)
+            if agent.content_dir and src.startswith(agent.content_dir)
+            else src
+        ]
+        if "page" in s:
+            parts.append(f"page:{s['page']}")
+        if "para" in s:
+            para_end = s.get("para_end")
+            if para_end and para_end != s["para"]:
+                parts.append(f"para:{s['para']}-{para_end}")
+            else:
+                parts.append(f"para:{s['para']}")
+        citation_lines.append(" - " + ", ".join(parts))
+    return "\n" + "\n".join(citation_lines)
+
 
 def chat_with_citations(agent: ContentAgent, message: str, history: list):
     """Wrapper used by the UI: get the agent's textual reply and then augment it with
     structured source metadata from the QA service so the UI can render page/paragraph citations.
+
+    One retrieval serves both the (retrieval-mode) system prompt and the citations,
+    so a turn costs one retrieval plus the agent's completion(s).
     """
+    from .config import Config
+
+    hits = _turn_hits(agent, message, history)
     # Get plain text answer from the agent
-    answer = agent.chat(message, history)
+    answer = agent.chat(message, history, hits=hits[: Config.PROMPT_TOP_K])
+    return answer + _citations(agent, hits)
 
-    # Use the qa_service path to get structured sources for the same question
-    try:
-        req = qs.QARequest(question=message, top_k=5)
-        qa_resp = qs.qa(req)
-        sources = qa_resp.get("sources", [])
-    except Exception:
-        sources = []
 
-    if sources:
-        # Format citations: show filename plus page/para when available
-        citation_lines = ["\n\nCitations:"]
-        for s in sources:
-            src = s.get("source", "unknown")
-            parts = [
-                os.path.relpath(src, agent.content_dir)
-                if agent.content_dir and src.startswith(agent.content_dir)
-                else src
-            ]
-            if "page" in s:
-                parts.append(f"page:{s['page']}")
-            if "para" in s:
-                parts.append(f"para:{s['para']}")
-            citation_lines.append(" - " + ", ".join(parts))
-        answer = answer + "\n" + "\n".join(citation_lines)
+def chat_with_citations_stream(
+    agent: ContentAgent, message: str, history: list
+) -> Iterator[str]:
+    """Streaming ``chat_with_citations`` for Gradio: yields the reply so far after every
+    delta, then the full reply with its citations.
+    """
+    from .config import Config
 
-    return answer
+    hits = _turn_hits(agent, message, history)
+    answer = ""
+    for delta in agent.chat_stream(message, history, hits=hits[: Config.PROMPT_TOP_K]):
+        answer += delta
+        yield answer
+    yield answer + _citations(agent, hits)
 
 
 def main():
@@ -361,7 +544,8 @@ def main():
                 logger.error(
                     f"Failed to set default persona '{default_persona_id}': {e2}; proceeding without persona change"
                 )
-        return chat_with_citations(agent, msg, hist)
+        # Generator: Gradio renders the reply as tokens arrive
+        yield from chat_with_citations_stream(agent, msg, hist)
 
     # Use wrapper so UI shows page/paragraph citations when available
     # Present friendly labels in the dropdown but return the selected label; we map back to id.
@@ -380,10 +564,12 @@ def main():
             ],
         ).launch()
     else:
-        # No personas, run without dropdown
-        gr.ChatInterface(
-            fn=lambda msg, hist: chat_with_citations(agent, msg, hist)
-        ).launch()
+        # No personas, run without dropdown. A named generator function (not a
+        # lambda returning a generator) so Gradio detects it and streams the reply.
+        def respond(msg, hist):
+            yield from chat_with_citations_stream(agent, msg, hist)
+
+        gr.ChatInterface(fn=respond).launch()
 
 
 if __name__ == "__main__":
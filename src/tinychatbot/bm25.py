@@ -0,0 +1,210 @@
+"""In-process BM25 lexical index over the same chunks as the vector index.
+
+Postings are kept per term as two compact ``array('I')`` columns (document slot and
+term frequency) and scored with NumPy views over those buffers, so a query costs one
+vectorized pass over the postings of its terms. Deleted chunks are tombstoned and
+the postings are compacted once tombstones outnumber live chunks.
+"""
+import json
+import math
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .persistence import atomic_write
+
+VOCAB_FILE = "bm25.json"
+POSTINGS_FILE = "bm25_postings.npz"
+
+# Words plus dotted/dashed compounds, so "v3.2.1" and "x86-64" stay single tokens
+_TOKEN = re.compile(r"\w+(?:[.\-]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.casefold() for t in _TOKEN.findall(text)]
+
+
+class BM25Index:
+    """Okapi BM25 over string ids with incremental add/delete.
+
+    ``query`` returns ``(id, score)`` pairs; chunk metadata stays in the vector store.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def clear(self):
+        # term -> (document slots, term frequencies), parallel arrays
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._ids: List[str | None] = []
+        self._slots: Dict[str, int] = {}
+        self._doc_len = array("I")
+        self._live = bytearray()
+        self._total_len = 0
+
+    def add(self, id: str, text: str):
+        self.add_many([id], [text])
+
+    def add_many(self, ids: Sequence[str], texts: Iterable[str]):
+        """Index ``texts`` under ``ids``; an existing id is replaced."""
+        for id, text in zip(ids, texts):
+            self.delete(id)
+            slot = len(self._ids)
+            counts: Dict[str, int] = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("I"))
+                postings[0].append(slot)
+                postings[1].append(tf)
+            length = sum(counts.values())
+            self._ids.append(id)
+            self._slots[id] = slot
+            self._doc_len.append(length)
+            self._live.append(1)
+            self._total_len += length
+
+    def delete(self, id: str) -> bool:
+        """Tombstone ``id``; returns False if it was not indexed."""
+        slot = self._slots.pop(id, None)
+        if slot is None:
+            return False
+        self._ids[slot] = None
+        self._live[slot] = 0
+        self._total_len -= self._doc_len[slot]
+        dead = len(self._ids) - len(self._slots)
+        if dead > 1024 and dead > len(self._slots):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Drop tombstoned slots from all postings and renumber the live ones."""
+        self._postings, self._ids, self._doc_len = self._compacted()
+        self._slots = {id: slot for slot, id in enumerate(self._ids)}
+        self._live = bytearray(b"\x01" * len(self._ids))
+
+    def _compacted(self) -> Tuple[Dict[str, Tuple[array, array]], List[str], array]:
+        """Postings, ids and lengths of the live slots, renumbered; ``self`` is untouched."""
+        live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (slots, tfs) in self._postings.items():
+            s = np.frombuffer(slots, dtype=np.uint32)
+            keep = live[s]
+            if keep.any():
+                postings[term] = (
+                    array("I", remap[s[keep]].astype(np.uint32).tobytes()),
+                    array("I", np.frombuffer(tfs, dtype=np.uint32)[keep].tobytes()),
+                )
+        ids = [id for id in self._ids if id is not None]
+        doc_len = array(
+            "I", np.frombuffer(self._doc_len, dtype=np.uint32)[live].tobytes()
+        )
+        return postings, ids, doc_len
+
+    def query(self, text: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Return the ``top_k`` best ``(id, score)`` matches for ``text``."""
+        n = len(self._slots)
+        if not n or top_k <= 0:
+            return []
+        terms = [t for t in dict.fromkeys(tokenize(text)) if t in self._postings]
+        if not terms:
+            return []
+        avgdl = max(self._total_len / n, 1e-9)
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avgdl)
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in terms:
+            slots, tfs = self._postings[term]
+            s = np.frombuffer(slots, dtype=np.uint32)
+            tf = np.frombuffer(tfs, dtype=np.uint32).astype(np.float32)
+            # Tombstoned postings are counted until the next compaction
+            df = len(s)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            np.add.at(scores, s, idf * tf * (self.k1 + 1.0) / (tf + norm[s]))
+        scores[np.frombuffer(bytes(self._live), dtype=np.uint8) == 0] = 0.0
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[slot], float(scores[slot])) for slot in top.tolist()]
+
+    # --- persistence ---
+    def save(self, directory: str):
+        """Write the (compacted) index to ``directory``.
+
+        Tombstones are dropped from the written copy only: the index itself is not
+        modified, so it can keep serving queries while it is saved.
+        """
+        postings, ids, doc_len = self._postings, self._ids, self._doc_len
+        if len(ids) != len(self._slots):
+            postings, ids, doc_len = self._compacted()
+        terms = list(postings)
+        lengths = [len(postings[t][0]) for t in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        slots = np.empty(int(offsets[-1]), dtype=np.uint32)
+        tfs = np.empty(int(offsets[-1]), dtype=np.uint32)
+        for i, term in enumerate(terms):
+            s, tf = postings[term]
+            slots[offsets[i] : offsets[i + 1]] = np.frombuffer(s, dtype=np.uint32)
+            tfs[offsets[i] : offsets[i + 1]] = np.frombuffer(tf, dtype=np.uint32)
+        doc_len = np.frombuffer(doc_len, dtype=np.uint32)
+        atomic_write(
+            os.path.join(directory, POSTINGS_FILE),
+            lambda fh: np.savez(
+                fh, offsets=offsets, slots=slots, tfs=tfs, doc_len=doc_len
+            ),
+        )
+        vocab = {"k1": self.k1, "b": self.b, "ids": ids, "terms": terms}
+        data = json.dumps(vocab, ensure_ascii=False).encode("utf-8")
+        atomic_write(os.path.join(directory, VOCAB_FILE), lambda fh: fh.write(data))
+
+    def load(self, directory: str) -> bool:
+        """Load an index written by ``save()``; returns False if it is missing or corrupt."""
+        try:
+            with open(os.path.join(directory, VOCAB_FILE), encoding="utf-8") as f:
+                vocab = json.load(f)
+            with np.load(os.path.join(directory, POSTINGS_FILE)) as data:
+                offsets, slots, tfs = data["offsets"], data["slots"], data["tfs"]
+                doc_len = data["doc_len"]
+        except (OSError, ValueError, KeyError):
+            return False
+        terms, ids = vocab["terms"], vocab["ids"]
+        if len(offsets) != len(terms) + 1 or len(doc_len) != len(ids):
+            return False
+        self.clear()
+        for i, term in enumerate(terms):
+            start, end = int(offsets[i]), int(offsets[i + 1])
+            self._postings[term] = (
+                array("I", slots[start:end].tobytes()),
+                array("I", tfs[start:end].tobytes()),
+            )
+        self._ids = ids
+        self._slots = {id: slot for slot, id in enumerate(ids)}
+        self._doc_len = array("I", doc_len.astype(np.uint32).tobytes())
+        self._live = bytearray(b"\x01" * len(ids))
+        self._total_len = int(doc_len.sum())
+        return True
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: ``score(id) = sum(1 / (k + rank))`` over the lists containing it."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            fused[id] = fused.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -5,6 +5,13 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     """Simple configuration holder that reads from environment variables.
 
@@ -16,6 +23,26 @@ class Config:
         "VECTOR_PROVIDER", os.getenv("VECTOR_DB", "faiss")
     ).lower()
 
+    # FAISS index options (VECTOR_PROVIDER=faiss): flat | ivf | hnsw
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+    FAISS_NLIST = int(os.getenv("FAISS_NLIST", "256"))
+    FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+    FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+
+    # Pure-NumPy IVF options (VECTOR_PROVIDER=ivf). IVF_NLIST=0 picks 4 * sqrt(n);
+    # more probes = higher recall, slower queries. Exact scan below IVF_MIN_TRAIN.
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+    IVF_MIN_TRAIN = int(os.getenv("IVF_MIN_TRAIN", "20000"))
+
+    # Numpy/IVF provider storage: none (float32) | float16 | int8 | binary
+    VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+    # Keep an exact float32 copy and rerank the top_k * RESCORE_FACTOR candidates
+    VECTOR_RESCORE = _env_flag("VECTOR_RESCORE")
+    RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
     # Provider-specific keys
     OPENAI_API_BASE = os.getenv(
         "OPENAI_API_BASE",
@@ -27,13 +54,71 @@ class Config:
     CHROMA_DIR = os.getenv("CHROMA_DIR", "./chroma_db")
 
     CONTENT_DIR = os.getenv("CONTENT_DIR", "content")
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    # Parallel extraction: worker processes (0 = one per CPU, 1 = serial) and per-file timeout
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "1"))
+    EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "300"))
+    # OCR of scanned PDF pages: threads (0 = one per CPU), pages rasterized at once, DPI
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+    OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", "8"))
+    OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+    # Cache extracted document text (PDF/DOCX/OCR) on disk across restarts
+    EXTRACT_CACHE = _env_flag("EXTRACT_CACHE")
+    EXTRACT_CACHE_DIR = os.getenv(
+        "EXTRACT_CACHE_DIR", os.path.join(DATA_DIR, "extract_cache")
+    )
+    # Persist the vector index under INDEX_DIR and reload it on startup
+    PERSIST_INDEX = _env_flag("PERSIST_INDEX")
+    INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(DATA_DIR, "index"))
+    # Start building (or loading) the index in the background when the QA API starts
+    INDEX_WARMUP = _env_flag("INDEX_WARMUP")
     # Model name used for tokenizer selection (tiktoken). Keep as an env var so it's easy to change.
     LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
     # Embedding model used by the LLM client (can be overridden via env)
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    # Embedding request batching: max inputs and estimated tokens per request,
+    # number of concurrent requests, and retries per failed batch
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "100000"))
+    EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+    # Pooled HTTP connections shared by the async OpenAI client (aembed/achat)
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+    # Chunks embedded and upserted per step while (re)building the index
+    INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "1024"))
+    # On-disk embedding cache keyed by (EMBEDDING_MODEL, sha256(text)), LRU-evicted
+    EMBED_CACHE = _env_flag("EMBED_CACHE")
+    EMBED_CACHE_PATH = os.getenv(
+        "EMBED_CACHE_PATH", os.path.join(DATA_DIR, "embedding_cache.sqlite3")
+    )
+    EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "500000"))
     # Chunking controls (token counts, defaults align with .env.example)
     CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP", "200"))
+    # "paragraph": at least one chunk per paragraph; "packed": merge consecutive
+    # paragraphs of a page up to CHUNK_SIZE (fewer, fuller chunks for transcripts)
+    CHUNK_MODE = os.getenv("CHUNK_MODE", "paragraph").lower()
+    # Collapse duplicate chunks onto one vector at index time:
+    # "off", "exact" (normalized text hash) or "near" (exact + MinHash/LSH)
+    DEDUP = os.getenv("DEDUP", "off").lower()
+    # Estimated Jaccard similarity of word shingles above which chunks are merged
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+    DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+    # BM25 lexical index built alongside the vector index (enables hybrid/lexical)
+    LEXICAL_INDEX = _env_flag("LEXICAL_INDEX")
+    BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+    BM25_B = float(os.getenv("BM25_B", "0.75"))
+    # Default /qa retrieval mode: vector | hybrid | lexical (overridable per request)
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+    # Candidates taken from each ranking before reciprocal rank fusion, and its k
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    # ContentAgent system prompt: "full" (excerpt of every document) or "retrieval"
+    # (top PROMPT_TOP_K chunks for the conversation, capped at PROMPT_TOKEN_BUDGET)
+    PROMPT_MODE = os.getenv("PROMPT_MODE", "full").lower()
+    PROMPT_TOP_K = int(os.getenv("PROMPT_TOP_K", "8"))
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
 
     PERSONAS_DIR = os.getenv("PERSONAS_DIR", "src/tinychatbot/personas")
     DEFAULT_PERSONA_ID = os.getenv("DEFAULT_PERSONA_ID", "default")
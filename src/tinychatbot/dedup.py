@@ -0,0 +1,266 @@
+"""Exact and near-duplicate chunk detection used while building the vector index.
+
+Chunks are first compared by the hash of their normalized text (case-folded,
+whitespace collapsed). With near-duplicate detection enabled, chunks that miss the
+exact table are compared with MinHash signatures over word shingles, bucketed with
+LSH so only candidates sharing a band are compared.
+
+Every group of duplicates maps to one vector id; the group keeps the metadata of
+the first chunk (which is the text that gets embedded) plus the source metadata of
+every member, so citations can still point at each copy.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import zlib
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from .persistence import atomic_write
+
+GROUPS_FILE = "dedup_groups.json"
+SIGNATURES_FILE = "dedup_signatures.npy"
+
+# Metadata fields kept for each member of a duplicate group (with the character
+# offsets, any member can stand in for the group once its first copy is gone)
+MEMBER_FIELDS = ("source", "page", "para", "para_end", "chunk_index", "start", "end")
+
+_WS = re.compile(r"\s+")
+# Largest prime below 2**32; keeps a * x + b within uint64 for 31-bit a, b
+_PRIME = 4294967291
+
+
+def normalize_text(text: str) -> str:
+    return _WS.sub(" ", text).strip().casefold()
+
+
+def content_id(text: str) -> str:
+    """Vector id shared by all chunks whose normalized text is identical."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8", "surrogatepass"))
+    return "chunk::" + digest.hexdigest()[:32]
+
+
+class MinHashLSH:
+    """MinHash signatures over word shingles with banded LSH buckets."""
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], set[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = normalize_text(text).split(" ")
+        n = self.shingle_size
+        shingles = {
+            " ".join(words[i : i + n]) for i in range(max(1, len(words) - n + 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8", "surrogatepass")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        perms = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return perms.min(axis=0).astype(np.uint32)
+
+    def _bands(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def find(self, sig: np.ndarray) -> str | None:
+        """Return the id of the most similar stored signature above ``threshold``."""
+        candidates: set[str] = set()
+        for key in self._bands(sig):
+            candidates.update(self._buckets.get(key, ()))
+        best, best_score = None, self.threshold
+        for cid in candidates:
+            score = float(np.mean(self._signatures[cid] == sig))
+            if score >= best_score:
+                best, best_score = cid, score
+        return best
+
+    def add(self, id: str, sig: np.ndarray):
+        self._signatures[id] = sig
+        for key in self._bands(sig):
+            self._buckets.setdefault(key, set()).add(id)
+
+    def get(self, id: str) -> np.ndarray | None:
+        return self._signatures.get(id)
+
+    def remove(self, id: str):
+        sig = self._signatures.pop(id, None)
+        if sig is None:
+            return
+        for key in self._bands(sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def items(self):
+        return self._signatures.items()
+
+
+class ChunkDeduper:
+    """Assigns chunks to duplicate groups and tracks which sources reference each group.
+
+    ``assign()`` returns the vector id for a chunk and whether it starts a new group
+    (and therefore needs embedding). ``release()`` drops the members contributed by
+    one source; once a group has no members left its vector should be deleted.
+
+    Between ``begin()`` and ``commit()`` every group (and LSH signature) is saved
+    the first time it changes, so ``rollback()`` undoes an update that failed
+    part-way at a cost proportional to what it touched.
+    """
+
+    def __init__(self, near: bool = False, **lsh_options: Any):
+        self.near = near
+        self._lsh_options = lsh_options
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def clear(self):
+        # vector id -> {"meta": metadata of the embedded chunk, "members": [...]}
+        self._groups: Dict[str, Dict[str, Any]] = {}
+        self._lsh = MinHashLSH(**self._lsh_options) if self.near else None
+        # vector id -> (group, signature) before the open update changed them
+        self._journal: Dict[str, Tuple[Any, Any]] | None = None
+
+    def begin(self):
+        """Start journaling changes so that ``rollback()`` can undo them."""
+        self._journal = {}
+
+    def commit(self):
+        """Keep the changes made since ``begin()``."""
+        self._journal = None
+
+    def rollback(self):
+        """Restore every group and signature changed since ``begin()``."""
+        journal, self._journal = self._journal or {}, None
+        for vid, (group, sig) in journal.items():
+            if group is None:
+                self._groups.pop(vid, None)
+            else:
+                self._groups[vid] = group
+            if self._lsh is not None:
+                self._lsh.remove(vid)
+                if sig is not None:
+                    self._lsh.add(vid, sig)
+
+    def _record(self, vid: str):
+        if self._journal is None or vid in self._journal:
+            return
+        group = self._groups.get(vid)
+        sig = self._lsh.get(vid) if self._lsh is not None else None
+        self._journal[vid] = (copy.deepcopy(group), sig)
+
+    def assign(self, text: str, meta: Dict[str, Any]) -> Tuple[str, bool]:
+        member = {k: meta[k] for k in MEMBER_FIELDS if meta.get(k) is not None}
+        vid = content_id(text)
+        if vid not in self._groups and self._lsh is not None:
+            sig = self._lsh.signature(text)
+            match = self._lsh.find(sig)
+            if match is None:
+                self._record(vid)
+                self._lsh.add(vid, sig)
+            else:
+                vid = match
+        self._record(vid)
+        group = self._groups.get(vid)
+        if group is None:
+            self._groups[vid] = {"meta": meta, "members": [member]}
+            return vid, True
+        group["members"].append(member)
+        return vid, False
+
+    def release(self, vid: str, source: str) -> bool:
+        """Remove ``source``'s members from group ``vid``; True if the group is now empty.
+
+        If ``source`` held the group's representative chunk, the first remaining
+        member takes its place, so the vector's metadata points at a live copy.
+        """
+        group = self._groups.get(vid)
+        if group is None:
+            return True
+        self._record(vid)
+        group["members"] = [m for m in group["members"] if m.get("source") != source]
+        if group["members"]:
+            if group["meta"].get("source") == source:
+                rest = {
+                    k: v for k, v in group["meta"].items() if k not in MEMBER_FIELDS
+                }
+                group["meta"] = {**rest, **group["members"][0]}
+            return False
+        del self._groups[vid]
+        if self._lsh is not None:
+            self._lsh.remove(vid)
+        return True
+
+    def metadata(self, vid: str) -> Dict[str, Any]:
+        """Vector metadata for group ``vid``: the embedded chunk's metadata plus all sources."""
+        group = self._groups[vid]
+        return {**group["meta"], "sources": list(group["members"])}
+
+    def __contains__(self, vid: str) -> bool:
+        return vid in self._groups
+
+    # --- persistence ---
+    def save(self, directory: str):
+        """Write the groups (and LSH signatures, if enabled) next to a saved index."""
+        signature_ids = (
+            [vid for vid, _ in self._lsh.items()] if self._lsh is not None else []
+        )
+        state = {"groups": self._groups, "signature_ids": signature_ids}
+        data = json.dumps(state, ensure_ascii=False).encode("utf-8")
+        atomic_write(os.path.join(directory, GROUPS_FILE), lambda fh: fh.write(data))
+        if self._lsh is not None:
+            sigs = np.zeros((len(signature_ids), self._lsh.num_perm), dtype=np.uint32)
+            for row, (_, sig) in enumerate(self._lsh.items()):
+                sigs[row] = sig
+            atomic_write(
+                os.path.join(directory, SIGNATURES_FILE), lambda fh: np.save(fh, sigs)
+            )
+
+    def load(self, directory: str) -> bool:
+        """Restore state saved by ``save()``; returns False if it is missing or incompatible."""
+        try:
+            with open(os.path.join(directory, GROUPS_FILE), encoding="utf-8") as f:
+                state = json.load(f)
+            sigs = None
+            if self.near:
+                sigs = np.load(os.path.join(directory, SIGNATURES_FILE))
+        except (OSError, ValueError):
+            return False
+        self.clear()
+        if sigs is not None:
+            ids = state.get("signature_ids") or []
+            if len(ids) != len(sigs) or (ids and sigs.shape[1] != self._lsh.num_perm):
+                return False
+            for vid, sig in zip(ids, sigs):
+                self._lsh.add(vid, sig)
+        self._groups = state.get("groups") or {}
+        return True
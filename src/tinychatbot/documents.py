@@ -1,6 +1,9 @@
 """Shared helpers for loading project documents from the content directory."""
+import hashlib
+import os
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from loguru import logger
 
@@ -8,6 +11,54 @@ from .config import Config
 from .io_utils import DocumentExtractor
 
 
+def content_hash(text: str) -> str:
+    """sha256 of a document's text, used to detect changed documents."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _filter_readable(
+    docs: List[Dict[str, Any]], base: Path, warn: bool = True
+) -> List[Dict[str, Any]]:
+    """Drop documents that produced no text, logging how many were skipped.
+
+    A ``"hash"`` (``content_hash`` of the text) present on a document is kept.
+    """
+    filtered: List[Dict[str, Any]] = []
+    skipped = 0
+    for doc in docs:
+        text = doc.get("text", "") or ""
+        # isspace() stops at the first visible character; strip() may copy the text
+        if text and not text.isspace():
+            entry = {"path": doc.get("path"), "text": text}
+            if doc.get("hash"):
+                entry["hash"] = doc["hash"]
+            filtered.append(entry)
+        else:
+            skipped += 1
+
+    if warn and skipped:
+        logger.warning(
+            f"Skipped {skipped} documents that produced no readable text in '{base}'."
+        )
+    if warn and not filtered:
+        logger.warning(f"No readable documents found under '{base}'.")
+
+    return filtered
+
+
+def make_extractor() -> DocumentExtractor:
+    """Create a ``DocumentExtractor`` wired to the on-disk extraction cache when enabled."""
+    cache_dir = Config.EXTRACT_CACHE_DIR if Config.EXTRACT_CACHE else None
+    return DocumentExtractor(
+        cache_dir=cache_dir,
+        workers=Config.EXTRACT_WORKERS,
+        timeout=Config.EXTRACT_TIMEOUT or None,
+        ocr_workers=Config.OCR_WORKERS,
+        ocr_page_window=Config.OCR_PAGE_WINDOW,
+        ocr_dpi=Config.OCR_DPI,
+    )
+
+
 def load_documents(content_dir: Optional[str] = None) -> List[Dict[str, Any]]:
     """Load supported documents under ``content_dir`` and return a path/text list.
 
@@ -19,23 +70,133 @@ def load_documents(content_dir: Optional[str] = None) -> List[Dict[str, Any]]:
     if not base.exists():
         raise FileNotFoundError(f"Content directory '{base}' not found.")
 
-    extractor = DocumentExtractor()
+    extractor = make_extractor()
     docs = extractor.load_folder(str(base))
+    return _filter_readable(docs, base)
+
+
+def iter_documents(content_dir: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream readable ``{"path", "text"}`` documents under ``content_dir`` one at a time.
+
+    Unlike ``load_documents`` nothing is materialized: with parallel extraction only a
+    bounded window of files is in flight, so corpora larger than RAM can be indexed
+    (e.g. ``qa_service._build_index_if_needed(iter_documents(), ...)``).
+    """
+    base = Path(content_dir or Config.CONTENT_DIR)
+    if not base.exists():
+        raise FileNotFoundError(f"Content directory '{base}' not found.")
 
-    filtered: List[Dict[str, Any]] = []
     skipped = 0
-    for doc in docs:
-        text = doc.get("text", "") or ""
-        if text.strip():
-            filtered.append({"path": doc.get("path"), "text": text})
+    for doc in make_extractor().iter_folder(str(base)):
+        if (doc.get("text") or "").strip():
+            yield doc
         else:
             skipped += 1
-
     if skipped:
         logger.warning(
             f"Skipped {skipped} documents that produced no readable text in '{base}'."
         )
-    if not filtered:
-        logger.warning(f"No readable documents found under '{base}'.")
 
-    return filtered
+
+StatKey = Tuple[int, int, int]
+
+
+class CorpusCache:
+    """In-memory cache of extracted document texts for one content directory.
+
+    ``load()`` walks the folder and ``os.stat``s every file; only files whose
+    (mtime, size, inode) changed since the previous call are re-extracted, so
+    revalidating an unchanged corpus costs a directory walk and one stat per file
+    instead of re-parsing every PDF/DOCX. The ``content_hash`` of a text is computed
+    once at extraction and returned as the document's ``"hash"``.
+    """
+
+    def __init__(
+        self,
+        content_dir: Optional[str] = None,
+        extractor: DocumentExtractor | None = None,
+    ):
+        self.base = Path(content_dir or Config.CONTENT_DIR)
+        self._extractor = extractor
+        # path -> (stat key, text, content hash)
+        self._entries: Dict[str, Tuple[StatKey, str, str]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_extractor(self) -> DocumentExtractor:
+        # Created on first use: the constructor probes for native OCR binaries
+        if self._extractor is None:
+            self._extractor = make_extractor()
+        return self._extractor
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = {}
+            self._loaded = False
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Return readable ``{"path", "text"}`` documents, re-extracting only changed files."""
+        if not self.base.exists():
+            raise FileNotFoundError(f"Content directory '{self.base}' not found.")
+
+        with self._lock:
+            entries: Dict[str, Tuple[StatKey, str, str]] = {}
+            stale: List[Tuple[str, StatKey]] = []
+            for root, _, files in os.walk(str(self.base)):
+                for fname in files:
+                    path = os.path.join(root, fname)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+                    cached = self._entries.get(path)
+                    if cached is not None and cached[0] == key:
+                        entries[path] = cached
+                    else:
+                        # Placeholder keeps the walk order
+                        entries[path] = (key, "", "")
+                        stale.append((path, key))
+            if stale:
+                extractor = self._get_extractor()
+                texts = extractor.extract_many([p for p, _ in stale])
+                # Files that failed or timed out are not cached: retry them next load
+                failed = {path for path, _ in extractor.failures}
+                for (path, key), text in zip(stale, texts):
+                    if path in failed:
+                        del entries[path]
+                    else:
+                        entries[path] = (key, text, content_hash(text))
+            changed = len(stale)
+            removed = len(self._entries.keys() - entries.keys())
+            self._entries = entries
+            first_load = not self._loaded
+            self._loaded = True
+
+        if changed or removed:
+            logger.info(
+                f"Corpus cache for '{self.base}': {changed} extracted, {removed} removed, "
+                f"{len(entries) - changed} reused."
+            )
+        docs = [
+            {"path": path, "text": text, "hash": digest}
+            for path, (_, text, digest) in entries.items()
+        ]
+        # Only repeat the skipped/empty warnings when something actually changed
+        return _filter_readable(
+            docs, self.base, warn=bool(first_load or changed or removed)
+        )
+
+
+_CORPUS_CACHES: Dict[str, CorpusCache] = {}
+_CORPUS_CACHES_LOCK = threading.Lock()
+
+
+def load_documents_cached(content_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Like ``load_documents`` but backed by a process-wide ``CorpusCache`` per folder."""
+    key = os.path.abspath(content_dir or Config.CONTENT_DIR)
+    with _CORPUS_CACHES_LOCK:
+        cache = _CORPUS_CACHES.get(key)
+        if cache is None:
+            cache = _CORPUS_CACHES[key] = CorpusCache(content_dir)
+    return cache.load()
@@ -0,0 +1,144 @@
+"""Persistent embedding cache keyed by ``(embedding model, sha256(text))``.
+
+Backed by SQLite so it can be shared between restarts and between worker processes
+on the same host. Entries carry a last-used timestamp and the least recently used
+ones are evicted once the cache grows past ``max_entries``.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Sequence
+
+from .config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    key TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta (name, value)
+    SELECT 'rows', COUNT(*) FROM embeddings;
+CREATE TRIGGER IF NOT EXISTS embeddings_count_insert AFTER INSERT ON embeddings
+    BEGIN UPDATE meta SET value = value + 1 WHERE name = 'rows'; END;
+CREATE TRIGGER IF NOT EXISTS embeddings_count_delete AFTER DELETE ON embeddings
+    BEGIN UPDATE meta SET value = value - 1 WHERE name = 'rows'; END;
+"""
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe SQLite store of embedding vectors with LRU eviction.
+
+    Vectors are stored as packed float32 blobs. ``get_many`` refreshes the
+    last-used time of every hit; ``put_many`` inserts new vectors and trims the
+    oldest entries when the table exceeds ``max_entries``. The row count lives in
+    the ``meta`` table and is kept current by triggers in the same transaction as
+    every insert and delete, whichever process makes them, so checking the cap
+    never scans the table.
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int | None = None):
+        self.path = path or Config.EMBED_CACHE_PATH
+        self.max_entries = max_entries or Config.EMBED_CACHE_MAX_ENTRIES
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # WAL lets readers in other processes proceed while one process writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # One transaction, so a concurrent writer cannot slip rows in between
+        # counting the table and installing the triggers
+        self._conn.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[List[float] | None]:
+        """Return cached vectors aligned with ``texts`` (None for misses)."""
+        keys = [text_key(t) for t in texts]
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), _QUERY_BATCH):
+                batch = unique[i : i + _QUERY_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({marks})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+        return [found.get(key) for key in keys]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ):
+        """Store vectors for ``texts`` and evict least recently used entries if needed."""
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (model, text_key(t), array("f", vec).tobytes(), now)
+            for t, vec in zip(texts, vectors)
+        ]
+        with self._lock:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, key, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            if inserted < len(rows):
+                # Some texts were already cached (e.g. by another worker): refresh them
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? "
+                    "WHERE model = ? AND key = ?",
+                    [(blob, used, m, key) for m, key, blob, used in rows],
+                )
+            if inserted:
+                # Read in the insert's transaction: includes other processes' rows
+                count = self._conn.execute(
+                    "SELECT value FROM meta WHERE name = 'rows'"
+                ).fetchone()[0]
+                excess = count - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE (model, key) IN ("
+                        "SELECT model, key FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+            self._conn.commit()
@@ -0,0 +1,99 @@
+"""On-disk cache of extracted document text (PDF/DOCX parsing and OCR output).
+
+Each source file maps to one cache entry named after the hash of its absolute path.
+An entry stores a JSON header line (size, mtime, content sha256 and the extractor
+settings used) followed by the zlib-compressed text.
+
+Lookups are cheap when nothing changed: a matching size and mtime is a hit without
+reading the source file. If only the mtime differs (e.g. the file was copied or
+touched) the content hash is compared before re-extracting.
+"""
+import hashlib
+import json
+import os
+import zlib
+from typing import Any, Dict
+
+from .persistence import atomic_write
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """Directory of compressed extraction results keyed by path, stat, content hash and settings."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _entry_path(self, path: str) -> str:
+        digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ".txt.z")
+
+    def _read_entry(self, path: str):
+        try:
+            with open(self._entry_path(path), "rb") as f:
+                header = json.loads(f.readline())
+                payload = f.read()
+        except (OSError, ValueError):
+            return None, b""
+        return header, payload
+
+    def get(self, path: str, settings: Dict[str, Any]) -> str | None:
+        """Return cached text for ``path`` or None if missing or stale."""
+        header, payload = self._read_entry(path)
+        if not header or header.get("settings") != settings:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if header.get("size") != st.st_size:
+            return None
+        if header.get("mtime_ns") != st.st_mtime_ns:
+            # Same size, different mtime: fall back to comparing content
+            try:
+                if file_sha256(path) != header.get("sha256"):
+                    return None
+            except OSError:
+                return None
+            header["mtime_ns"] = st.st_mtime_ns
+            try:
+                self._write_entry(path, header, payload)
+            except OSError:
+                pass
+        try:
+            return zlib.decompress(payload).decode("utf-8", "surrogatepass")
+        except (zlib.error, UnicodeDecodeError):
+            return None
+
+    def put(self, path: str, settings: Dict[str, Any], text: str):
+        """Store ``text`` extracted from ``path`` with the given extractor settings."""
+        try:
+            st = os.stat(path)
+            header = {
+                "path": os.path.abspath(path),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": file_sha256(path),
+                "settings": settings,
+            }
+            payload = zlib.compress(text.encode("utf-8", "surrogatepass"), 6)
+            self._write_entry(path, header, payload)
+        except OSError:
+            # The cache is best-effort; extraction results are still returned
+            return
+
+    def _write_entry(self, path: str, header: Dict[str, Any], payload: bytes):
+        line = json.dumps(header).encode("utf-8") + b"\n"
+
+        def write(fh):
+            fh.write(line)
+            fh.write(payload)
+
+        atomic_write(self._entry_path(path), write)
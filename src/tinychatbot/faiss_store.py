@@ -0,0 +1,411 @@
+"""FAISS-backed vector store (``VECTOR_PROVIDER=faiss``).
+
+Requires the optional ``faiss`` extra (``pip install faiss-cpu``).
+"""
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .config import Config
+from .filters import FilterIndex, MetadataFilter
+from .metadata_table import MetadataTable
+from .persistence import atomic_write, read_manifest, write_manifest
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+INDEX_FILE = "faiss.index"
+SIDECAR_FILE = "faiss_sidecar.json"
+METADATA_FILE = "faiss_metadata.npz"
+# Raw float32 rows of vectors waiting for IVF training (ids are in the sidecar)
+PENDING_FILE = "faiss_pending.f32"
+# Filtered HNSW queries matching at most this many vectors are scored exactly
+# (graph search with a selector can miss matches when the filter is very narrow)
+EXACT_FILTER_MAX = 4096
+# HNSW graphs are rebuilt from the live vectors once tombstones exceed this
+# fraction of live entries (every tombstone widens each search)
+HNSW_COMPACT_RATIO = 0.2
+
+
+class FaissVectorStore:
+    """Cosine-similarity vector store on top of a FAISS inner-product index.
+
+    FAISS only knows about int64 ids and raw vectors, so the store keeps two side
+    tables: a string-id <-> FAISS-id mapping and the chunk metadata keyed by FAISS
+    id (a columnar ``MetadataTable``). Vectors are L2-normalized on insert so inner product equals cosine.
+
+    Index types:
+      - ``flat``: exact search (``IndexFlatIP``); good default up to a few 100k chunks.
+      - ``ivf``: inverted lists (``IndexIVFFlat``) probed with ``nprobe``. The coarse
+        quantizer needs training data, so vectors are buffered and searched exactly
+        until ``train_min`` vectors are available.
+      - ``hnsw``: graph index (``IndexHNSWFlat``). HNSW cannot remove vectors, so
+        deletes are tombstoned and filtered out of results.
+    """
+
+    def __init__(
+        self,
+        index_type: str | None = None,
+        nlist: int | None = None,
+        nprobe: int | None = None,
+        hnsw_m: int | None = None,
+        ef_search: int | None = None,
+        ef_construction: int | None = None,
+        train_min: int | None = None,
+    ):
+        try:
+            import faiss  # type: ignore
+        except ImportError as e:
+            raise ImportError(
+                "VECTOR_PROVIDER=faiss requires the 'faiss' extra (pip install faiss-cpu)"
+            ) from e
+        self._faiss = faiss
+
+        index_type = (index_type or Config.FAISS_INDEX_TYPE).lower()
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown FAISS index type '{index_type}'; expected one of {INDEX_TYPES}"
+            )
+        self.index_type = index_type
+        self.nlist = nlist or Config.FAISS_NLIST
+        self.nprobe = nprobe or Config.FAISS_NPROBE
+        self.hnsw_m = hnsw_m or Config.FAISS_HNSW_M
+        self.ef_search = ef_search or Config.FAISS_EF_SEARCH
+        self.ef_construction = ef_construction or Config.FAISS_EF_CONSTRUCTION
+        # FAISS recommends ~39 training points per inverted list
+        self.train_min = train_min or self.nlist * 39
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._str_to_int)
+
+    def clear(self):
+        """Drop the index and all side tables."""
+        self.dim: int | None = None
+        self._index = None
+        self._next_id = 0
+        self._str_to_int: Dict[str, int] = {}
+        self._int_to_str: Dict[int, str] = {}
+        self._metadata = MetadataTable()
+        # Source/page inverted indexes over FAISS ids for filtered queries
+        self._filters = FilterIndex()
+        # IVF only: vectors waiting for enough data to train the quantizer
+        self._pending: Dict[int, np.ndarray] = {}
+        # HNSW only: FAISS ids that were deleted/replaced but are still in the graph
+        self._tombstones: set[int] = set()
+
+    # --- index construction ---
+    def _create_index(self, dim: int):
+        faiss = self._faiss
+        self.dim = dim
+        if self.index_type == "ivf":
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(
+                quantizer, dim, self.nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            index.nprobe = self.nprobe
+            # Hashtable direct map allows both reconstruct() and remove_ids()
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            # Keep the quantizer alive for as long as the index references it
+            self._quantizer = quantizer
+            self._index = index
+        elif self.index_type == "hnsw":
+            inner = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            inner.hnsw.efConstruction = self.ef_construction
+            inner.hnsw.efSearch = self.ef_search
+            self._inner = inner
+            self._index = faiss.IndexIDMap2(inner)
+        else:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    def _as_matrix(self, embeddings) -> np.ndarray:
+        mat = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if mat.ndim == 1:
+            mat = mat.reshape(1, -1)
+        if self.dim is None:
+            self._create_index(int(mat.shape[1]))
+        elif mat.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {mat.shape[1]} does not match store dimension {self.dim}"
+            )
+        self._faiss.normalize_L2(mat)
+        return mat
+
+    def _maybe_train(self):
+        if self.index_type != "ivf" or self._index.is_trained:
+            return
+        if len(self._pending) < self.train_min:
+            return
+        fids = np.fromiter(self._pending.keys(), dtype=np.int64)
+        vecs = np.stack(list(self._pending.values()))
+        self._index.train(vecs)
+        self._index.add_with_ids(vecs, fids)
+        self._pending = {}
+
+    def _add(self, fids: np.ndarray, mat: np.ndarray):
+        if self.index_type == "ivf" and not self._index.is_trained:
+            for fid, vec in zip(fids.tolist(), mat):
+                self._pending[fid] = vec
+            self._maybe_train()
+            return
+        self._index.add_with_ids(mat, fids)
+
+    def _remove_fids(self, fids: List[int]):
+        if not fids:
+            return
+        if self.index_type == "hnsw":
+            self._tombstones.update(fids)
+            if len(self._tombstones) > HNSW_COMPACT_RATIO * len(self._int_to_str):
+                self.compact()
+            return
+        for fid in fids:
+            self._pending.pop(fid, None)
+        if self._index is not None and self._index.ntotal:
+            self._index.remove_ids(np.asarray(fids, dtype=np.int64))
+
+    def compact(self):
+        """Rebuild the HNSW graph from the live vectors, dropping tombstoned nodes.
+
+        FAISS ids are kept, so the id map, metadata and filter indexes stay valid.
+        """
+        if self.index_type != "hnsw" or self._index is None:
+            return
+        fids = np.fromiter(
+            self._int_to_str, dtype=np.int64, count=len(self._int_to_str)
+        )
+        vecs = self._index.reconstruct_batch(fids) if len(fids) else None
+        self._create_index(self.dim)
+        if vecs is not None:
+            self._index.add_with_ids(vecs, fids)
+        self._tombstones = set()
+
+    # --- public API ---
+    def upsert(self, id: str, embedding: List[float], metadata: dict | None = None):
+        self.upsert_many([id], [embedding], [metadata])
+
+    def upsert_many(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[List[float]],
+        metadatas: Sequence[dict | None] | None = None,
+    ):
+        """Insert or replace many vectors; replaced ids get a fresh FAISS id."""
+        if len(ids) != len(embeddings):
+            raise ValueError("ids and embeddings must have the same length")
+        if metadatas is None:
+            metadatas = [None] * len(ids)
+        elif len(metadatas) != len(ids):
+            raise ValueError("ids and metadatas must have the same length")
+        if not ids:
+            return
+
+        mat = self._as_matrix(embeddings)
+        # Last occurrence wins for ids repeated within the batch
+        rows: Dict[str, int] = {}
+        for row, id in enumerate(ids):
+            rows[id] = row
+        replaced = [self._str_to_int[id] for id in rows if id in self._str_to_int]
+        for fid in replaced:
+            self._metadata.remove(fid)
+            self._filters.remove(fid)
+            del self._int_to_str[fid]
+        self._remove_fids(replaced)
+
+        fids = np.arange(self._next_id, self._next_id + len(rows), dtype=np.int64)
+        self._next_id += len(rows)
+        for fid, (id, row) in zip(fids.tolist(), rows.items()):
+            self._str_to_int[id] = fid
+            self._int_to_str[fid] = id
+            self._metadata.set(fid, metadatas[row] or {})
+            self._filters.add(fid, metadatas[row] or {})
+        self._add(fids, mat[list(rows.values())])
+
+    def delete(self, id: str) -> bool:
+        """Remove a vector by id; returns False if it was not present."""
+        fid = self._str_to_int.pop(id, None)
+        if fid is None:
+            return False
+        del self._int_to_str[fid]
+        self._metadata.remove(fid)
+        self._filters.remove(fid)
+        self._remove_fids([fid])
+        return True
+
+    def get_metadata(self, id: str) -> dict | None:
+        """Return the metadata stored with ``id`` (None if unknown)."""
+        fid = self._str_to_int.get(id)
+        return None if fid is None else self._metadata.get(fid)
+
+    def update_metadata(self, id: str, metadata: dict) -> bool:
+        """Replace the metadata of a stored vector; returns False if ``id`` is unknown."""
+        fid = self._str_to_int.get(id)
+        if fid is None:
+            return False
+        self._metadata.set(fid, metadata)
+        self._filters.add(fid, metadata)
+        return True
+
+    def _reconstruct(self, fid: int) -> List[float]:
+        if fid in self._pending:
+            return self._pending[fid].tolist()
+        try:
+            return self._index.reconstruct(int(fid)).tolist()
+        except Exception:
+            return []
+
+    def _search_index(
+        self, q: np.ndarray, top_k: int, allowed: np.ndarray | None
+    ) -> Dict[int, float]:
+        faiss = self._faiss
+        # Over-fetch by the tombstone count so deleted HNSW nodes can't starve top-k
+        k = min(top_k + len(self._tombstones), self._index.ntotal)
+        params = None
+        if allowed is not None:
+            if self.index_type == "hnsw" and len(allowed) <= EXACT_FILTER_MAX:
+                vecs = np.stack([self._index.reconstruct(int(fid)) for fid in allowed])
+                return dict(zip(allowed.tolist(), (vecs @ q[0]).tolist()))
+            k = min(top_k, len(allowed))
+            selector = faiss.IDSelectorBatch(allowed)
+            if self.index_type == "ivf":
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+            elif self.index_type == "hnsw":
+                params = faiss.SearchParametersHNSW(
+                    sel=selector, efSearch=max(self.ef_search, k)
+                )
+            else:
+                params = faiss.SearchParameters(sel=selector)
+        elif self.index_type == "hnsw":
+            self._inner.hnsw.efSearch = max(self.ef_search, k)
+        scores, fids = self._index.search(q, k, params=params)
+        if params is not None and self.index_type == "ivf" and (fids[0] < 0).any():
+            # Too few matches in the probed lists: probe every list
+            params.nprobe = self.nlist
+            scores, fids = self._index.search(q, k, params=params)
+        return {
+            fid: score
+            for score, fid in zip(scores[0].tolist(), fids[0].tolist())
+            if fid >= 0 and fid in self._int_to_str
+        }
+
+    def query(
+        self,
+        embedding: List[float],
+        top_k: int = 5,
+        filter: MetadataFilter | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` closest vectors, optionally restricted by ``filter``.
+
+        Filters are resolved to FAISS ids through the source/page indexes and passed
+        to the search as an ``IDSelector``, so non-matching vectors are never scored.
+        """
+        if not self._str_to_int or top_k <= 0:
+            return []
+        allowed = None
+        if filter is not None and not filter.is_empty():
+            all_fids = np.fromiter(self._int_to_str, dtype=np.int64)
+            allowed = self._filters.select(filter, np.sort(all_fids))
+            if not len(allowed):
+                return []
+        q = self._as_matrix(embedding)
+
+        scored: Dict[int, float] = {}
+        pending = self._pending
+        if allowed is not None and pending:
+            allowed_set = set(allowed.tolist())
+            pending = {fid: vec for fid, vec in pending.items() if fid in allowed_set}
+            allowed = allowed[~np.isin(allowed, list(self._pending))]
+        if self._index.ntotal and (allowed is None or len(allowed)):
+            scored.update(self._search_index(q, top_k, allowed))
+        if pending:
+            pending_ids = list(pending.keys())
+            pending_scores = np.stack(list(pending.values())) @ q[0]
+            scored.update(zip(pending_ids, pending_scores.tolist()))
+
+        ranked = sorted(scored.items(), key=lambda t: t[1], reverse=True)[:top_k]
+        return [
+            {
+                "id": self._int_to_str[fid],
+                "embedding": self._reconstruct(fid),
+                "metadata": self._metadata.get(fid),
+                "score": float(score),
+            }
+            for fid, score in ranked
+        ]
+
+    # --- persistence ---
+    def save(self, directory: str, **manifest: Any):
+        """Serialize the FAISS index and side tables to ``directory``."""
+        if self._index is not None:
+            blob = self._faiss.serialize_index(self._index)
+            atomic_write(os.path.join(directory, INDEX_FILE), blob.tofile)
+        atomic_write(os.path.join(directory, METADATA_FILE), self._metadata.save)
+        pending = np.zeros((len(self._pending), self.dim or 0), dtype=np.float32)
+        for row, vec in enumerate(self._pending.values()):
+            pending[row] = vec
+        atomic_write(os.path.join(directory, PENDING_FILE), pending.tofile)
+        sidecar = {
+            "next_id": self._next_id,
+            "ids": self._str_to_int,
+            "pending_ids": list(self._pending),
+            "tombstones": sorted(self._tombstones),
+        }
+        data = json.dumps(sidecar, ensure_ascii=False).encode("utf-8")
+        atomic_write(os.path.join(directory, SIDECAR_FILE), lambda fh: fh.write(data))
+        write_manifest(
+            directory,
+            {
+                **manifest,
+                "provider": "faiss",
+                "index_type": self.index_type,
+                "count": len(self),
+                "dim": self.dim,
+            },
+        )
+
+    def load(self, directory: str) -> Dict[str, Any] | None:
+        """Load an index saved by ``save()``; returns the manifest or None if incompatible."""
+        manifest = read_manifest(directory)
+        if (
+            not manifest
+            or manifest.get("provider") != "faiss"
+            or manifest.get("index_type") != self.index_type
+        ):
+            return None
+        try:
+            with open(os.path.join(directory, SIDECAR_FILE), encoding="utf-8") as f:
+                sidecar = json.load(f)
+            index = None
+            if manifest.get("dim"):
+                blob = np.fromfile(os.path.join(directory, INDEX_FILE), dtype=np.uint8)
+                index = self._faiss.deserialize_index(blob)
+            pending_ids = sidecar.get("pending_ids", [])
+            pending = np.zeros((0, 0), dtype=np.float32)
+            if pending_ids:
+                pending = np.fromfile(
+                    os.path.join(directory, PENDING_FILE), dtype=np.float32
+                ).reshape(len(pending_ids), int(manifest["dim"]))
+        except (OSError, ValueError, RuntimeError, KeyError, TypeError):
+            return None
+        metadata = MetadataTable()
+        if metadata.load(os.path.join(directory, METADATA_FILE)) is None:
+            return None
+
+        self.clear()
+        if index is not None:
+            self.dim = int(manifest["dim"])
+            if self.index_type == "hnsw":
+                self._inner = self._faiss.downcast_index(index.index)
+                self._index = index
+            elif self.index_type == "ivf":
+                index.nprobe = self.nprobe
+                self._index = index
+            else:
+                self._index = index
+        self._next_id = int(sidecar["next_id"])
+        self._str_to_int = {id: int(fid) for id, fid in sidecar["ids"].items()}
+        self._int_to_str = {fid: id for id, fid in self._str_to_int.items()}
+        self._metadata = metadata
+        self._filters.add_many(metadata.items())
+        self._pending = {int(fid): vec for fid, vec in zip(pending_ids, pending)}
+        self._tombstones = set(sidecar["tombstones"])
+        return manifest
@@ -0,0 +1,208 @@
+"""Metadata filters for retrieval (source path/prefix, file type, page range).
+
+``MetadataFilter`` describes which chunks a query may return. ``FilterIndex`` is the
+per-field inverted index the vector stores keep next to their rows (source path ->
+row set, plus a page column), so a filtered query resolves the matching rows first
+and then scores only those.
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+@lru_cache(maxsize=65536)
+def _norm_path(path: str) -> str:
+    # Resolve "./a.pdf", "a.pdf", absolute paths and symlinks to one spelling
+    return os.path.realpath(path)
+
+
+def chunk_sources(meta: Dict[str, Any]) -> Tuple[str, ...]:
+    """Source paths a chunk belongs to (several for deduplicated chunks)."""
+    members = meta.get("sources") or [meta]
+    return tuple(dict.fromkeys(m["source"] for m in members if m.get("source")))
+
+
+def chunk_members(meta: Dict[str, Any]) -> Tuple[Tuple[str, int | None], ...]:
+    """``(source, page)`` of every copy of a chunk (one unless deduplicated)."""
+    members = meta.get("sources") or [meta]
+    return tuple(
+        dict.fromkeys(
+            (m["source"], m.get("page") if isinstance(m.get("page"), int) else None)
+            for m in members
+            if m.get("source")
+        )
+    )
+
+
+@dataclass
+class MetadataFilter:
+    """Conjunction of optional constraints; within a field any listed value matches.
+
+    ``sources`` are exact document paths, ``prefix`` a folder (matched on whole path
+    components), ``file_types`` extensions such as ``"pdf"`` or ``".docx"`` and
+    ``page_min``/``page_max`` an inclusive page range.
+    """
+
+    sources: Sequence[str] | None = None
+    prefix: str | None = None
+    file_types: Sequence[str] | None = None
+    page_min: int | None = None
+    page_max: int | None = None
+
+    def __post_init__(self):
+        self._sources = {_norm_path(s) for s in self.sources or ()}
+        self._prefix = _norm_path(self.prefix) if self.prefix else None
+        self._types = {
+            t.lower() if t.startswith(".") else "." + t.lower()
+            for t in self.file_types or ()
+        }
+
+    @property
+    def constrains_source(self) -> bool:
+        return bool(self._sources or self._prefix or self._types)
+
+    @property
+    def constrains_page(self) -> bool:
+        return self.page_min is not None or self.page_max is not None
+
+    def is_empty(self) -> bool:
+        return not (self.constrains_source or self.constrains_page)
+
+    def match_source(self, source: str) -> bool:
+        path = _norm_path(source)
+        if self._sources and path not in self._sources:
+            return False
+        if self._prefix and not (
+            path == self._prefix
+            or path.startswith(self._prefix.rstrip(os.sep) + os.sep)
+        ):
+            return False
+        if self._types and os.path.splitext(path)[1].lower() not in self._types:
+            return False
+        return True
+
+    def match_page(self, page: int | None) -> bool:
+        if not self.constrains_page:
+            return True
+        if page is None:
+            return False
+        if self.page_min is not None and page < self.page_min:
+            return False
+        return self.page_max is None or page <= self.page_max
+
+    def match_member(self, source: str, page: int | None) -> bool:
+        return (not self.constrains_source or self.match_source(source)) and (
+            self.match_page(page)
+        )
+
+    def matches(self, meta: Dict[str, Any]) -> bool:
+        """Check one metadata dict (used by stores without a ``FilterIndex``).
+
+        A deduplicated chunk matches when any of its copies passes both the source
+        and the page constraints.
+        """
+        members = chunk_members(meta)
+        if not members:
+            return not self.constrains_source and self.match_page(meta.get("page"))
+        return any(self.match_member(source, page) for source, page in members)
+
+
+class FilterIndex:
+    """Inverted indexes over integer row keys: source path -> rows, and a page column.
+
+    The page column holds the representative's page; rows of deduplicated chunks
+    also keep every ``(source, page)`` copy so page filters can match any of them.
+    Stores call ``add`` / ``remove`` / ``move`` as rows change and ``select`` to get
+    the sorted row keys matching a ``MetadataFilter`` before scoring anything.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._by_source: Dict[str, set[int]] = {}
+        self._row_sources: Dict[int, Tuple[str, ...]] = {}
+        # (source, page) copies of rows with more than one, i.e. deduplicated chunks
+        self._members: Dict[int, Tuple[Tuple[str, int | None], ...]] = {}
+        # Page of each row key (-1 when unknown); grown on demand
+        self._pages = np.full(0, -1, dtype=np.int32)
+
+    def add(self, key: int, meta: Dict[str, Any]):
+        """Index (or re-index) row ``key`` from its metadata."""
+        self.remove(key)
+        sources = tuple(_norm_path(s) for s in chunk_sources(meta))
+        self._row_sources[key] = sources
+        for source in sources:
+            self._by_source.setdefault(source, set()).add(key)
+        members = chunk_members(meta)
+        if len(members) > 1:
+            self._members[key] = tuple((_norm_path(s), p) for s, p in members)
+        if key >= len(self._pages):
+            grown = np.full(max(1024, 2 * (key + 1)), -1, dtype=np.int32)
+            grown[: len(self._pages)] = self._pages
+            self._pages = grown
+        page = meta.get("page")
+        self._pages[key] = page if isinstance(page, int) else -1
+
+    def add_many(self, items: Iterable[Tuple[int, Dict[str, Any]]]):
+        for key, meta in items:
+            self.add(key, meta)
+
+    def remove(self, key: int):
+        for source in self._row_sources.pop(key, ()):
+            rows = self._by_source.get(source)
+            if rows is not None:
+                rows.discard(key)
+                if not rows:
+                    del self._by_source[source]
+        self._members.pop(key, None)
+        if key < len(self._pages):
+            self._pages[key] = -1
+
+    def move(self, src: int, dst: int):
+        """Re-key row ``src`` as ``dst`` (``dst`` must have been removed)."""
+        sources = self._row_sources.pop(src, ())
+        self._row_sources[dst] = sources
+        for source in sources:
+            rows = self._by_source[source]
+            rows.discard(src)
+            rows.add(dst)
+        members = self._members.pop(src, None)
+        if members is not None:
+            self._members[dst] = members
+        self._pages[dst] = self._pages[src]
+        self._pages[src] = -1
+
+    def select(self, flt: MetadataFilter, all_keys: np.ndarray) -> np.ndarray:
+        """Sorted row keys matching ``flt``; ``all_keys`` is used when no source is constrained."""
+        if flt.constrains_source:
+            matched: List[set[int]] = [
+                rows
+                for source, rows in self._by_source.items()
+                if flt.match_source(source)
+            ]
+            keys = np.fromiter(set().union(*matched), dtype=np.int64)
+            keys.sort()
+        else:
+            keys = np.asarray(all_keys, dtype=np.int64)
+        if flt.constrains_page and len(keys):
+            pages = self._pages[keys]
+            mask = pages >= 0
+            if flt.page_min is not None:
+                mask &= pages >= flt.page_min
+            if flt.page_max is not None:
+                mask &= pages <= flt.page_max
+            if self._members:
+                # Deduplicated rows: pair each copy's source with its own page
+                multi = np.fromiter(self._members, dtype=np.int64)
+                in_multi = np.isin(keys, multi)
+                for i in np.flatnonzero(in_multi):
+                    mask[i] = any(
+                        flt.match_member(source, page)
+                        for source, page in self._members[int(keys[i])]
+                    )
+            keys = keys[mask]
+        return keys
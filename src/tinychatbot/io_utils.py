@@ -1,9 +1,80 @@
+import multiprocessing
 import os
+import pickle
 import shutil
-from typing import Callable, Dict, List, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from loguru import logger
 
+from .extraction_cache import ExtractionCache
+
+# Bump when extraction logic changes so cached results are invalidated
+EXTRACTOR_VERSION = 2
+
+# How often a parallel extraction checks a file in flight against its timeout
+_TIMEOUT_POLL = 0.1
+
+# Extractor used by process-pool workers (set once per worker by the pool initializer)
+_WORKER_EXTRACTOR: Optional["DocumentExtractor"] = None
+# Queue on which workers report the task they start (its timeout runs from then)
+_WORKER_STARTED: Any = None
+
+
+def _init_extract_worker(config: Dict[str, Any], started: Any):
+    global _WORKER_EXTRACTOR, _WORKER_STARTED
+    _WORKER_EXTRACTOR = DocumentExtractor._from_worker_config(config)
+    _WORKER_STARTED = started
+
+
+class _ExtractPool:
+    """A spawn-context process pool plus the queue its workers report task starts on."""
+
+    def __init__(self, config: bytes, workers: int):
+        self._config = config
+        self._workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self.pool: Any = None
+        self.started: Any = None
+
+    def start(self):
+        if self.pool is None:
+            self.started = self._ctx.SimpleQueue()
+            self.pool = self._ctx.Pool(
+                processes=self._workers,
+                initializer=_init_extract_worker,
+                initargs=(pickle.loads(self._config), self.started),
+            )
+
+    def close(self, terminate: bool = False):
+        if self.pool is not None:
+            if terminate:
+                self.pool.terminate()
+            else:
+                self.pool.close()
+            self.pool.join()
+            self.pool = self.started = None
+
+
+def _extract_in_worker(seq: int, path: str) -> str:
+    assert _WORKER_EXTRACTOR is not None
+    _WORKER_STARTED.put(seq)
+    return _WORKER_EXTRACTOR.extract(path)
+
 
 def check_native_binaries() -> Dict[str, bool]:
     """Return flags indicating presence of external binaries used for OCR and PDF->image conversion.
@@ -45,15 +116,45 @@ def _extract_docx_text_simple(path: str) -> str:
     return "\n".join(parts)
 
 
-def _extract_pdf_text_simple(path: str) -> str:
+def _extract_pdf_pages(path: str) -> Optional[List[str]]:
+    """Return the text layer of each PDF page, or None if the file can't be parsed."""
     try:
         from pypdf import PdfReader
 
         reader = PdfReader(path)
-        text = "\n".join([p.extract_text() or "" for p in reader.pages])
-        return text
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                pages.append("")
+        return pages
     except Exception:
-        return ""
+        return None
+
+
+def _pdf_page_count(path: str) -> int:
+    try:
+        from pdf2image import pdfinfo_from_path  # type: ignore
+
+        return int(pdfinfo_from_path(path).get("Pages", 0))
+    except Exception:
+        return 0
+
+
+def _page_windows(pages: Sequence[int], size: int) -> List[List[int]]:
+    """Group sorted page numbers into contiguous runs of at most ``size`` pages.
+
+    Each window can then be rasterized with a single ``first_page``/``last_page`` call
+    without rendering pages that don't need OCR.
+    """
+    windows: List[List[int]] = []
+    for page in sorted(pages):
+        if windows and page == windows[-1][-1] + 1 and len(windows[-1]) < size:
+            windows[-1].append(page)
+        else:
+            windows.append([page])
+    return windows
 
 
 class DocumentExtractor:
@@ -65,9 +166,34 @@ class DocumentExtractor:
       docs = extractor.load_folder(folder_path)
 
     enable_ocr: None = auto-detect via `check_native_binaries()`; True/False to force.
+    cache_dir: optional directory for an on-disk `ExtractionCache`; when set, files whose
+    size/mtime (or content hash) and extractor settings are unchanged are served from the
+    cache without parsing or OCR.
+    workers: number of worker processes used by `extract_many`/`load_folder`
+    (0 = one per CPU, 1 = extract serially in the calling thread).
+    timeout: per-file limit in seconds for parallel extraction, counted from when a
+    worker picks the file up; a file that exceeds it is reported in `failures` and
+    returns empty text, and the worker pool is replaced so the stuck process doesn't
+    hold up the files queued after it.
+    Worker processes rebuild the extractor from its settings and handlers, so
+    handlers must be picklable (module-level functions or methods of the extractor);
+    with a lambda or closure registered, extraction runs in-process instead. The
+    pool is kept between calls and shut down by `close()`.
+    ocr_workers / ocr_page_window / ocr_dpi: OCR is applied only to PDF pages without a
+    text layer, rasterizing `ocr_page_window` pages at a time at `ocr_dpi` and OCR'ing
+    them on `ocr_workers` threads (0 = one per CPU).
     """
 
-    def __init__(self, enable_ocr: Optional[bool] = None):
+    def __init__(
+        self,
+        enable_ocr: Optional[bool] = None,
+        cache_dir: str | None = None,
+        workers: int = 1,
+        timeout: float | None = None,
+        ocr_workers: int = 0,
+        ocr_page_window: int = 8,
+        ocr_dpi: int = 200,
+    ):
         self.native_bins = check_native_binaries()
         if enable_ocr is None:
             self.enable_ocr = bool(
@@ -82,12 +208,95 @@ class DocumentExtractor:
             ".txt": self._handle_text,
             ".md": self._handle_text,
         }
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.timeout = timeout
+        self.ocr_workers = ocr_workers if ocr_workers > 0 else (os.cpu_count() or 1)
+        self.ocr_page_window = max(1, ocr_page_window)
+        self.ocr_dpi = ocr_dpi
+        # (path, reason) for files that failed in the last extract_many/load_folder call
+        self.failures: List[Tuple[str, str]] = []
+        # Worker pool reused across parallel calls; the lock marks it as in use
+        self._pool: _ExtractPool | None = None
+        self._pool_lock = threading.Lock()
+
+    def close(self):
+        """Shut down the worker pool kept for parallel extraction, if any."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+    def _worker_config(self) -> bytes | None:
+        """Pickled settings and handlers a worker process rebuilds this extractor from.
+
+        None when a handler cannot be pickled (e.g. a lambda or closure).
+        """
+        methods, handlers = {}, {}
+        for ext, fn in self.handlers.items():
+            if getattr(fn, "__self__", None) is self:
+                methods[ext] = fn.__name__
+            else:
+                handlers[ext] = fn
+        config = {
+            "cls": type(self),
+            "options": {
+                "enable_ocr": self.enable_ocr,
+                "cache_dir": self.cache.directory if self.cache else None,
+                "ocr_workers": self.ocr_workers,
+                "ocr_page_window": self.ocr_page_window,
+                "ocr_dpi": self.ocr_dpi,
+            },
+            "methods": methods,
+            "handlers": handlers,
+        }
+        try:
+            return pickle.dumps(config)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            logger.warning(
+                f"Extraction handlers can't be sent to worker processes ({e}); "
+                "extracting in-process."
+            )
+            return None
+
+    @classmethod
+    def _from_worker_config(cls, config: Dict[str, Any]) -> "DocumentExtractor":
+        extractor = config["cls"](**config["options"])
+        extractor.handlers = {
+            **{
+                ext: getattr(extractor, name) for ext, name in config["methods"].items()
+            },
+            **config["handlers"],
+        }
+        return extractor
 
     def register_handler(self, ext: str, fn: Callable[[str], str]):
         """Register a custom handler for file extension (ext should include leading dot)."""
         self.handlers[ext.lower()] = fn
 
+    def cache_settings(self, path: str) -> Dict[str, object]:
+        """Settings that affect the extraction result of ``path`` (part of the cache key)."""
+        _, ext = os.path.splitext(path)
+        handler = self.handlers.get(ext.lower())
+        return {
+            "version": EXTRACTOR_VERSION,
+            "enable_ocr": self.enable_ocr,
+            "ocr_dpi": self.ocr_dpi if self.enable_ocr else None,
+            "handler": getattr(handler, "__qualname__", None) if handler else None,
+        }
+
     def extract(self, path: str) -> str:
+        """Extract text from a single file path, consulting the extraction cache first."""
+        if self.cache is None:
+            return self._extract_uncached(path)
+        settings = self.cache_settings(path)
+        text = self.cache.get(path, settings)
+        if text is None:
+            text = self._extract_uncached(path)
+            self.cache.put(path, settings, text)
+        return text
+
+    def _extract_uncached(self, path: str) -> str:
         """Extract text from a single file path using the registered handlers and sensible fallbacks."""
         _, ext = os.path.splitext(path)
         ext = ext.lower()
@@ -105,15 +314,140 @@ class DocumentExtractor:
         except Exception:
             return ""
 
-    def load_folder(self, folder_path: str) -> List[Dict[str, str]]:
-        """Walk a folder and return list of {'path': path, 'text': text} for readable documents."""
-        docs = []
+    def iter_extract(
+        self, paths: Iterable[str], parallel: bool = True
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield ``(path, text)`` in input order, extracting in parallel when `workers` > 1.
+
+        At most ``2 * workers`` files are in flight at once, so a caller consuming the
+        generator holds only a bounded number of extracted texts in memory.
+        """
+        self.failures = []
+        if not parallel or self.workers <= 1:
+            for path in paths:
+                yield path, self.extract(path)
+            return
+
+        config = self._worker_config()
+        if config is None:
+            for path in paths:
+                yield path, self.extract(path)
+            return
+
+        # Spawned, not forked: extraction also runs from threads of the QA server,
+        # and forking a multi-threaded process can deadlock the child. Spawning is
+        # slow, so the pool is kept for the next call unless another call is using it
+        shared = self._pool_lock.acquire(blocking=False)
+        if shared:
+            if self._pool is not None and self._pool._config != config:
+                # Handlers or settings changed since the pool was started
+                self._pool.close()
+                self._pool = None
+            if self._pool is None:
+                self._pool = _ExtractPool(config, self.workers)
+            runner = self._pool
+        else:
+            runner = _ExtractPool(config, self.workers)
+        # Task number -> time a worker picked the file up
+        start_times: Dict[int, float] = {}
+        # [task number, path, cached text or AsyncResult], in input order
+        window: Deque[List[Any]] = deque()
+
+        def submit(entry: List[Any]):
+            runner.start()
+            entry[2] = runner.pool.apply_async(_extract_in_worker, (entry[0], entry[1]))
+
+        def restart_pool():
+            # terminate() is the only way to stop a worker stuck on a pathological
+            # file; unfinished files queued behind it are handed to the new pool
+            runner.close(terminate=True)
+            for entry in window:
+                if not isinstance(entry[2], str) and not entry[2].ready():
+                    start_times.pop(entry[0], None)
+                    submit(entry)
+
+        def expired(seq: int) -> bool:
+            while not runner.started.empty():
+                start_times.setdefault(runner.started.get(), time.monotonic())
+            began = start_times.get(seq)
+            return began is not None and time.monotonic() - began > self.timeout
+
+        def resolve(entry: List[Any]) -> str:
+            seq, path, pending = entry
+            if isinstance(pending, str):
+                return pending
+            try:
+                if self.timeout is None:
+                    return pending.get() or ""
+                while True:
+                    try:
+                        return pending.get(timeout=_TIMEOUT_POLL) or ""
+                    except multiprocessing.TimeoutError:
+                        if expired(seq):
+                            break
+            except Exception as e:
+                self._record_failure(path, f"{type(e).__name__}: {e}")
+                return ""
+            finally:
+                start_times.pop(seq, None)
+            self._record_failure(path, f"timed out after {self.timeout}s")
+            restart_pool()
+            return ""
+
+        try:
+            for seq, path in enumerate(paths):
+                # Cache hits are cheap; only ship misses to the worker pool
+                text = None
+                if self.cache is not None:
+                    text = self.cache.get(path, self.cache_settings(path))
+                entry = [seq, path, text]
+                if text is None:
+                    submit(entry)
+                window.append(entry)
+                while len(window) > 2 * self.workers:
+                    entry = window.popleft()
+                    yield entry[1], resolve(entry)
+            while window:
+                entry = window.popleft()
+                yield entry[1], resolve(entry)
+        finally:
+            # The generator may be closed early with files still in flight
+            if window or not shared:
+                runner.close(terminate=bool(window))
+            if shared:
+                self._pool_lock.release()
+
+    def extract_many(self, paths: Sequence[str]) -> List[str]:
+        """Extract many files, in parallel when `workers` > 1; results follow input order."""
+        paths = list(paths)
+        return [text for _, text in self.iter_extract(paths, parallel=len(paths) > 1)]
+
+    def _record_failure(self, path: str, reason: str):
+        self.failures.append((path, reason))
+        logger.warning(f"Extraction failed for '{path}': {reason}")
+
+    @staticmethod
+    def _walk(folder_path: str) -> Iterator[str]:
         for root, _, files in os.walk(folder_path):
             for fname in files:
-                path = os.path.join(root, fname)
-                text = self.extract(path)
-                docs.append({"path": path, "text": text})
-        return docs
+                yield os.path.join(root, fname)
+
+    def iter_folder(self, folder_path: str) -> Iterator[Dict[str, str]]:
+        """Walk a folder and yield {'path': path, 'text': text} as files are extracted."""
+        for path, text in self.iter_extract(self._walk(folder_path)):
+            yield {"path": path, "text": text}
+
+    def load_folder(self, folder_path: str) -> List[Dict[str, str]]:
+        """Walk a folder and return list of {'path': path, 'text': text} for readable documents."""
+        paths = list(self._walk(folder_path))
+        started = time.perf_counter()
+        texts = self.extract_many(paths)
+        if self.workers > 1:
+            logger.info(
+                f"Extracted {len(paths)} files with {self.workers} workers in "
+                f"{time.perf_counter() - started:.1f}s ({len(self.failures)} failed)."
+            )
+        return [{"path": path, "text": text} for path, text in zip(paths, texts)]
 
     # --- Handlers ---
     def _handle_text(self, path: str) -> str:
@@ -198,27 +532,55 @@ class DocumentExtractor:
         return "\n".join([p for p in parts if p])
 
     def _handle_pdf(self, path: str) -> str:
-        text = _extract_pdf_text_simple(path)
-        if text.strip():
-            return text
-        if not self.enable_ocr:
-            return text
-
-        # Try OCR path
+        # Pages are separated with form feeds so chunking can recover page numbers
+        pages = _extract_pdf_pages(path)
+        if pages is None:
+            # Unparseable text layer: OCR every page if we can count them
+            pages = [""] * (_pdf_page_count(path) if self.enable_ocr else 0)
+        missing = [i + 1 for i, text in enumerate(pages) if not text.strip()]
+        if missing and self.enable_ocr:
+            for page_no, text in self._ocr_pages(path, missing).items():
+                pages[page_no - 1] = text
+        return "\f".join(pages)
+
+    def _ocr_pages(self, path: str, page_numbers: List[int]) -> Dict[int, str]:
+        """OCR the given 1-based pages, rasterizing at most `ocr_page_window` pages at a time.
+
+        Each window is rendered with one `convert_from_path(first_page, last_page)` call
+        and its pages are OCR'd concurrently (tesseract runs as a subprocess, so threads
+        are enough to use several cores). Images are dropped before the next window is
+        rendered, which bounds memory regardless of the document length.
+        """
         try:
             import pytesseract  # type: ignore
             from pdf2image import convert_from_path  # type: ignore
+        except Exception:
+            return {}
 
-            images = convert_from_path(path)
-            texts = []
-            for img in images:
+        def ocr(img) -> str:
+            try:
+                return pytesseract.image_to_string(img)
+            except Exception:
+                return ""
+
+        results: Dict[int, str] = {}
+        workers = max(1, min(self.ocr_workers, len(page_numbers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+            for window in _page_windows(page_numbers, self.ocr_page_window):
                 try:
-                    texts.append(pytesseract.image_to_string(img))
+                    images = convert_from_path(
+                        path,
+                        dpi=self.ocr_dpi,
+                        first_page=window[0],
+                        last_page=window[-1],
+                        thread_count=min(workers, len(window)),
+                    )
                 except Exception:
-                    texts.append("")
-            return "\n".join(texts)
-        except Exception:
-            return text
+                    continue
+                for page_no, text in zip(window, pool.map(ocr, images)):
+                    results[page_no] = text
+                del images
+        return results
 
 
 # Backwards-compatible helpers
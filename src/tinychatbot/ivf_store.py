@@ -0,0 +1,249 @@
+"""Pure-NumPy IVF (inverted file) index: ``VECTOR_PROVIDER=ivf``.
+
+For deployments that cannot install ``faiss-cpu``. Vectors are clustered with
+spherical k-means into ``nlist`` lists; a query scores the centroids and then only
+the vectors of the ``nprobe`` closest lists, so search cost grows with
+``n * nprobe / nlist`` instead of ``n``.
+"""
+import os
+from array import array
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .config import Config
+from .numpy_store import NumpyVectorStore
+from .persistence import atomic_write
+
+CENTROIDS_FILE = "ivf_centroids.f32"
+ASSIGN_FILE = "ivf_assign.i32"
+
+_KMEANS_ITERATIONS = 10
+# Training sample size per list (FAISS uses up to 256)
+_SAMPLES_PER_LIST = 64
+# Re-cluster once the store has grown this much since the last training
+_RETRAIN_GROWTH = 4
+_ASSIGN_BLOCK = 8192
+
+
+class IVFVectorStore(NumpyVectorStore):
+    """``NumpyVectorStore`` with a k-means coarse quantizer and inverted lists.
+
+    Storage, quantization, rescoring and persistence are inherited; this class only
+    decides which rows a query scores. Below ``min_train`` vectors every query is an
+    exact scan. Once that many vectors are stored the lists are trained
+    (``nlist`` defaults to ``4 * sqrt(n)``) and are re-trained whenever the corpus
+    has grown ``_RETRAIN_GROWTH``-fold, so lists stay balanced and the number of
+    scanned rows grows roughly with ``sqrt(n)``.
+
+    Inserts are assigned to their nearest centroid and deletes unlink the row from
+    its list, both in O(1) besides the centroid scoring.
+    """
+
+    PROVIDER = "ivf"
+
+    def __init__(
+        self,
+        nlist: int | None = None,
+        nprobe: int | None = None,
+        min_train: int | None = None,
+        **kwargs: Any,
+    ):
+        self.nlist = Config.IVF_NLIST if nlist is None else nlist
+        self.nprobe = max(1, nprobe or Config.IVF_NPROBE)
+        self.min_train = max(1, min_train or Config.IVF_MIN_TRAIN)
+        super().__init__(**kwargs)
+
+    def clear(self):
+        super().clear()
+        self._centroids: np.ndarray | None = None
+        self._trained_size = 0
+        # Per slot: inverted list number (-1 = not in any list) and position in it
+        self._assign = np.full(0, -1, dtype=np.int32)
+        self._list_pos = np.zeros(0, dtype=np.int64)
+        self._lists: List[array] = []
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    # --- row bookkeeping (hooks called by NumpyVectorStore) ---
+    def _ensure_capacity(self, needed: int):
+        super()._ensure_capacity(needed)
+        capacity = self._matrix.shape[0]
+        if len(self._assign) < capacity:
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[: len(self._assign)] = self._assign
+            pos = np.zeros(capacity, dtype=np.int64)
+            pos[: len(self._list_pos)] = self._list_pos
+            self._assign, self._list_pos = assign, pos
+
+    def _write_rows(self, slots, mat: np.ndarray):
+        super()._write_rows(slots, mat)
+        if not self.trained:
+            if self._size >= self.min_train:
+                self.train()
+            return
+        if self._size >= self._trained_size * _RETRAIN_GROWTH:
+            self.train()
+            return
+        for slot in slots:
+            self._unlink(slot)
+        self._link(slots, self._nearest(mat, self._centroids))
+
+    def _move_row(self, src: int, dst: int):
+        super()._move_row(src, dst)
+        # ``dst`` was unlinked by delete(); the moved row takes over src's list entry
+        lst = int(self._assign[src])
+        if lst >= 0:
+            pos = int(self._list_pos[src])
+            self._lists[lst][pos] = dst
+            self._list_pos[dst] = pos
+        self._assign[dst] = lst
+        self._assign[src] = -1
+
+    def delete(self, id: str) -> bool:
+        slot = self._slots.get(id)
+        if slot is None:
+            return False
+        self._unlink(slot)
+        return super().delete(id)
+
+    def _unlink(self, slot: int):
+        lst = int(self._assign[slot])
+        if lst < 0:
+            return
+        members = self._lists[lst]
+        pos = int(self._list_pos[slot])
+        tail = members[-1]
+        members[pos] = tail
+        self._list_pos[tail] = pos
+        members.pop()
+        self._assign[slot] = -1
+
+    def _link(self, slots, lists: np.ndarray):
+        for slot, lst in zip(slots, lists.tolist()):
+            members = self._lists[lst]
+            self._list_pos[slot] = len(members)
+            members.append(slot)
+            self._assign[slot] = lst
+
+    def _build_lists(self, labels: np.ndarray):
+        """Rebuild all inverted lists from per-slot list numbers (vectorized)."""
+        n = len(labels)
+        nlist = len(self._centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self._lists = [
+            array("I", order[start : start + count].astype(np.uint32).tobytes())
+            for start, count in zip(starts.tolist(), counts.tolist())
+        ]
+        self._assign[:n] = labels
+        self._list_pos[order] = np.arange(n) - np.repeat(starts, counts)
+
+    # --- clustering ---
+    @staticmethod
+    def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(data), dtype=np.int32)
+        for start in range(0, len(data), _ASSIGN_BLOCK):
+            block = data[start : start + _ASSIGN_BLOCK]
+            labels[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    @staticmethod
+    def _unit(rows: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return rows / norms
+
+    def train(self):
+        """(Re)cluster the stored vectors and rebuild the inverted lists."""
+        n = self._size
+        if n == 0:
+            return
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(0)
+        sample = np.sort(
+            rng.choice(n, size=min(n, nlist * _SAMPLES_PER_LIST), replace=False)
+        )
+        data = self._unit(self._decode(sample))
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = self._nearest(data, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            order = np.argsort(labels, kind="stable")
+            used = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[used]
+            sums = np.zeros_like(centroids)
+            sums[used] = np.add.reduceat(data[order], starts, axis=0)
+            empty = ~used
+            # Re-seed empty lists with random sample points
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+            centroids = self._unit(sums)
+        self._centroids = centroids.astype(np.float32)
+
+        labels = np.empty(n, dtype=np.int32)
+        for start in range(0, n, _ASSIGN_BLOCK):
+            end = min(n, start + _ASSIGN_BLOCK)
+            labels[start:end] = self._nearest(
+                self._decode(np.arange(start, end)), self._centroids
+            )
+        self._build_lists(labels)
+        self._trained_size = n
+
+    # --- search ---
+    def _candidates(
+        self, q: np.ndarray, top_k: int, allowed: np.ndarray | None
+    ) -> np.ndarray | None:
+        if not self.trained:
+            return allowed
+        probe = self._top(self._centroids @ q, self.nprobe)
+        members = [np.frombuffer(self._lists[lst], dtype=np.uint32) for lst in probe]
+        probed = np.concatenate(members).astype(np.int64)
+        if allowed is None:
+            return probed
+        mask = np.zeros(self._size, dtype=bool)
+        mask[allowed] = True
+        probed = probed[mask[probed]]
+        # Narrow filters may have too few rows in the probed lists: scan them all
+        return probed if len(probed) >= top_k else allowed
+
+    # --- persistence ---
+    def save(self, directory: str, **manifest: Any):
+        """Save rows via ``NumpyVectorStore.save`` plus the centroids and list assignment."""
+        if self.trained:
+            centroids = np.ascontiguousarray(self._centroids, dtype=np.float32)
+            assign = np.ascontiguousarray(self._assign[: self._size], dtype=np.int32)
+            atomic_write(os.path.join(directory, CENTROIDS_FILE), centroids.tofile)
+            atomic_write(os.path.join(directory, ASSIGN_FILE), assign.tofile)
+        super().save(
+            directory,
+            **manifest,
+            ivf_nlist=len(self._centroids) if self.trained else 0,
+            ivf_trained_size=self._trained_size,
+        )
+
+    def load(self, directory: str) -> Dict[str, Any] | None:
+        manifest = super().load(directory)
+        if manifest is None:
+            return None
+        nlist = int(manifest.get("ivf_nlist") or 0)
+        if not nlist:
+            return manifest
+        try:
+            centroids = np.fromfile(
+                os.path.join(directory, CENTROIDS_FILE), dtype=np.float32
+            )
+            labels = np.fromfile(os.path.join(directory, ASSIGN_FILE), dtype=np.int32)
+            if centroids.size != nlist * self.dim or labels.size != self._size:
+                raise ValueError("IVF structure does not match the saved vectors")
+        except (OSError, ValueError):
+            self.clear()
+            return None
+        self._ensure_capacity(self._size)
+        self._centroids = centroids.reshape(nlist, self.dim)
+        self._build_lists(labels)
+        self._trained_size = int(manifest.get("ivf_trained_size") or self._size)
+        return manifest
@@ -1,16 +1,96 @@
+import asyncio
+import itertools
 import os
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Tuple
+
+from loguru import logger
+
+
+def _estimate_tokens(text: str) -> int:
+    """Conservative token estimate (~3 characters per token) used for batch budgeting."""
+    return len(text) // 3 + 1
+
+
+def plan_batches(
+    texts: List[str], max_items: int, max_tokens: int
+) -> List[Tuple[int, int]]:
+    """Split ``texts`` into contiguous ``(start, end)`` ranges bounded by count and tokens.
+
+    A single text larger than ``max_tokens`` still gets its own batch; the provider
+    decides whether it is acceptable.
+    """
+    batches: List[Tuple[int, int]] = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        cost = _estimate_tokens(text)
+        if i > start and (i - start >= max_items or tokens + cost > max_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Whether a failed embedding request is worth retrying.
+
+    Only rate limits, timeouts, connection and server errors are; anything else
+    (bad request, auth, permission, context length) fails the same way on every
+    attempt, so it is raised immediately instead of being retried.
+    """
+    import openai
+
+    return isinstance(
+        error,
+        (
+            openai.RateLimitError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.InternalServerError,
+        ),
+    )
+
+
+def _backoff(error: BaseException, attempt: int, retries: int, size: int) -> float:
+    """Seconds to wait before retrying a failed batch of ``size`` texts.
+
+    Re-raises ``error`` when it is not transient or ``retries`` are used up.
+    """
+    if not _is_transient(error) or attempt >= retries:
+        raise error
+    delay = min(2**attempt, 30)
+    logger.warning(
+        f"Embedding batch of {size} failed ({error}); retry {attempt + 1}/{retries} in {delay}s"
+    )
+    return delay
+
+
+def _check_vectors(vectors: List[List[float]], texts: List[str]) -> List[List[float]]:
+    """Reject a response that would misalign vectors with their texts."""
+    if len(vectors) != len(texts):
+        raise ValueError(
+            f"Embedding provider returned {len(vectors)} vectors for {len(texts)} texts"
+        )
+    return vectors
 
 
 class LLMClient:
     """Adapter for multiple LLM providers. For now, only wraps OpenAI via 'openai' package.
 
+    ``achat``/``aembed``/``achat_stream`` are the asyncio counterparts used by the
+    async QA endpoints; they share one ``AsyncOpenAI`` client whose HTTP connection
+    pool (``LLM_MAX_CONNECTIONS``) is reused across requests.
+
     Future: add Anthropic, Google, HF adapters under the same interface.
     """
 
     def __init__(self):
         provider = os.getenv("LLM_PROVIDER", "openai").lower()
         self.provider = provider
+        self._async_client: Any = None
         if provider == "openai":
             # Lazy import to avoid hard dependency during package import
             from openai import OpenAI
@@ -19,17 +99,171 @@ class LLMClient:
         else:
             raise NotImplementedError(f"LLM provider '{provider}' not implemented yet")
 
+    @property
+    def async_client(self):
+        """Shared ``AsyncOpenAI`` client, created on first use."""
+        if self._async_client is None:
+            if self.provider != "openai":
+                raise NotImplementedError()
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            from .config import Config
+
+            limit = max(1, Config.LLM_MAX_CONNECTIONS)
+            self._async_client = AsyncOpenAI(
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=limit, max_keepalive_connections=limit
+                    )
+                )
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """Close the async client's connection pool (e.g. on app shutdown)."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
     def chat(self, messages: List[dict], **kwargs) -> dict:
         if self.provider == "openai":
+            from .config import Config
+
+            kwargs.setdefault("model", Config.LLM_MODEL)
             return self.client.chat.completions.create(messages=messages, **kwargs)
         raise NotImplementedError()
 
-    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+    def chat_stream(self, messages: List[dict], **kwargs) -> Iterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive."""
+        if self.provider == "openai":
+            from .config import Config
+
+            kwargs.setdefault("model", Config.LLM_MODEL)
+            stream = self.client.chat.completions.create(
+                messages=messages, stream=True, **kwargs
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+        raise NotImplementedError()
+
+    async def achat(self, messages: List[dict], **kwargs) -> Any:
         if self.provider == "openai":
             from .config import Config
 
-            resp = self.client.embeddings.create(
-                input=texts, model=kwargs.get("model", Config.EMBEDDING_MODEL)
+            kwargs.setdefault("model", Config.LLM_MODEL)
+            return await self.async_client.chat.completions.create(
+                messages=messages, **kwargs
             )
-            return [d.embedding for d in resp.data]
         raise NotImplementedError()
+
+    async def achat_stream(self, messages: List[dict], **kwargs) -> AsyncIterator[str]:
+        """Async ``chat_stream``: yields content deltas as they arrive."""
+        if self.provider != "openai":
+            raise NotImplementedError()
+        from .config import Config
+
+        kwargs.setdefault("model", Config.LLM_MODEL)
+        stream = await self.async_client.chat.completions.create(
+            messages=messages, stream=True, **kwargs
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        resp = self.client.embeddings.create(input=texts, model=model)
+        return [d.embedding for d in resp.data]
+
+    def _embed_batch_with_retry(
+        self, texts: List[str], model: str, retries: int
+    ) -> List[List[float]]:
+        for attempt in itertools.count():
+            try:
+                return _check_vectors(self._embed_batch(texts, model), texts)
+            except Exception as e:
+                time.sleep(_backoff(e, attempt, retries, len(texts)))
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Embed ``texts`` in batches, preserving input order.
+
+        Inputs are split by ``EMBED_BATCH_SIZE`` items and ``EMBED_MAX_BATCH_TOKENS``
+        estimated tokens per request, and batches run concurrently on a thread pool of
+        ``EMBED_CONCURRENCY`` workers. A batch hitting a rate limit, timeout, connection
+        or server error is retried on its own (with exponential backoff, up to
+        ``EMBED_MAX_RETRIES`` times) without redoing the batches that succeeded; other
+        errors are raised at once.
+        """
+        if self.provider == "openai":
+            from .config import Config
+
+            model = kwargs.get("model", Config.EMBEDDING_MODEL)
+            batch_size = kwargs.get("batch_size", Config.EMBED_BATCH_SIZE)
+            max_tokens = kwargs.get("max_batch_tokens", Config.EMBED_MAX_BATCH_TOKENS)
+            concurrency = kwargs.get("concurrency", Config.EMBED_CONCURRENCY)
+            retries = kwargs.get("max_retries", Config.EMBED_MAX_RETRIES)
+
+            texts = list(texts)
+            batches = plan_batches(texts, max(1, batch_size), max(1, max_tokens))
+            results: List[List[float]] = [[] for _ in texts]
+
+            def run(span: Tuple[int, int]):
+                start, end = span
+                vectors = self._embed_batch_with_retry(texts[start:end], model, retries)
+                results[start:end] = vectors
+
+            if len(batches) <= 1 or concurrency <= 1:
+                for span in batches:
+                    run(span)
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=min(concurrency, len(batches)),
+                    thread_name_prefix="embed",
+                ) as pool:
+                    # list() re-raises the first batch that failed after retries
+                    list(pool.map(run, batches))
+            return results
+        raise NotImplementedError()
+
+    async def _aembed_batch_with_retry(
+        self, texts: List[str], model: str, retries: int
+    ) -> List[List[float]]:
+        for attempt in itertools.count():
+            try:
+                resp = await self.async_client.embeddings.create(
+                    input=texts, model=model
+                )
+                return _check_vectors([d.embedding for d in resp.data], texts)
+            except Exception as e:
+                await asyncio.sleep(_backoff(e, attempt, retries, len(texts)))
+
+    async def aembed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Async ``embed``: same batching and retries, with at most ``EMBED_CONCURRENCY``
+        batches of one call in flight.
+        """
+        if self.provider != "openai":
+            raise NotImplementedError()
+        from .config import Config
+
+        model = kwargs.get("model", Config.EMBEDDING_MODEL)
+        batch_size = kwargs.get("batch_size", Config.EMBED_BATCH_SIZE)
+        max_tokens = kwargs.get("max_batch_tokens", Config.EMBED_MAX_BATCH_TOKENS)
+        concurrency = kwargs.get("concurrency", Config.EMBED_CONCURRENCY)
+        retries = kwargs.get("max_retries", Config.EMBED_MAX_RETRIES)
+
+        texts = list(texts)
+        batches = plan_batches(texts, max(1, batch_size), max(1, max_tokens))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(span: Tuple[int, int]) -> List[List[float]]:
+            start, end = span
+            async with semaphore:
+                return await self._aembed_batch_with_retry(
+                    texts[start:end], model, retries
+                )
+
+        # gather() re-raises the first batch that failed after retries
+        parts = await asyncio.gather(*(run(span) for span in batches))
+        return [vector for part in parts for vector in part]
@@ -0,0 +1,215 @@
+"""Columnar chunk metadata for the vector stores.
+
+Instead of one dict per vector, metadata is kept as parallel NumPy columns keyed by
+an integer row (a store slot or FAISS id): the source path as an id into a table of
+interned strings, and int32 columns for page, paragraph, chunk index and the chunk's
+character offsets into its document. Dicts are only built by ``get()``, i.e. for the
+hits a query actually returns.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# Integer fields stored as int32 columns (-1 = missing)
+COLUMNS = ("page", "para", "para_end", "chunk_index", "start", "end")
+
+_MISSING = -1
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def _fits_column(value: Any) -> bool:
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and 0 <= value <= _INT32_MAX
+    )
+
+
+class MetadataTable:
+    """Chunk metadata stored column-wise and materialized on demand.
+
+    ``source`` strings are interned, so every chunk of a document shares one path
+    string. Fields that don't fit the columns (e.g. the ``sources`` list of a
+    deduplicated chunk, or arbitrary caller metadata) are kept in a per-row dict
+    only for the rows that have them.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, row: int) -> bool:
+        return 0 <= row < len(self._present) and bool(self._present[row])
+
+    def clear(self):
+        self._sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._source_col = np.full(0, _MISSING, dtype=np.int32)
+        self._columns = {name: np.full(0, _MISSING, dtype=np.int32) for name in COLUMNS}
+        self._present = np.zeros(0, dtype=bool)
+        self._extra: Dict[int, Dict[str, Any]] = {}
+        self._count = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (excluding interned strings and extra fields)."""
+        return (
+            self._source_col.nbytes
+            + self._present.nbytes
+            + sum(col.nbytes for col in self._columns.values())
+        )
+
+    def _ensure_capacity(self, row: int):
+        capacity = len(self._present)
+        if row < capacity:
+            return
+        new_capacity = max(1024, capacity)
+        while new_capacity <= row:
+            new_capacity *= 2
+
+        def grow(col: np.ndarray, fill) -> np.ndarray:
+            grown = np.full(new_capacity, fill, dtype=col.dtype)
+            grown[:capacity] = col
+            return grown
+
+        self._source_col = grow(self._source_col, _MISSING)
+        self._columns = {
+            name: grow(col, _MISSING) for name, col in self._columns.items()
+        }
+        self._present = grow(self._present, False)
+
+    def _intern(self, source: str) -> int:
+        sid = self._source_ids.get(source)
+        if sid is None:
+            sid = self._source_ids[source] = len(self._sources)
+            self._sources.append(source)
+        return sid
+
+    def set(self, row: int, meta: Dict[str, Any]):
+        """Store ``meta`` at ``row``, replacing whatever was there."""
+        self._ensure_capacity(row)
+        if not self._present[row]:
+            self._present[row] = True
+            self._count += 1
+        extra: Dict[str, Any] = {}
+        source = meta.get("source")
+        if isinstance(source, str):
+            self._source_col[row] = self._intern(source)
+        else:
+            self._source_col[row] = _MISSING
+            if "source" in meta:
+                extra["source"] = source
+        for name, col in self._columns.items():
+            value = meta.get(name)
+            if _fits_column(value):
+                col[row] = value
+            else:
+                col[row] = _MISSING
+                if name in meta:
+                    extra[name] = value
+        for key, value in meta.items():
+            if key != "source" and key not in self._columns:
+                extra[key] = value
+        if extra:
+            self._extra[row] = extra
+        else:
+            self._extra.pop(row, None)
+
+    def get(self, row: int) -> Dict[str, Any] | None:
+        """Materialize the metadata dict of ``row`` (None if the row is empty)."""
+        if row not in self:
+            return None
+        meta: Dict[str, Any] = {}
+        sid = int(self._source_col[row])
+        if sid != _MISSING:
+            meta["source"] = self._sources[sid]
+        for name, col in self._columns.items():
+            value = int(col[row])
+            if value != _MISSING:
+                meta[name] = value
+        extra = self._extra.get(row)
+        if extra:
+            meta.update(extra)
+        return meta
+
+    def remove(self, row: int):
+        if row not in self:
+            return
+        self._present[row] = False
+        self._source_col[row] = _MISSING
+        for col in self._columns.values():
+            col[row] = _MISSING
+        self._extra.pop(row, None)
+        self._count -= 1
+
+    def move(self, src: int, dst: int):
+        """Re-key row ``src`` as ``dst``, overwriting ``dst``."""
+        self.remove(dst)
+        if src not in self:
+            return
+        self._ensure_capacity(dst)
+        self._source_col[dst] = self._source_col[src]
+        for col in self._columns.values():
+            col[dst] = col[src]
+        extra = self._extra.pop(src, None)
+        if extra is not None:
+            self._extra[dst] = extra
+        self._present[dst] = True
+        self._present[src] = False
+        self._source_col[src] = _MISSING
+        for col in self._columns.values():
+            col[src] = _MISSING
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield ``(row, metadata)`` for every stored row (materializes each dict)."""
+        for row in np.flatnonzero(self._present).tolist():
+            yield row, self.get(row)
+
+    # --- persistence ---
+    def save(self, fh, **attrs: Any):
+        """Write the table (plus JSON-serializable ``attrs``) as one ``.npz`` to ``fh``."""
+        rows = np.flatnonzero(self._present).astype(np.int64)
+        header = {
+            "sources": self._sources,
+            "extra": {str(row): self._extra[row] for row in self._extra},
+            "attrs": attrs,
+        }
+        blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        np.savez(
+            fh,
+            rows=rows,
+            source=self._source_col[rows],
+            header=np.frombuffer(blob, dtype=np.uint8),
+            **{name: col[rows] for name, col in self._columns.items()},
+        )
+
+    def load(self, path: str) -> Dict[str, Any] | None:
+        """Replace the contents with a table saved by ``save()``; returns its ``attrs``.
+
+        Returns None (leaving the table untouched) if the file is missing or corrupt.
+        """
+        try:
+            with np.load(path) as data:
+                rows = data["rows"].astype(np.int64)
+                source = data["source"].astype(np.int32)
+                columns = {name: data[name].astype(np.int32) for name in COLUMNS}
+                header = json.loads(data["header"].tobytes().decode("utf-8"))
+        except (OSError, ValueError, KeyError):
+            return None
+        if any(len(col) != len(rows) for col in (source, *columns.values())):
+            return None
+        self.clear()
+        self._sources = list(header.get("sources") or [])
+        self._source_ids = {s: sid for sid, s in enumerate(self._sources)}
+        if len(rows):
+            self._ensure_capacity(int(rows.max()))
+            self._source_col[rows] = source
+            for name, col in columns.items():
+                self._columns[name][rows] = col
+            self._present[rows] = True
+        self._count = len(rows)
+        self._extra = {int(row): e for row, e in (header.get("extra") or {}).items()}
+        return header.get("attrs") or {}
@@ -0,0 +1,511 @@
+"""Dense in-memory vector store backed by a contiguous NumPy matrix."""
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .config import Config
+from .filters import FilterIndex, MetadataFilter
+from .metadata_table import MetadataTable
+from .persistence import atomic_write, read_manifest, write_manifest
+
+EMBEDDINGS_FILE = "embeddings.f32"
+METADATA_FILE = "metadata.npz"
+CODES_FILE = "codes.{}.bin"
+SCALES_FILE = "scales.f32"
+
+QUANTIZATIONS = ("none", "float16", "int8", "binary")
+# Rows scored at a time when scanning float16/int8/binary codes
+_SCORE_BLOCK = 8192
+# Number of set bits for every byte value, for NumPy < 2.0 (no np.bitwise_count)
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(
+    axis=1, dtype=np.uint16
+)
+
+
+def _hamming(codes: np.ndarray, code: np.ndarray) -> np.ndarray:
+    """Hamming distance between each packed bit row of ``codes`` and ``code``."""
+    diff = codes ^ code
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[diff].sum(axis=1, dtype=np.int32)
+
+
+class NumpyVectorStore:
+    """In-memory vector store that keeps embeddings in a pre-normalized float32 matrix.
+
+    Vectors are L2-normalized on insert so cosine similarity becomes a plain dot
+    product, and ``query`` scores the whole corpus with a single matrix-vector
+    product followed by ``argpartition`` for the top-k selection.
+
+    The matrix grows geometrically (doubling) as vectors are added, so inserts
+    are amortized O(1) without reallocating on every call.
+
+    Chunk metadata is kept column-wise in a ``MetadataTable`` (interned source
+    paths, int32 page/paragraph/offset columns); dicts are only built for hits.
+
+    ``save()``/``load()`` persist the store as a raw float32 matrix, the columnar
+    metadata table and a manifest. ``load()`` maps the matrix with ``np.memmap``
+    in copy-on-write mode, so several worker processes on one host share the same
+    page-cached file until one of them modifies its copy.
+
+    ``quantization`` trades accuracy for memory (bytes per 1536-dim vector):
+      - ``none``: float32, exact (6 KB).
+      - ``float16``: half precision (3 KB), scores within ~1e-3 of exact.
+      - ``int8``: symmetric per-vector scale (1.5 KB + 4 bytes); the query is
+        quantized too and scored with an int32-accumulated dot product.
+      - ``binary``: one sign bit per dimension (192 bytes), ranked by Hamming
+        distance; scores are a coarse estimate unless rescoring is enabled.
+    Only float32 scoring goes through BLAS. NumPy has no half-precision or int8
+    GEMV, so on 100k x 1536 (single core, ``scripts/bench_quantization.py``) a
+    query takes ~47 ms exact, ~365 ms float16, ~83 ms int8 (recall@10 0.98) and
+    ~13 ms binary (recall@10 0.32, 0.72 with rescoring). float16 and int8 save
+    memory at the cost of latency; binary is both smaller and faster.
+    With ``rescore=True`` a float32 copy is kept as well (on disk and memory-mapped
+    after ``load()``), and the best ``top_k * rescore_factor`` candidates from the
+    quantized scan are re-ranked with exact dot products.
+    """
+
+    # Provider name recorded in (and required from) saved manifests
+    PROVIDER = "numpy"
+
+    def __init__(
+        self,
+        dim: int | None = None,
+        initial_capacity: int = 1024,
+        quantization: str | None = None,
+        rescore: bool | None = None,
+        rescore_factor: int | None = None,
+    ):
+        quantization = (quantization or Config.VECTOR_QUANTIZATION).lower()
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown quantization '{quantization}'; expected one of {QUANTIZATIONS}"
+            )
+        self.quantization = quantization
+        self.rescore = (
+            Config.VECTOR_RESCORE if rescore is None else rescore
+        ) and quantization != "none"
+        self.rescore_factor = max(1, rescore_factor or Config.RESCORE_FACTOR)
+        self._configured_dim = dim
+        self._initial_capacity = max(1, int(initial_capacity))
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of vector storage for the live rows (codes, scales and exact copy)."""
+        return sum(
+            a[: self._size].nbytes for a in (self._matrix, self._scales, self._exact)
+        )
+
+    def clear(self):
+        """Drop all vectors and release the backing matrix."""
+        self.dim = self._configured_dim
+        self._matrix = self._empty(0)
+        # int8 only: per-row dequantization scale
+        self._scales = np.empty(0, dtype=np.float32)
+        # rescore only: exact float32 copy of the normalized vectors
+        self._exact = np.empty((0, self.dim or 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata = MetadataTable()
+        # Source/page inverted indexes over slots for filtered queries
+        self._filters = FilterIndex()
+        self._slots: Dict[str, int] = {}
+
+    def _empty(self, rows: int) -> np.ndarray:
+        dim = self.dim or 0
+        if self.quantization == "float16":
+            return np.empty((rows, dim), dtype=np.float16)
+        if self.quantization == "int8":
+            return np.empty((rows, dim), dtype=np.int8)
+        if self.quantization == "binary":
+            return np.empty((rows, (dim + 7) // 8), dtype=np.uint8)
+        return np.empty((rows, dim), dtype=np.float32)
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self.dim = int(vec.shape[0])
+        elif vec.shape[0] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vec.shape[0]} does not match store dimension {self.dim}"
+            )
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec = vec / norm
+        return vec
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity and self._matrix.shape[1] == self._empty(0).shape[1]:
+            return
+        new_capacity = max(self._initial_capacity, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        grown = self._empty(new_capacity)
+        if self._size:
+            grown[: self._size] = self._matrix[: self._size]
+        self._matrix = grown
+        if self.quantization == "int8":
+            scales = np.empty(new_capacity, dtype=np.float32)
+            if self._size:
+                scales[: self._size] = self._scales[: self._size]
+            self._scales = scales
+        if self.rescore:
+            exact = np.empty((new_capacity, self.dim), dtype=np.float32)
+            if self._size:
+                exact[: self._size] = self._exact[: self._size]
+            self._exact = exact
+
+    def _write_rows(self, slots, mat: np.ndarray):
+        """Store normalized float32 rows ``mat`` at ``slots`` in the configured encoding."""
+        if self.quantization == "float16":
+            self._matrix[slots] = mat.astype(np.float16)
+        elif self.quantization == "int8":
+            scales = np.abs(mat).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._matrix[slots] = np.rint(mat / scales[:, None]).astype(np.int8)
+            self._scales[slots] = scales
+        elif self.quantization == "binary":
+            self._matrix[slots] = np.packbits(mat > 0, axis=1)
+        else:
+            self._matrix[slots] = mat
+        if self.rescore:
+            self._exact[slots] = mat
+
+    def _move_row(self, src: int, dst: int):
+        self._matrix[dst] = self._matrix[src]
+        if self.quantization == "int8":
+            self._scales[dst] = self._scales[src]
+        if self.rescore:
+            self._exact[dst] = self._exact[src]
+
+    def _decode(self, slots) -> np.ndarray:
+        """Best available float32 reconstruction of the rows at ``slots``."""
+        if self.rescore:
+            return np.asarray(self._exact[slots], dtype=np.float32)
+        rows = self._matrix[slots]
+        if self.quantization == "int8":
+            return rows.astype(np.float32) * self._scales[slots][:, None]
+        if self.quantization == "binary":
+            bits = np.unpackbits(rows, axis=1)[:, : self.dim].astype(np.float32)
+            return (bits * 2.0 - 1.0) / np.sqrt(self.dim)
+        return rows.astype(np.float32)
+
+    def _vector(self, slot: int) -> np.ndarray:
+        return self._decode([slot])[0]
+
+    def _encode_query(self, q: np.ndarray):
+        """``q`` in the stored code's form, plus its int8 scale (1.0 otherwise)."""
+        if self.quantization == "int8":
+            scale = float(np.abs(q).max()) / 127.0 or 1.0
+            return np.rint(q / scale).astype(np.int8), scale
+        if self.quantization == "binary":
+            return np.packbits(q > 0), 1.0
+        return q, 1.0
+
+    def _score_rows(self, code: np.ndarray, q_scale: float, rows, scales) -> np.ndarray:
+        """Scores of the encoded query against ``rows``, computed on the codes."""
+        if self.quantization == "binary":
+            # Fraction of agreeing signs mapped to [-1, 1]
+            return 1.0 - 2.0 * _hamming(rows, code).astype(np.float32) / self.dim
+        if self.quantization == "int8":
+            # Exact int32 dot products of the codes, then both scales
+            dots = np.einsum("ij,j->i", rows, code, dtype=np.int32)
+            return dots * (scales * np.float32(q_scale))
+        if self.quantization == "float16":
+            # Accumulated in float32 without a float32 copy of the block
+            return np.einsum("ij,j->i", rows, code, dtype=np.float32, casting="unsafe")
+        return rows @ code
+
+    def _approximate_scores(self, q: np.ndarray, slots=None) -> np.ndarray:
+        """Scores of ``q`` against the rows at ``slots`` (all live rows if None)."""
+        int8 = self.quantization == "int8"
+        code, q_scale = self._encode_query(q)
+        if slots is not None:
+            scales = self._scales[slots] if int8 else None
+            return self._score_rows(code, q_scale, self._matrix[slots], scales)
+        n = self._size
+        if self.quantization == "none":
+            return self._matrix[:n] @ q
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK):
+            end = min(n, start + _SCORE_BLOCK)
+            scales = self._scales[start:end] if int8 else None
+            scores[start:end] = self._score_rows(
+                code, q_scale, self._matrix[start:end], scales
+            )
+        return scores
+
+    def upsert(self, id: str, embedding: List[float], metadata: dict | None = None):
+        vec = self._normalize(embedding)
+        slot = self._slots.get(id)
+        if slot is None:
+            self._ensure_capacity(self._size + 1)
+            slot = self._size
+            self._size += 1
+            self._slots[id] = slot
+            self._ids.append(id)
+        self._metadata.set(slot, metadata or {})
+        self._filters.add(slot, metadata or {})
+        self._write_rows([slot], vec.reshape(1, -1))
+
+    def upsert_many(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[List[float]],
+        metadatas: Sequence[dict | None] | None = None,
+    ):
+        """Insert or replace many vectors at once.
+
+        Normalization is vectorized over the whole batch and the matrix is grown at
+        most once, so bulk loads cost O(n) instead of n separate upserts.
+        """
+        if len(ids) != len(embeddings):
+            raise ValueError("ids and embeddings must have the same length")
+        if metadatas is None:
+            metadatas = [None] * len(ids)
+        elif len(metadatas) != len(ids):
+            raise ValueError("ids and metadatas must have the same length")
+        if not ids:
+            return
+
+        mat = np.asarray(embeddings, dtype=np.float32)
+        if mat.ndim != 2:
+            raise ValueError("embeddings must be a 2-D sequence of vectors")
+        if self.dim is None:
+            self.dim = int(mat.shape[1])
+        elif mat.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {mat.shape[1]} does not match store dimension {self.dim}"
+            )
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        mat = mat / norms
+
+        new_ids = sum(1 for id in set(ids) if id not in self._slots)
+        self._ensure_capacity(self._size + new_ids)
+        slots = []
+        for id, metadata in zip(ids, metadatas):
+            slot = self._slots.get(id)
+            if slot is None:
+                slot = self._size
+                self._size += 1
+                self._slots[id] = slot
+                self._ids.append(id)
+            self._metadata.set(slot, metadata or {})
+            self._filters.add(slot, metadata or {})
+            slots.append(slot)
+        # Repeated ids within the batch: the last row wins, as with sequential upserts
+        last = {slot: row for row, slot in enumerate(slots)}
+        self._write_rows(list(last), mat[list(last.values())])
+
+    def delete(self, id: str) -> bool:
+        """Remove a vector by id, keeping storage compact.
+
+        The last row is moved into the freed slot so the live rows stay contiguous.
+        Returns False if the id was not present.
+        """
+        slot = self._slots.pop(id, None)
+        if slot is None:
+            return False
+        last = self._size - 1
+        self._filters.remove(slot)
+        self._metadata.remove(slot)
+        if slot != last:
+            self._move_row(last, slot)
+            self._filters.move(last, slot)
+            self._metadata.move(last, slot)
+            moved_id = self._ids[last]
+            self._ids[slot] = moved_id
+            self._slots[moved_id] = slot
+        self._ids.pop()
+        self._size = last
+        return True
+
+    def get_metadata(self, id: str) -> dict | None:
+        """Return the metadata stored with ``id`` (None if unknown)."""
+        slot = self._slots.get(id)
+        return None if slot is None else self._metadata.get(slot)
+
+    def update_metadata(self, id: str, metadata: dict) -> bool:
+        """Replace the metadata of a stored vector; returns False if ``id`` is unknown."""
+        slot = self._slots.get(id)
+        if slot is None:
+            return False
+        self._metadata.set(slot, metadata)
+        self._filters.add(slot, metadata)
+        return True
+
+    def query(
+        self,
+        embedding: List[float],
+        top_k: int = 5,
+        filter: MetadataFilter | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` closest vectors, optionally restricted by ``filter``.
+
+        The filter is resolved against the source/page indexes first, so only
+        matching rows are scored.
+        """
+        if self._size == 0 or top_k <= 0:
+            return []
+        allowed = None
+        if filter is not None and not filter.is_empty():
+            allowed = self._filters.select(filter, np.arange(self._size))
+            if not len(allowed):
+                return []
+        q = self._normalize(embedding)
+        return self._search(q, top_k, self._candidates(q, top_k, allowed))
+
+    def _candidates(
+        self, q: np.ndarray, top_k: int, allowed: np.ndarray | None
+    ) -> np.ndarray | None:
+        """Slots worth scoring for ``q`` (``allowed``: slots passing the filter, if any).
+
+        None scans every row (exact search).
+        """
+        return allowed
+
+    def _search(
+        self, q: np.ndarray, top_k: int, slots: np.ndarray | None
+    ) -> List[Dict[str, Any]]:
+        scores = self._approximate_scores(q, slots)
+        k = top_k * self.rescore_factor if self.rescore else top_k
+        order = self._top(scores, k)
+        candidates = order if slots is None else slots[order]
+        if self.rescore:
+            # Exact rerank of the quantized scan's best candidates
+            exact = self._exact[candidates] @ q
+            best = np.argsort(-exact, kind="stable")[:top_k]
+            candidates, top_scores = candidates[best], exact[best]
+        else:
+            top_scores = scores[order]
+        return [
+            {
+                "id": self._ids[slot],
+                "embedding": self._vector(slot).tolist(),
+                "metadata": self._metadata.get(slot),
+                "score": float(score),
+            }
+            for slot, score in zip(candidates.tolist(), top_scores.tolist())
+        ]
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` highest ``scores``, best first."""
+        n = len(scores)
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    # --- persistence ---
+    def _files(self, directory: str) -> Dict[str, str]:
+        files = {"metadata": os.path.join(directory, METADATA_FILE)}
+        if self.quantization == "none" or self.rescore:
+            files["exact"] = os.path.join(directory, EMBEDDINGS_FILE)
+        if self.quantization != "none":
+            files["codes"] = os.path.join(
+                directory, CODES_FILE.format(self.quantization)
+            )
+        if self.quantization == "int8":
+            files["scales"] = os.path.join(directory, SCALES_FILE)
+        return files
+
+    def save(self, directory: str, **manifest: Any):
+        """Write the store to ``directory``; extra keyword args go into the manifest."""
+        n = self._size
+        files = self._files(directory)
+        arrays = {
+            "exact": self._matrix if self.quantization == "none" else self._exact,
+            "codes": self._matrix,
+            "scales": self._scales,
+        }
+        for name, array in arrays.items():
+            if name in files:
+                data = np.ascontiguousarray(array[:n])
+                atomic_write(files[name], data.tofile)
+
+        atomic_write(
+            files["metadata"], lambda fh: self._metadata.save(fh, ids=self._ids)
+        )
+        write_manifest(
+            directory,
+            {
+                **manifest,
+                "provider": self.PROVIDER,
+                "count": n,
+                "dim": self.dim,
+                "quantization": self.quantization,
+                "rescore": self.rescore,
+            },
+        )
+
+    def load(self, directory: str) -> Dict[str, Any] | None:
+        """Replace the contents with the index saved in ``directory``.
+
+        Returns the manifest on success, or None (leaving the store untouched) when
+        no compatible index is found (including one saved with another quantization).
+        """
+        manifest = read_manifest(directory)
+        if not manifest or manifest.get("provider") != self.PROVIDER:
+            return None
+        if manifest.get("quantization", "none") != self.quantization or bool(
+            manifest.get("rescore")
+        ) != bool(self.rescore):
+            return None
+        n, dim = int(manifest.get("count", 0)), manifest.get("dim")
+        files = self._files(directory)
+        metadata = MetadataTable()
+        attrs = metadata.load(files["metadata"])
+        ids = (attrs or {}).get("ids")
+        if ids is None or len(ids) != n or len(metadata) != n:
+            return None
+
+        previous_dim, self.dim = self.dim, int(dim) if dim else self.dim
+        shapes = {
+            "exact": ((n, self.dim or 0), np.float32),
+            "codes": (self._empty(n).shape, self._empty(0).dtype),
+            "scales": ((n,), np.float32),
+        }
+        arrays = {}
+        try:
+            for name, (shape, dtype) in shapes.items():
+                if name not in files:
+                    continue
+                expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                if n and os.path.getsize(files[name]) != expected:
+                    raise ValueError(f"{files[name]} has an unexpected size")
+                if n:
+                    # Copy-on-write: pages stay shared with other processes until written
+                    arrays[name] = np.memmap(
+                        files[name], dtype=dtype, mode="c", shape=shape
+                    )
+        except (OSError, ValueError):
+            self.dim = previous_dim
+            return None
+
+        self.clear()
+        if n:
+            self.dim = int(dim)
+            if self.quantization == "none":
+                self._matrix = arrays["exact"]
+            else:
+                self._matrix = arrays["codes"]
+                if self.rescore:
+                    self._exact = arrays["exact"]
+            if self.quantization == "int8":
+                self._scales = arrays["scales"]
+        self._size = n
+        self._ids = list(ids)
+        self._metadata = metadata
+        self._slots = {id: slot for slot, id in enumerate(self._ids)}
+        self._filters.add_many(metadata.items())
+        return manifest
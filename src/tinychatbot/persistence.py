@@ -0,0 +1,129 @@
+"""Helpers for writing on-disk index files safely.
+
+Files are written to a temporary name and moved into place with ``os.replace`` so
+readers (including other worker processes holding an ``np.memmap`` of the previous
+file) never observe a partially written file. The manifest is written last and is
+the commit point for a saved index.
+
+An index made of several files is saved as a whole into a fresh version
+subdirectory (``new_version()``), and ``publish_version()`` switches the single
+``CURRENT`` pointer file to it. Readers resolve the pointer with
+``current_version()``, so they always see one complete save, even when several
+worker processes persist at once or a save is cut short. Writers serialize on an
+``fcntl`` lock (``index_lock()``), which also keeps one writer from pruning
+another's unfinished version.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves from several processes are not serialized
+    fcntl = None
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+CURRENT_NAME = "CURRENT"
+LOCK_NAME = ".lock"
+VERSION_PREFIX = "v-"
+
+
+def atomic_write(path: str, write: Callable[[IO[bytes]], None]):
+    """Call ``write(fh)`` on a temp file next to ``path`` and atomically move it into place."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_manifest(directory: str, manifest: Dict[str, Any]):
+    data = json.dumps({"format": FORMAT_VERSION, **manifest}, indent=2).encode("utf-8")
+    atomic_write(os.path.join(directory, MANIFEST_NAME), lambda fh: fh.write(data))
+
+
+def read_manifest(directory: str) -> Dict[str, Any] | None:
+    """Return the manifest stored in ``directory`` or None if missing/unreadable."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("format") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+@contextmanager
+def index_lock(directory: str) -> Iterator[None]:
+    """Hold an exclusive lock on ``directory`` shared by every process on the host."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_NAME), "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def new_version(directory: str) -> str:
+    """Create and return an empty version subdirectory of ``directory`` to save into."""
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkdtemp(
+        dir=directory, prefix=f"{VERSION_PREFIX}{time.time_ns():020d}-"
+    )
+
+
+def publish_version(directory: str, version: str):
+    """Point ``directory``'s ``CURRENT`` file at ``version`` and prune old versions.
+
+    The previously published version is kept, so a worker that resolved the
+    pointer just before it moved can still load it; anything older (or left
+    behind by an interrupted save) is removed. Call with ``index_lock`` held.
+    """
+    previous = current_version(directory)
+    name = os.path.basename(version)
+    atomic_write(
+        os.path.join(directory, CURRENT_NAME), lambda fh: fh.write(name.encode())
+    )
+    keep = {name, os.path.basename(previous or "")}
+    for entry in os.listdir(directory):
+        if entry.startswith(VERSION_PREFIX) and entry not in keep:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def discard_version(version: str):
+    """Remove a version that could not be saved completely."""
+    shutil.rmtree(version, ignore_errors=True)
+
+
+def current_version(directory: str) -> str | None:
+    """The published version directory of ``directory``, or None if there is none.
+
+    A directory saved before versions were introduced (manifest at the top level)
+    is returned as is.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_NAME), encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        if os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+            return directory
+        return None
+    version = os.path.join(directory, name)
+    return version if name and os.path.isdir(version) else None
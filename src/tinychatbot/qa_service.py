@@ -1,23 +1,79 @@
-from typing import Any, Dict, List, Tuple
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import weakref
+from array import array
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Literal, Tuple
 
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from loguru import logger
 from pydantic import BaseModel
 
 from .config import Config
-from .documents import load_documents
+from .documents import content_hash, load_documents_cached
+from .embedding_cache import EmbeddingCache
 from .llm_client import LLMClient
+from .persistence import (
+    current_version,
+    discard_version,
+    index_lock,
+    new_version,
+    publish_version,
+    read_manifest,
+)
 from .vector_store import VectorStore
 
-app = FastAPI(title="Content QA")
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    if Config.INDEX_WARMUP:
+        # Build (or load) the index while the server already accepts requests;
+        # questions arriving meanwhile wait for this build instead of starting one
+        threading.Thread(target=warm_index, name="index-warmup", daemon=True).start()
+    yield
+    # Release the async LLM client's pooled connections
+    if _LLM is not None and hasattr(_LLM, "aclose"):
+        await _LLM.aclose()
+
+
+app = FastAPI(title="Content QA", lifespan=_lifespan)
+
+# Characters of a chunk shown as its snippet (answer context and citations)
+SNIPPET_CHARS = 300
+
+
+class QAFilters(BaseModel):
+    """Restrict retrieval to matching chunks; all given fields must match.
+
+    Relative ``sources``/``prefix`` paths are resolved against ``Config.CONTENT_DIR``.
+    """
+
+    sources: List[str] | None = None
+    prefix: str | None = None
+    # Extensions such as "pdf" or ".docx"
+    file_types: List[str] | None = None
+    page_min: int | None = None
+    page_max: int | None = None
 
 
 class QARequest(BaseModel):
     question: str
     top_k: int = 5
+    # Retrieval mode; defaults to Config.RETRIEVAL_MODE. "lexical" and "hybrid"
+    # need the BM25 index (LEXICAL_INDEX=true); "lexical" skips question embedding.
+    mode: Literal["vector", "hybrid", "lexical"] | None = None
+    filters: QAFilters | None = None
 
 
 def read_documents(content_dir: str):
-    return load_documents(content_dir)
+    # Cached: only files whose stat changed since the last request are re-extracted
+    return load_documents_cached(content_dir)
 
 
 def _get_tiktoken() -> Any | None:
@@ -34,42 +90,136 @@ def _get_tiktoken() -> Any | None:
         return None
 
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200):
-    # Token-aware chunking using tiktoken when available; falls back to character-based.
+@lru_cache(maxsize=None)
+def _get_encoder(model_name: str) -> Any | None:
+    """Return the tiktoken encoding for ``model_name`` (loaded once per model), or None.
+
+    Unknown model names fall back to ``cl100k_base``. If tiktoken is missing or its
+    encoding files can't be loaded, None is returned and chunking falls back to
+    character windows.
+    """
     tiktoken = _get_tiktoken()
-    if tiktoken:
-        model_name = getattr(Config, "LLM_MODEL", "gpt-4o-mini")
-        enc = (
-            tiktoken.encoding_for_model(model_name)
-            if hasattr(tiktoken, "encoding_for_model")
-            else tiktoken.get_encoding("cl100k_base")
+    if not tiktoken:
+        return None
+    try:
+        if hasattr(tiktoken, "encoding_for_model"):
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(
+            f"Could not load tiktoken encoding ({e}); using character chunks."
         )
+        return None
+
+
+def _windows(length: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+    """Start/end offsets of overlapping windows covering ``length`` items."""
+    step = max(1, size - overlap)
+    return [(i, i + size) for i in range(0, length, step)]
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200):
+    # Token-aware chunking using tiktoken when available; falls back to character-based.
+    enc = _get_encoder(getattr(Config, "LLM_MODEL", "gpt-4o-mini"))
+    if enc is not None:
         toks = enc.encode(text)
-        chunks: List[str] = []
-        i = 0
-        while i < len(toks):
-            part = toks[i : i + chunk_size]
-            chunks.append(enc.decode(part))
-            i += chunk_size - overlap
-        return chunks
+        return [
+            enc.decode(toks[a:b]) for a, b in _windows(len(toks), chunk_size, overlap)
+        ]
 
     # fallback: character-based
-    i = 0
-    chunks = []
-    while i < len(text):
-        chunk = text[i : i + chunk_size]
-        chunks.append(chunk)
-        i += chunk_size - overlap
-    return chunks
+    return [text[a:b] for a, b in _windows(len(text), chunk_size, overlap)]
+
+
+def _pack_groups(
+    positions: List[Tuple[int, int]],
+    lengths: List[int],
+    budget: int,
+    overlap: int,
+) -> List[List[int]]:
+    """Greedily group consecutive paragraph indices of the same page into packs.
+
+    A pack holds as many paragraphs as fit in ``budget`` tokens (counting one token
+    per ``\\n\\n`` separator). Paragraphs larger than the budget form a pack of their
+    own and are windowed by the caller. Consecutive packs repeat the trailing
+    paragraphs of the previous pack that fit in ``overlap`` tokens.
+    """
+    groups: List[List[int]] = []
+    group: List[int] = []
+    size = 0
+    for i, n in enumerate(lengths):
+        oversized = n > budget
+        if group and (
+            oversized
+            or positions[group[0]][0] != positions[i][0]
+            or size + 1 + n > budget
+        ):
+            groups.append(group)
+            carry: List[int] = []
+            carry_size = -1
+            if not oversized and positions[group[0]][0] == positions[i][0]:
+                for j in reversed(group[1:]):
+                    if carry_size + 1 + lengths[j] > overlap:
+                        break
+                    carry.insert(0, j)
+                    carry_size += 1 + lengths[j]
+                if carry and carry_size + 1 + n > budget:
+                    carry, carry_size = [], -1
+            group, size = carry, carry_size
+        if oversized:
+            groups.append([i])
+            group, size = [], 0
+            continue
+        size = size + 1 + n if group else n
+        group.append(i)
+    if group:
+        groups.append(group)
+    return groups
+
+
+def _locate_windows(para: str, windows: List[str]) -> List[Tuple[int, int]]:
+    """Character spans of the decoded token ``windows`` within ``para``.
+
+    Windows are ordered and overlapping, so each is searched from the previous
+    start. Token boundaries can split a multi-byte character, which decodes to
+    U+FFFD; those are skipped when matching.
+    """
+    spans = []
+    start = 0
+    for window in windows:
+        skip = len(window) - len(window.lstrip("\ufffd"))
+        probe = window[skip : skip + 64]
+        pos = para.find(probe, start) - skip if probe else -1
+        start = max(start, pos)
+        spans.append((start, min(len(para), start + len(window))))
+    return spans
 
 
 def chunk_with_metadata(
-    text: str, path: str, chunk_size_tokens: int = 700, overlap_tokens: int = 150
+    text: str,
+    path: str,
+    chunk_size_tokens: int = 700,
+    overlap_tokens: int = 150,
+    pack: bool = False,
 ):
     """Split text into chunks and attach metadata: source, approximate page and paragraph indices.
 
     Page detection: look for form-feed characters '\f' or 'Page ' markers; fallback sets page=1.
     Paragraph index is approximate using split('\n\n').
+
+    Produces the same chunks as calling ``chunk_text`` on every paragraph, but all
+    paragraphs of the document are tokenized with one ``encode_batch`` call and all
+    windows decoded with one ``decode_batch`` call (both multi-threaded in tiktoken).
+
+    With ``pack=True`` consecutive paragraphs of a page are merged into chunks of up
+    to ``chunk_size_tokens`` (see ``_pack_groups``); each packed chunk records the
+    paragraph range it covers as ``para``/``para_end``.
+
+    Every chunk also records ``start``/``end``, its character offsets in ``text``, so
+    stores can keep offsets instead of copied snippets.
     """
     # naive page split
     if "\f" in text:
@@ -78,78 +228,707 @@ def chunk_with_metadata(
         # attempt to detect explicit 'Page X' markers
         pages = [text]
 
-    chunks = []
+    # (page, para) position and character offset of every non-empty paragraph
+    positions: List[Tuple[int, int]] = []
+    paras: List[str] = []
+    offsets: List[int] = []
+    page_start = 0
     for p_idx, page_text in enumerate(pages, start=1):
-        paras = [p for p in page_text.split("\n\n") if p.strip()]
-        for para_idx, para in enumerate(paras, start=1):
-            sub_chunks = chunk_text(
-                para, chunk_size=chunk_size_tokens, overlap=overlap_tokens
+        para_start, para_idx = page_start, 0
+        for para in page_text.split("\n\n"):
+            if para.strip():
+                para_idx += 1
+                positions.append((p_idx, para_idx))
+                paras.append(para)
+                offsets.append(para_start)
+            para_start += len(para) + 2
+        page_start += len(page_text) + 1
+    if not paras:
+        return []
+
+    enc = _get_encoder(getattr(Config, "LLM_MODEL", "gpt-4o-mini"))
+    tokens = enc.encode_batch(paras) if enc is not None else paras
+    lengths = [len(t) for t in tokens]
+
+    if pack:
+        groups = _pack_groups(positions, lengths, chunk_size_tokens, overlap_tokens)
+    else:
+        groups = [[i] for i in range(len(paras))]
+    # Single paragraphs are windowed; packs are below budget and kept verbatim
+    split = [g[0] for g in groups if len(g) == 1]
+    bounds = {i: _windows(lengths[i], chunk_size_tokens, overlap_tokens) for i in split}
+    parts = [[tokens[i][a:b] for a, b in bounds[i]] for i in split]
+    flat = [part for para in parts for part in para]
+    texts = iter(enc.decode_batch(flat) if enc is not None else flat)
+    sub_chunks = {i: [next(texts) for _ in para] for i, para in zip(split, parts)}
+
+    chunks = []
+    for group in groups:
+        p_idx, para_idx = positions[group[0]]
+        first, last = group[0], group[-1]
+        if len(group) == 1:
+            group_chunks = sub_chunks[first]
+            # Without an encoder the windows are character offsets already
+            spans = (
+                [(a, min(b, lengths[first])) for a, b in bounds[first]]
+                if enc is None
+                else _locate_windows(paras[first], group_chunks)
             )
-            for sc_idx, sc in enumerate(sub_chunks):
-                meta = {
-                    "source": path,
-                    "page": p_idx,
-                    "para": para_idx,
-                    "chunk_index": sc_idx,
-                }
-                chunks.append((sc, meta))
+        else:
+            group_chunks = ["\n\n".join(paras[i] for i in group)]
+            spans = [(0, offsets[last] - offsets[first] + len(paras[last]))]
+        for sc_idx, (sc, (start, end)) in enumerate(zip(group_chunks, spans)):
+            meta = {
+                "source": path,
+                "page": p_idx,
+                "para": para_idx,
+                "chunk_index": sc_idx,
+                "start": offsets[first] + start,
+                "end": offsets[first] + end,
+            }
+            if pack:
+                meta["para_end"] = positions[group[-1]][1]
+            chunks.append((sc, meta))
     return chunks
 
 
+class _ReadWriteLock:
+    """Many concurrent readers or one writer; a waiting writer holds off new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _DeferredWrites:
+    """Records method calls meant for ``target`` and replays them with ``apply()``.
+
+    An incremental update writes to these stand-ins for the live store and BM25
+    index, so chunking and embedding run while queries keep reading the old index
+    and only ``apply()`` needs the write lock. Only methods ``target`` has can be
+    recorded, so ``hasattr`` checks see the same capabilities. The embeddings of
+    recorded ``upsert_many`` calls are spilled to a temporary file as float32, so
+    memory stays bounded by one batch however large the update is.
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+        self._calls: List[Tuple[str, tuple]] = []
+        self._spill = None
+
+    def __getattr__(self, name: str):
+        getattr(self._target, name)
+
+        def record(*args):
+            if name == "upsert_many":
+                ids, embeddings, *rest = args
+                args = (ids, self._spill_vectors(embeddings), *rest)
+            self._calls.append((name, args))
+
+        return record
+
+    def _spill_vectors(self, embeddings) -> Tuple[int, int, int]:
+        """Append ``embeddings`` to the spill file; returns (offset, rows, dim)."""
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        flat = array("f")
+        for vec in embeddings:
+            flat.extend(vec)
+        rows = len(embeddings)
+        offset = self._spill.seek(0, os.SEEK_END)
+        self._spill.write(flat.tobytes())
+        return offset, rows, len(flat) // rows if rows else 0
+
+    def _read_vectors(self, offset: int, rows: int, dim: int) -> List[List[float]]:
+        flat = array("f")
+        self._spill.seek(offset)
+        flat.frombytes(self._spill.read(rows * dim * flat.itemsize))
+        return [flat[i * dim : (i + 1) * dim].tolist() for i in range(rows)]
+
+    def apply(self):
+        for name, args in self._calls:
+            if name == "upsert_many":
+                ids, spilled, *rest = args
+                args = (ids, self._read_vectors(*spilled), *rest)
+            getattr(self._target, name)(*args)
+        self._calls = []
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+@contextmanager
+def _journaled(deduper):
+    """Roll back ``deduper``'s changes if the block raises (``None``: no journal)."""
+    if deduper is None:
+        yield
+        return
+    deduper.begin()
+    try:
+        yield
+    except BaseException:
+        deduper.rollback()
+        raise
+    deduper.commit()
+
+
 _VSTORE = None
 _LLM = None
-_INDEX_FINGERPRINT: Tuple[Tuple[str, int], ...] | None = None
+_EMBED_CACHE: EmbeddingCache | None = None
+_INDEX_FINGERPRINT: Tuple[Tuple[str, str], ...] | None = None
 _INDEX_READY = False
+# path -> {"hash": content sha256, "chunks": number of chunk ids "<path>::<n>"}
+# With DEDUP enabled entries also list the (shared) vector id of every chunk: "ids"
+_INDEX_DOCS: Dict[str, Dict[str, Any]] = {}
+# dedup.ChunkDeduper tracking duplicate groups when DEDUP=exact|near
+_DEDUP = None
+# bm25.BM25Index over the indexed chunks when LEXICAL_INDEX=true
+_LEXICAL = None
+# Documents the published index was built from; hit texts are sliced from these
+_INDEX_CORPUS: List[Dict[str, Any]] | None = None
+# Shared stores replaced by a full rebuild; callers still holding one get _VSTORE
+_RETIRED_STORES: weakref.WeakSet = weakref.WeakSet()
+# Held while the index is built or updated, so one build runs at a time
+# (re-entrant for ``_refresh_index`` -> ``_build_index_if_needed``)
+_INDEX_LOCK = threading.RLock()
+# Queries read the live index under the read side; a finished update is applied
+# (or a rebuilt store swapped in) under the write side
+_LIVE_LOCK = _ReadWriteLock()
+_SERVICES_LOCK = threading.Lock()
+
 
+def _hash_text(text: str) -> str:
+    return content_hash(text)
 
-def _fingerprint_documents(docs: List[Dict[str, Any]]) -> Tuple[Tuple[str, int], ...]:
-    """Compute a cheap fingerprint of the current content set."""
-    pairs = [(d.get("path", ""), len(d.get("text") or "")) for d in docs]
+
+def _doc_hash(doc: Dict[str, Any]) -> str:
+    """Content hash of ``doc``: the one ``CorpusCache`` stored at extraction, if any."""
+    return doc.get("hash") or _hash_text(doc.get("text") or "")
+
+
+def _fingerprint_documents(docs: List[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """Compute a fingerprint of the current content set from per-document content hashes.
+
+    Documents from ``load_documents_cached`` carry their hash, so an unchanged corpus
+    is fingerprinted without reading its text.
+    """
+    pairs = [(d.get("path", ""), _doc_hash(d)) for d in docs]
     pairs.sort(key=lambda item: item[0])
     return tuple(pairs)
 
 
-def _build_index_if_needed(
-    docs: List[Dict[str, Any]], vstore: VectorStore, llm: LLMClient, force: bool = False
-) -> None:
-    """Ensure the in-memory vector index matches the provided docs."""
-    global _INDEX_FINGERPRINT, _INDEX_READY
+def _get_embedding_cache() -> EmbeddingCache | None:
+    global _EMBED_CACHE
+    if not Config.EMBED_CACHE:
+        return None
+    if _EMBED_CACHE is None:
+        _EMBED_CACHE = EmbeddingCache()
+    return _EMBED_CACHE
+
+
+def _embed(llm: LLMClient, texts: List[str]) -> List[List[float]]:
+    """Embed ``texts``, serving repeats from the embedding cache when it is enabled.
+
+    Only cache misses are sent to the provider, and identical texts within one call
+    are embedded once.
+    """
+    cache = _get_embedding_cache()
+    if cache is None:
+        return llm.embed(texts)
+    model = Config.EMBEDDING_MODEL
+    vectors = cache.get_many(model, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fresh = dict(zip(missing, llm.embed(missing)))
+        cache.put_many(model, missing, [fresh[t] for t in missing])
+        vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+    return vectors
+
+
+def _chunk_ids(path: str, count: int) -> List[str]:
+    return [f"{path}::{n}" for n in range(count)]
+
+
+def _index_settings() -> Dict[str, Any]:
+    """Settings that must match for a persisted index to be reusable."""
+    return {
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "chunk_size_tokens": Config.CHUNK_SIZE_TOKENS,
+        "chunk_overlap_tokens": Config.CHUNK_OVERLAP_TOKENS,
+        "chunk_mode": Config.CHUNK_MODE,
+        "dedup": Config.DEDUP,
+        "dedup_threshold": Config.DEDUP_THRESHOLD,
+        "lexical_index": Config.LEXICAL_INDEX,
+    }
+
+
+def _new_lexical_index():
+    """Create an empty BM25 index when ``LEXICAL_INDEX`` is enabled, else None."""
+    if not Config.LEXICAL_INDEX:
+        return None
+    from .bm25 import BM25Index
+
+    return BM25Index(k1=Config.BM25_K1, b=Config.BM25_B)
+
+
+def _new_deduper():
+    """Create an empty ``ChunkDeduper`` for the configured mode, or None when disabled."""
+    if Config.DEDUP not in ("exact", "near"):
+        return None
+    # Lazy import: near-duplicate detection needs numpy
+    from .dedup import ChunkDeduper
+
+    options = {}
+    if Config.DEDUP == "near":
+        options = {
+            "threshold": Config.DEDUP_THRESHOLD,
+            "num_perm": Config.DEDUP_NUM_PERM,
+            "bands": Config.DEDUP_BANDS,
+        }
+    return ChunkDeduper(near=Config.DEDUP == "near", **options)
+
+
+def _load_persisted_index(
+    vstore: VectorStore,
+) -> Tuple[Dict[str, Any], Any, Any] | None:
+    """Load the index saved under ``Config.INDEX_DIR`` if it was built with the current settings.
+
+    Returns the per-document table stored in the manifest (so the caller can diff it
+    against the current content) with the loaded deduper and BM25 index, or None
+    when nothing usable was loaded.
+    """
+    if not Config.PERSIST_INDEX or not hasattr(vstore, "load"):
+        return None
+    directory = current_version(Config.INDEX_DIR)
+    if directory is None:
+        return None
+    manifest = read_manifest(directory)
+    if not manifest or not isinstance(manifest.get("documents"), dict):
+        return None
+    if any(manifest.get(k) != v for k, v in _index_settings().items()):
+        return None
+    try:
+        loaded = vstore.load(directory)
+    except NotImplementedError:
+        return None
+    if not loaded:
+        return None
+    deduper = _new_deduper()
+    if deduper is not None and not deduper.load(directory):
+        return None
+    lexical = _new_lexical_index()
+    if lexical is not None and not lexical.load(directory):
+        return None
+    logger.info(f"Loaded persisted vector index from '{directory}'.")
+    return manifest["documents"], deduper, lexical
 
-    new_fp = _fingerprint_documents(docs)
-    if _INDEX_READY and not force and new_fp == _INDEX_FINGERPRINT:
+
+def _persist_index(
+    vstore: VectorStore,
+    fingerprint: Any,
+    documents: Dict[str, Dict[str, Any]],
+    deduper=None,
+    lexical=None,
+) -> None:
+    if not Config.PERSIST_INDEX or not hasattr(vstore, "save"):
+        return
+    try:
+        # Each save goes into a new version directory and is published by moving
+        # the CURRENT pointer, so workers saving at once (or a save cut short)
+        # never leave one worker's matrix next to another's metadata
+        with index_lock(Config.INDEX_DIR):
+            version = new_version(Config.INDEX_DIR)
+            try:
+                if deduper is not None:
+                    deduper.save(version)
+                if lexical is not None:
+                    lexical.save(version)
+                vstore.save(
+                    version,
+                    fingerprint=fingerprint,
+                    documents=documents,
+                    **_index_settings(),
+                )
+            except BaseException:
+                discard_version(version)
+                raise
+            publish_version(Config.INDEX_DIR, version)
+    except NotImplementedError:
         return
+    except OSError as e:
+        logger.warning(f"Could not persist vector index to '{Config.INDEX_DIR}': {e}")
 
-    if hasattr(vstore, "clear"):
-        vstore.clear()
 
-    chunk_texts: List[str] = []
-    chunk_meta: List[Dict[str, Any]] = []
+def _chunk_metadata(chunk: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    # Offsets into the document text instead of a copied snippet; see _chunk_text()
+    return {
+        "source": meta["source"],
+        "page": meta.get("page"),
+        "para": meta.get("para"),
+        "chunk_index": meta.get("chunk_index"),
+        "start": meta.get("start"),
+        "end": meta.get("end"),
+        **({"para_end": meta["para_end"]} if "para_end" in meta else {}),
+    }
+
+
+def _chunk_text(meta: Dict[str, Any], texts: Dict[str, str]) -> str:
+    """Text of a chunk, sliced from its cached document text via ``start``/``end``.
+
+    Metadata that still carries a ``snippet`` (custom stores, older callers) is
+    used as is.
+    """
+    if "snippet" in meta:
+        return meta["snippet"] or ""
+    text = texts.get(meta.get("source"))
+    start = meta.get("start")
+    if text is None or start is None:
+        return ""
+    return text[start : meta.get("end") or len(text)]
+
+
+def fit_to_budget(texts: List[str], budget_tokens: int) -> List[str]:
+    """Keep ``texts`` in order until ``budget_tokens`` are used, truncating the last one.
+
+    Tokens are counted with the model's tiktoken encoding, or estimated as four
+    characters per token when tiktoken is unavailable.
+    """
+    enc = _get_encoder(getattr(Config, "LLM_MODEL", "gpt-4o-mini"))
+    tokens = enc.encode_batch(texts) if enc is not None else None
+    kept: List[str] = []
+    remaining = budget_tokens
+    for i, text in enumerate(texts):
+        if remaining <= 0:
+            break
+        if tokens is None:
+            used = -(-len(text) // 4)
+            piece = text if used <= remaining else text[: remaining * 4]
+        else:
+            used = len(tokens[i])
+            piece = text if used <= remaining else enc.decode(tokens[i][:remaining])
+        kept.append(piece)
+        remaining -= used
+    return kept
+
+
+def iter_chunks(
+    docs: Iterable[Dict[str, Any]],
+) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yield ``(chunk_id, text, metadata)`` for every chunk of ``docs``, one document at a time."""
     for doc in docs:
         text = doc.get("text", "") or ""
         path = doc.get("path", "unknown")
-        for chunk, meta in chunk_with_metadata(
+        chunks = chunk_with_metadata(
             text,
             path,
             chunk_size_tokens=Config.CHUNK_SIZE_TOKENS,
             overlap_tokens=Config.CHUNK_OVERLAP_TOKENS,
-        ):
-            chunk_texts.append(chunk)
-            meta_with_snippet = {
-                "source": meta["source"],
-                "snippet": chunk[:300],
-                "page": meta.get("page"),
-                "para": meta.get("para"),
-                "chunk_index": meta.get("chunk_index"),
-            }
-            chunk_meta.append(meta_with_snippet)
+            pack=Config.CHUNK_MODE == "packed",
+        )
+        for chunk_id, (chunk, meta) in zip(_chunk_ids(path, len(chunks)), chunks):
+            yield chunk_id, chunk, _chunk_metadata(chunk, meta)
+
+
+def iter_embedding_batches(
+    chunks: Iterable[Tuple[str, str, Dict[str, Any]]],
+    llm: LLMClient,
+    batch_size: int | None = None,
+) -> Iterator[Tuple[List[str], List[List[float]], List[Dict[str, Any]]]]:
+    """Group chunks into batches of ``batch_size`` and yield ``(ids, embeddings, metadatas)``.
+
+    Only one batch of chunk texts and vectors is held at a time, so indexing memory
+    stays bounded regardless of corpus size.
+    """
+    batch_size = max(1, batch_size or Config.INDEX_BATCH_SIZE)
+    it = iter(chunks)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        ids = [chunk_id for chunk_id, _, _ in batch]
+        texts = [text for _, text, _ in batch]
+        metas = [meta for _, _, meta in batch]
+        yield ids, _embed(llm, texts), metas
+
+
+def _delete_chunk(vstore: VectorStore, chunk_id: str, lexical=None) -> None:
+    vstore.delete(chunk_id)
+    if lexical is not None:
+        lexical.delete(chunk_id)
+
+
+def _drop_document(
+    vstore: VectorStore,
+    path: str,
+    entry: Dict[str, Any],
+    touched: set,
+    deduper=None,
+    lexical=None,
+) -> None:
+    """Delete the vectors of an indexed document (for shared groups, only its membership)."""
+    if "ids" not in entry:
+        for chunk_id in _chunk_ids(path, entry["chunks"]):
+            _delete_chunk(vstore, chunk_id, lexical)
+        return
+    for vid in dict.fromkeys(entry["ids"]):
+        if deduper is None or deduper.release(vid, path):
+            _delete_chunk(vstore, vid, lexical)
+            touched.discard(vid)
+        else:
+            touched.add(vid)
+
 
-    if chunk_texts:
-        embeddings = llm.embed(chunk_texts)
-        for idx, emb in enumerate(embeddings):
-            vstore.upsert(str(idx), emb, chunk_meta[idx])
+def _index_is_current(fingerprint, force: bool = False) -> bool:
+    return _INDEX_READY and not force and fingerprint == _INDEX_FINGERPRINT
 
-    _INDEX_FINGERPRINT = new_fp
-    _INDEX_READY = True
+
+def _current_store(vstore: VectorStore) -> VectorStore:
+    """``vstore``, or the shared store that replaced it after a full rebuild."""
+    if vstore is not None and (vstore is _VSTORE or vstore in _RETIRED_STORES):
+        return _VSTORE
+    return vstore
+
+
+def _build_index_if_needed(
+    docs: Iterable[Dict[str, Any]],
+    vstore: VectorStore,
+    llm: LLMClient,
+    force: bool = False,
+    wait: bool = True,
+) -> VectorStore:
+    """Ensure the vector index matches the provided docs.
+
+    Documents are tracked by content hash. When the store supports ``delete`` only
+    added, changed and removed documents are re-chunked, re-embedded and
+    upserted/deleted; otherwise (or with ``force``) the index is rebuilt from scratch.
+
+    ``docs`` may be a list or any iterable (e.g. ``documents.iter_documents()``); it
+    is consumed once and chunks are embedded and upserted in bounded batches of
+    ``Config.INDEX_BATCH_SIZE`` as documents stream in.
+
+    With ``DEDUP=exact`` (or ``near``) chunks whose normalized text matches (or is a
+    MinHash near-duplicate of) an indexed chunk are not embedded again: they join
+    that chunk's vector, whose metadata lists every source under ``"sources"``.
+
+    With ``LEXICAL_INDEX=true`` every chunk added to or deleted from the vector store
+    is mirrored in the BM25 index under the same id.
+
+    Builds are single-flight: one runs at a time and callers that waited for it find
+    the index up to date instead of building it again. With ``wait=False`` a caller
+    that finds a build running while an index is already served returns at once and
+    keeps querying that index. Once the shared store of ``get_services()`` serves
+    queries, an incremental update records its writes and applies them in one step
+    under ``_LIVE_LOCK``, and a full rebuild goes into an empty store that replaces
+    it, so queries never see a half-applied update. Other stores are updated in place.
+
+    Returns the store holding the up-to-date index.
+    """
+    fingerprint = None
+    if isinstance(docs, list):
+        fingerprint = _fingerprint_documents(docs)
+        if _index_is_current(fingerprint, force):
+            return _current_store(vstore)
+    if not _INDEX_LOCK.acquire(blocking=wait or not _INDEX_READY):
+        # Another request is updating the index: keep serving the current one
+        return _current_store(vstore)
+    try:
+        # The build we waited for may already have indexed these documents
+        if fingerprint is not None and _index_is_current(fingerprint, force):
+            return _current_store(vstore)
+        # Resolved under the lock: a caller may hold a store replaced meanwhile
+        vstore = _current_store(vstore)
+        shared = vstore is not None and vstore is _VSTORE
+        return _update_index(
+            docs, vstore, llm, force, fingerprint, live=shared and _INDEX_READY
+        )
+    finally:
+        _INDEX_LOCK.release()
+
+
+def _update_index(
+    docs: Iterable[Dict[str, Any]],
+    vstore: VectorStore,
+    llm: LLMClient,
+    force: bool,
+    fingerprint: Tuple[Tuple[str, str], ...] | None,
+    live: bool,
+) -> VectorStore:
+    """Body of ``_build_index_if_needed``; called with ``_INDEX_LOCK`` held.
+
+    ``live`` means ``vstore`` is the shared store and is serving queries: writes to
+    it and to the BM25 index are deferred until the update is complete (a full
+    rebuild fills a new store instead), and the deduper's changes are journaled
+    so a failed update can be rolled back.
+    """
+    global _VSTORE, _INDEX_FINGERPRINT, _INDEX_READY, _INDEX_DOCS, _DEDUP, _LEXICAL
+    global _INDEX_CORPUS
+
+    hashes: Dict[str, str] = dict(fingerprint or ())
+    deduper, lexical = _DEDUP, _LEXICAL
+
+    previous: Dict[str, Dict[str, Any]] | None = None
+    if not force and hasattr(vstore, "delete"):
+        if _INDEX_READY:
+            previous = _INDEX_DOCS
+        else:
+            # Cold start: reuse the on-disk index and only catch up on what changed
+            loaded = _load_persisted_index(vstore)
+            if loaded is not None:
+                previous, deduper, lexical = loaded
+
+    target = vstore
+    if previous is None:
+        if live:
+            target = VectorStore(vstore.provider)
+        elif hasattr(vstore, "clear"):
+            vstore.clear()
+        previous = {}
+        deduper = _new_deduper()
+        lexical = _new_lexical_index()
+    if not live:
+        # Updated in place: if the build fails, the next call must not trust the store
+        _INDEX_READY = False
+
+    store_writes, lexical_writes = target, lexical
+    incremental = live and target is vstore
+    if incremental:
+        store_writes = _DeferredWrites(vstore)
+        if lexical is not None:
+            lexical_writes = _DeferredWrites(lexical)
+
+    # Queries never read the deduper, so it is updated in place; the journal
+    # undoes a failed update so it keeps matching the live store
+    with _journaled(deduper if incremental else None):
+        index_docs: Dict[str, Dict[str, Any]] = {}
+        stale: List[str] = []
+        # Shared vectors whose list of sources changed and needs rewriting
+        touched: set = set()
+
+        def changed_docs() -> Iterator[Dict[str, Any]]:
+            for doc in docs:
+                path = doc.get("path", "unknown")
+                if path in index_docs:
+                    continue
+                digest = hashes.get(path) or _doc_hash(doc)
+                hashes[path] = digest
+                entry = previous.get(path)
+                if entry is not None and entry["hash"] == digest:
+                    index_docs[path] = entry
+                    continue
+                if entry is not None:
+                    stale.append(path)
+                    _drop_document(
+                        store_writes, path, entry, touched, deduper, lexical_writes
+                    )
+                index_docs[path] = {"hash": digest, "chunks": 0}
+                if deduper is not None:
+                    index_docs[path]["ids"] = []
+                yield doc
+
+        def counted(chunks):
+            for chunk_id, chunk, meta in chunks:
+                index_docs[meta["source"]]["chunks"] += 1
+                yield chunk_id, chunk, meta
+
+        duplicates = 0
+
+        def deduplicated(chunks):
+            nonlocal duplicates
+            for _, chunk, meta in chunks:
+                vid, is_new = deduper.assign(chunk, meta)
+                index_docs[meta["source"]]["ids"].append(vid)
+                if is_new:
+                    yield vid, chunk, deduper.metadata(vid)
+                else:
+                    duplicates += 1
+                    touched.add(vid)
+
+        def indexed_lexically(chunks):
+            for chunk_id, chunk, meta in chunks:
+                lexical_writes.add(chunk_id, chunk)
+                yield chunk_id, chunk, meta
+
+        chunks = counted(iter_chunks(changed_docs()))
+        if deduper is not None:
+            chunks = deduplicated(chunks)
+        if lexical is not None:
+            chunks = indexed_lexically(chunks)
+
+        embedded = 0
+        for ids, embeddings, metas in iter_embedding_batches(chunks, llm):
+            if hasattr(store_writes, "upsert_many"):
+                store_writes.upsert_many(ids, embeddings, metas)
+            else:
+                for chunk_id, emb, meta in zip(ids, embeddings, metas):
+                    store_writes.upsert(chunk_id, emb, meta)
+            embedded += len(ids)
+
+        removed = [path for path in previous if path not in index_docs]
+        for path in removed:
+            _drop_document(
+                store_writes, path, previous[path], touched, deduper, lexical_writes
+            )
+
+        if deduper is not None and hasattr(store_writes, "update_metadata"):
+            for vid in touched:
+                if vid in deduper:
+                    store_writes.update_metadata(vid, deduper.metadata(vid))
+        if duplicates:
+            logger.info(f"Deduplicated {duplicates} chunks into existing vectors.")
+
+        if previous:
+            logger.info(
+                f"Incremental index update: {len(stale)} changed and {len(removed)} removed "
+                f"documents, {embedded} chunks embedded."
+            )
+
+    new_fp = tuple(sorted(hashes.items()))
+    # Publish the finished index; readiness is set last
+    with _LIVE_LOCK.writing():
+        if isinstance(store_writes, _DeferredWrites):
+            store_writes.apply()
+        if isinstance(lexical_writes, _DeferredWrites):
+            lexical_writes.apply()
+        if live and target is not vstore:
+            _RETIRED_STORES.add(vstore)
+            _VSTORE = target
+        _DEDUP, _LEXICAL, _INDEX_DOCS = deduper, lexical, index_docs
+        _INDEX_CORPUS = docs if isinstance(docs, list) else None
+        _INDEX_FINGERPRINT = new_fp
+        _INDEX_READY = True
+    _persist_index(target, new_fp, index_docs, deduper, lexical)
+    return target
 
 
 def get_services():
@@ -160,69 +939,404 @@ def get_services():
     aren't installed yet.
     """
     global _VSTORE, _LLM
-    if _VSTORE is None:
-        _VSTORE = VectorStore()
-    if _LLM is None:
-        _LLM = LLMClient()
+    if _VSTORE is None or _LLM is None:
+        with _SERVICES_LOCK:
+            if _VSTORE is None:
+                _VSTORE = VectorStore()
+            if _LLM is None:
+                _LLM = LLMClient()
     return _VSTORE, _LLM
 
 
-@app.post("/qa")
-def qa(req: QARequest):
-    if not req.question:
-        return {"answer": "", "sources": []}
+def _metadata_filter(filters: QAFilters | None):
+    """Convert request filters to a ``MetadataFilter`` (None when nothing is constrained)."""
+    if filters is None:
+        return None
+    from .filters import MetadataFilter
+
+    def resolve(path: str) -> str:
+        if not os.path.isabs(path):
+            path = os.path.join(Config.CONTENT_DIR, path)
+        return os.path.normpath(path)
+
+    flt = MetadataFilter(
+        sources=[resolve(p) for p in filters.sources or ()],
+        prefix=resolve(filters.prefix) if filters.prefix else None,
+        file_types=filters.file_types,
+        page_min=filters.page_min,
+        page_max=filters.page_max,
+    )
+    return None if flt.is_empty() else flt
+
+
+def _dense_query(
+    vstore: VectorStore, q_emb: List[float], top_k: int, flt
+) -> List[Dict[str, Any]]:
+    # Only pass ``filter`` when set so stores without filter support keep working
+    if flt is None:
+        return vstore.query(q_emb, top_k=top_k)
+    return vstore.query(q_emb, top_k=top_k, filter=flt)
+
+
+def _search(
+    vstore: VectorStore,
+    llm: LLMClient,
+    question: str,
+    top_k: int,
+    mode: str,
+    flt=None,
+    q_emb: List[float] | None = None,
+) -> List[Dict[str, Any]]:
+    """Retrieve the ``top_k`` chunks for ``question`` with the given retrieval mode.
+
+    ``vector`` ranks by embedding similarity, ``lexical`` by BM25 alone (no embedding
+    call) and ``hybrid`` fuses the two rankings with reciprocal rank fusion. With a
+    ``MetadataFilter`` the vector store pre-filters its rows; BM25 candidates are
+    checked against the filter before fusion. ``q_emb`` is the question embedding
+    if the caller already has it.
+    """
+    if mode != "vector" and _LEXICAL is None:
+        logger.warning(
+            f"Retrieval mode '{mode}' needs LEXICAL_INDEX=true; using vector search."
+        )
+        mode = "vector"
+    if mode == "vector":
+        if q_emb is None:
+            q_emb = _embed(llm, [question])[0]
+        return _dense_query(vstore, q_emb, top_k, flt)
 
-    VSTORE, LLM = get_services()
+    from .bm25 import reciprocal_rank_fusion
 
+    candidates = max(top_k, Config.HYBRID_CANDIDATES)
+    by_id: Dict[str, Dict[str, Any]] = {}
+    if flt is None:
+        lexical = _LEXICAL.query(question, top_k=candidates)
+    else:
+        # Over-fetch, then keep the BM25 hits whose metadata passes the filter
+        lexical = []
+        for id, score in _LEXICAL.query(question, top_k=4 * candidates):
+            metadata = vstore.get_metadata(id)
+            if metadata is not None and flt.matches(metadata):
+                by_id[id] = {"id": id, "metadata": metadata}
+                lexical.append((id, score))
+                if len(lexical) == candidates:
+                    break
+    if mode == "lexical":
+        ranked = lexical[:top_k]
+    else:
+        if q_emb is None:
+            q_emb = _embed(llm, [question])[0]
+        dense = _dense_query(vstore, q_emb, candidates, flt)
+        by_id.update({h["id"]: h for h in dense})
+        ranked = reciprocal_rank_fusion(
+            [[h["id"] for h in dense], [id for id, _ in lexical]], k=Config.RRF_K
+        )[:top_k]
+    hits = []
+    for id, score in ranked:
+        hit = by_id.get(id)
+        if hit is None:
+            metadata = vstore.get_metadata(id)
+            if metadata is None:
+                continue
+            hit = {"id": id, "metadata": metadata}
+        hits.append({**hit, "score": score})
+    return hits
+
+
+def retrieve(
+    question: str,
+    top_k: int = 5,
+    mode: str | None = None,
+    filters: QAFilters | None = None,
+) -> List[Dict[str, Any]]:
+    """Bring the index up to date and return the ``top_k`` hits for ``question``.
+
+    Shared by ``qa()`` and the chat UI's retrieval prompt mode. Each hit gets a
+    ``text`` field holding the chunk text, sliced from the cached document texts
+    for the returned hits only.
+    """
+    vstore, llm = get_services()
+    docs = _refresh_index(vstore, llm)
+    mode = mode or Config.RETRIEVAL_MODE
+    flt = _metadata_filter(filters)
+    return _search_live(vstore, llm, question, top_k, mode, flt, None, docs)
+
+
+def _refresh_index(vstore: VectorStore, llm: LLMClient) -> List[Dict[str, Any]]:
+    """Load the (cached) documents and bring the index up to date with them.
+
+    Does not wait for a build another request already started while an index is
+    being served; the caller then queries that index.
+    """
     docs = read_documents(Config.CONTENT_DIR)
-    _build_index_if_needed(docs, VSTORE, LLM)
-
-    q_emb = LLM.embed([req.question])[0]
-    results = VSTORE.query(q_emb, top_k=req.top_k)
-    hits = results
-    context = "\n\n".join([h.get("metadata", {}).get("snippet", "") for h in hits])
-    prompt = f"You are a helpful subject-matter expert. Use ONLY the context to answer.\n\nContext:\n{context}\n\nQuestion: {req.question}\nAnswer:"
-    resp = LLM.chat(
-        [
-            {"role": "system", "content": "You are a helpful subject-matter expert."},
-            {"role": "user", "content": prompt},
-        ]
+    _build_index_if_needed(docs, vstore, llm, wait=False)
+    return docs
+
+
+def warm_index() -> None:
+    """Build (or load) the index ahead of the first question (``INDEX_WARMUP``)."""
+    try:
+        vstore, llm = get_services()
+        vstore = _build_index_if_needed(read_documents(Config.CONTENT_DIR), vstore, llm)
+        logger.info(f"Index warmup finished: {len(vstore)} vectors.")
+    except Exception as e:
+        logger.error(f"Index warmup failed: {e}")
+
+
+def _search_live(
+    vstore: VectorStore,
+    llm: LLMClient,
+    question: str,
+    top_k: int,
+    mode: str,
+    flt=None,
+    q_emb: List[float] | None = None,
+    docs: List[Dict[str, Any]] | None = None,
+) -> List[Dict[str, Any]]:
+    """``_search`` plus hit texts, read consistently while an update is published.
+
+    Runs under the read side of ``_LIVE_LOCK`` against the current store, and
+    slices texts from the documents the published index was built from (``docs``
+    if none were recorded). The question is embedded before the lock is taken, so
+    a slow embedding call never holds up a pending publish.
+    """
+    if q_emb is None and _needs_embedding(mode):
+        q_emb = _embed(llm, [question])[0]
+    with _LIVE_LOCK.reading():
+        store = _current_store(vstore)
+        hits = _search(store, llm, question, top_k, mode, flt, q_emb)
+        corpus = _INDEX_CORPUS if _INDEX_CORPUS is not None else docs or []
+        return _with_text(hits, corpus)
+
+
+def _needs_embedding(mode: str) -> bool:
+    """Whether ``_search`` in ``mode`` needs the question embedding."""
+    return mode != "lexical" or _LEXICAL is None
+
+
+def _with_text(
+    hits: List[Dict[str, Any]], docs: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    texts = {d.get("path"): d.get("text") or "" for d in docs}
+    return [{**h, "text": _chunk_text(h.get("metadata") or {}, texts)} for h in hits]
+
+
+async def _aembed(llm: LLMClient, texts: List[str]) -> List[List[float]]:
+    """Async ``_embed``: cache misses go through ``llm.aembed`` when available."""
+
+    async def provider(missing: List[str]) -> List[List[float]]:
+        if hasattr(llm, "aembed"):
+            return await llm.aembed(missing)
+        return await asyncio.to_thread(llm.embed, missing)
+
+    cache = _get_embedding_cache()
+    if cache is None:
+        return await provider(texts)
+    model = Config.EMBEDDING_MODEL
+    vectors = await asyncio.to_thread(cache.get_many, model, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fresh = dict(zip(missing, await provider(missing)))
+        await asyncio.to_thread(
+            cache.put_many, model, missing, [fresh[t] for t in missing]
+        )
+        vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+    return vectors
+
+
+async def aretrieve(
+    question: str,
+    top_k: int = 5,
+    mode: str | None = None,
+    filters: QAFilters | None = None,
+) -> List[Dict[str, Any]]:
+    """Async ``retrieve`` used by the HTTP endpoints.
+
+    Index maintenance and the vector search run on worker threads, while the
+    question embedding is awaited on the shared async client, so a request waiting
+    on the network does not hold a thread.
+    """
+    vstore, llm = get_services()
+    docs = await asyncio.to_thread(_refresh_index, vstore, llm)
+    mode = mode or Config.RETRIEVAL_MODE
+    q_emb = None
+    if _needs_embedding(mode):
+        q_emb = (await _aembed(llm, [question]))[0]
+    flt = _metadata_filter(filters)
+    return await asyncio.to_thread(
+        _search_live, vstore, llm, question, top_k, mode, flt, q_emb, docs
     )
+
+
+def _answer_messages(question: str, hits: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    context = "\n\n".join(h.get("text", "")[:SNIPPET_CHARS] for h in hits)
+    prompt = f"You are a helpful subject-matter expert. Use ONLY the context to answer.\n\nContext:\n{context}\n\nQuestion: {question}\nAnswer:"
+    return [
+        {"role": "system", "content": "You are a helpful subject-matter expert."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def synthesize(question: str, hits: List[Dict[str, Any]]) -> str:
+    """Answer ``question`` from retrieved ``hits`` with one chat completion."""
+    _, llm = get_services()
+    resp = llm.chat(_answer_messages(question, hits))
+    try:
+        return resp.choices[0].message.content.strip()
+    except Exception:
+        return str(resp)
+
+
+async def asynthesize(question: str, hits: List[Dict[str, Any]]) -> str:
+    """Async ``synthesize`` (falls back to a worker thread without ``achat``)."""
+    _, llm = get_services()
+    if not hasattr(llm, "achat"):
+        return await asyncio.to_thread(synthesize, question, hits)
+    resp = await llm.achat(_answer_messages(question, hits))
     try:
-        answer = resp.choices[0].message.content.strip()
+        return resp.choices[0].message.content.strip()
     except Exception:
-        answer = str(resp)
-    # Build ordered, deduplicated list of source metadata dicts so the UI can render
-    # precise citations (source path, page, paragraph, chunk_index, snippet).
+        return str(resp)
+
+
+async def asynthesize_stream(
+    question: str, hits: List[Dict[str, Any]]
+) -> AsyncIterator[str]:
+    """Async ``synthesize_stream``; without ``achat_stream`` the answer is one delta."""
+    _, llm = get_services()
+    if not hasattr(llm, "achat_stream"):
+        yield await asynthesize(question, hits)
+        return
+    async for delta in llm.achat_stream(_answer_messages(question, hits)):
+        yield delta
+
+
+def synthesize_stream(question: str, hits: List[Dict[str, Any]]) -> Iterator[str]:
+    """Like ``synthesize`` but yields the answer in deltas as the model produces them.
+
+    Clients without ``chat_stream`` get the whole answer as a single delta.
+    """
+    _, llm = get_services()
+    if not hasattr(llm, "chat_stream"):
+        yield synthesize(question, hits)
+        return
+    yield from llm.chat_stream(_answer_messages(question, hits))
+
+
+def _sse(event: str, data: Any) -> str:
+    # JSON keeps newlines inside tokens from breaking the event framing
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def format_sources(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ordered, deduplicated citation dicts for ``hits`` (as returned by ``retrieve``).
+
+    Each entry has the source path plus page, paragraph, chunk index and snippet
+    when known. Deduplicated vectors list every copy of the chunk under "sources".
+    """
     seen = set()
     sources = []
     for h in hits:
-        meta = h.get("metadata", {})
-        key = (
-            meta.get("source"),
-            meta.get("page"),
-            meta.get("para"),
-            meta.get("chunk_index"),
-        )
-        if key in seen:
-            continue
-        seen.add(key)
-        # include at minimum the source; keep snippet/page/para if available
-        entry = {
-            k: v
-            for k, v in meta.items()
-            if k in ("source", "snippet", "page", "para", "chunk_index")
-        }
-        sources.append(entry)
+        meta = h.get("metadata") or {}
+        snippet = h.get("text", "")[:SNIPPET_CHARS]
+        for member in meta.get("sources") or [meta]:
+            key = (
+                member.get("source"),
+                member.get("page"),
+                member.get("para"),
+                member.get("para_end"),
+                member.get("chunk_index"),
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            # include at minimum the source; keep snippet/page/para if available
+            entry = {
+                k: v
+                for k, v in {**member, "snippet": snippet}.items()
+                if k in ("source", "snippet", "page", "para", "para_end", "chunk_index")
+                and v is not None
+            }
+            sources.append(entry)
+    return sources
 
-    return {"answer": answer, "sources": sources}
+
+def qa(req: QARequest):
+    """Synchronous QA pipeline for in-process callers; ``POST /qa`` is ``aqa``."""
+    if not req.question:
+        return {"answer": "", "sources": []}
+
+    hits = retrieve(req.question, req.top_k, req.mode, req.filters)
+    return {"answer": synthesize(req.question, hits), "sources": format_sources(hits)}
+
+
+def qa_sources(req: QARequest):
+    """Ranked citations for ``req.question`` without generating an answer (no chat call)."""
+    if not req.question:
+        return {"sources": []}
+    hits = retrieve(req.question, req.top_k, req.mode, req.filters)
+    return {"sources": format_sources(hits)}
+
+
+@app.post("/qa")
+async def aqa(req: QARequest):
+    """Async ``qa``: the event loop serves other requests while this one awaits the LLM."""
+    if not req.question:
+        return {"answer": "", "sources": []}
+
+    hits = await aretrieve(req.question, req.top_k, req.mode, req.filters)
+    answer = await asynthesize(req.question, hits)
+    return {"answer": answer, "sources": format_sources(hits)}
+
+
+@app.post("/qa/sources")
+async def aqa_sources(req: QARequest):
+    """Async ``qa_sources``."""
+    if not req.question:
+        return {"sources": []}
+    hits = await aretrieve(req.question, req.top_k, req.mode, req.filters)
+    return {"sources": format_sources(hits)}
+
+
+@app.post("/qa/stream")
+async def qa_stream(req: QARequest):
+    """Server-Sent Events: ``token`` events with answer deltas, then one ``sources`` event.
+
+    Retrieval happens before the response starts, so retrieval errors still surface
+    as regular HTTP errors; a failure while generating is sent as an ``error`` event.
+    """
+    hits = []
+    if req.question:
+        hits = await aretrieve(req.question, req.top_k, req.mode, req.filters)
+
+    async def events() -> AsyncIterator[str]:
+        if req.question:
+            try:
+                async for delta in asynthesize_stream(req.question, hits):
+                    yield _sse("token", delta)
+            except Exception as e:
+                logger.error(f"Streaming answer failed: {e}")
+                yield _sse("error", str(e))
+        yield _sse("sources", format_sources(hits))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def reset_index_cache():
     """Force the in-memory index to rebuild on the next QA call."""
-    global _INDEX_FINGERPRINT, _INDEX_READY
-    vstore, _ = get_services()
-    if hasattr(vstore, "clear"):
-        vstore.clear()
-    _INDEX_FINGERPRINT = None
-    _INDEX_READY = False
+    global _INDEX_FINGERPRINT, _INDEX_READY, _INDEX_DOCS, _DEDUP, _LEXICAL
+    global _INDEX_CORPUS
+    with _INDEX_LOCK, _LIVE_LOCK.writing():
+        vstore, _ = get_services()
+        if hasattr(vstore, "clear"):
+            vstore.clear()
+        _INDEX_FINGERPRINT = None
+        _INDEX_READY = False
+        _INDEX_DOCS = {}
+        _INDEX_CORPUS = None
+        _DEDUP = None
+        _LEXICAL = None
@@ -1,43 +1,154 @@
 import os
-from typing import List
+from typing import Dict, List, Sequence
+
+from loguru import logger
 
 
 class VectorStore:
-    """A minimal vector store abstraction. Currently provides an in-memory fallback.
+    """A minimal vector store abstraction.
+
+    Providers are selected via the `VECTOR_PROVIDER` env var:
+      - ``memory``: pure-Python list scan (default, no dependencies).
+      - ``numpy``: contiguous, pre-normalized float32 matrix with vectorized top-k
+        search (see ``tinychatbot.numpy_store``).
+      - ``ivf``: approximate search with k-means inverted lists written in NumPy
+        only (see ``tinychatbot.ivf_store``), for hosts without ``faiss-cpu``.
+      - ``faiss``: FAISS flat/IVF/HNSW index (see ``tinychatbot.faiss_store``). Falls
+        back to ``numpy`` with a warning when ``faiss-cpu`` is not installed.
 
-    Concrete providers (FAISS, Pinecone, Chroma) are planned and can be selected via
-    `VECTOR_PROVIDER` env var.
+    Further providers (Pinecone, Chroma) are planned and will plug in here.
     """
 
-    def __init__(self):
-        provider = os.getenv("VECTOR_PROVIDER", "memory").lower()
+    def __init__(self, provider: str | None = None):
+        provider = (provider or os.getenv("VECTOR_PROVIDER", "memory")).lower()
         self.provider = provider
+        self._backend = None
         if provider == "memory":
             self._vectors = []
+            # id -> position in self._vectors, so upserts don't scan the list
+            self._index: Dict[str, int] = {}
+        elif provider == "numpy":
+            # Lazy import so the memory provider works without numpy installed
+            from .numpy_store import NumpyVectorStore
+
+            self._backend = NumpyVectorStore()
+        elif provider == "ivf":
+            from .ivf_store import IVFVectorStore
+
+            self._backend = IVFVectorStore()
+        elif provider == "faiss":
+            try:
+                from .faiss_store import FaissVectorStore
+
+                self._backend = FaissVectorStore()
+            except ImportError as e:
+                from .numpy_store import NumpyVectorStore
+
+                logger.warning(f"{e}; falling back to the numpy vector provider.")
+                self.provider = "numpy"
+                self._backend = NumpyVectorStore()
         else:
             raise NotImplementedError(
                 f"Vector provider '{provider}' not implemented in this minimal refactor"
             )
 
+    def __len__(self) -> int:
+        if self._backend is not None:
+            return len(self._backend)
+        return len(self._vectors)
+
     def upsert(self, id: str, embedding: List[float], metadata: dict | None = None):
+        if self._backend is not None:
+            return self._backend.upsert(id, embedding, metadata)
         # Replace existing vector with same id if present (upsert semantics)
-        for i, v in enumerate(self._vectors):
-            if v.get("id") == id:
-                self._vectors[i] = {
-                    "id": id,
-                    "embedding": embedding,
-                    "metadata": metadata or {},
-                }
-                return
-        self._vectors.append(
-            {"id": id, "embedding": embedding, "metadata": metadata or {}}
-        )
+        entry = {"id": id, "embedding": embedding, "metadata": metadata or {}}
+        pos = self._index.get(id)
+        if pos is not None:
+            self._vectors[pos] = entry
+            return
+        self._index[id] = len(self._vectors)
+        self._vectors.append(entry)
+
+    def upsert_many(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[List[float]],
+        metadatas: Sequence[dict | None] | None = None,
+    ):
+        """Insert or replace many vectors in one call (linear in the batch size)."""
+        if self._backend is not None:
+            return self._backend.upsert_many(ids, embeddings, metadatas)
+        if len(ids) != len(embeddings):
+            raise ValueError("ids and embeddings must have the same length")
+        if metadatas is None:
+            metadatas = [None] * len(ids)
+        for id, emb, meta in zip(ids, embeddings, metadatas):
+            self.upsert(id, emb, meta)
+
+    def delete(self, id: str) -> bool:
+        """Remove a vector by id; returns False if it was not present."""
+        if self._backend is not None:
+            return self._backend.delete(id)
+        pos = self._index.pop(id, None)
+        if pos is None:
+            return False
+        # Move the last entry into the hole so the list stays compact
+        last = self._vectors.pop()
+        if pos < len(self._vectors):
+            self._vectors[pos] = last
+            self._index[last["id"]] = pos
+        return True
+
+    def get_metadata(self, id: str) -> dict | None:
+        """Return the metadata stored with ``id`` (None if unknown)."""
+        if self._backend is not None:
+            return self._backend.get_metadata(id)
+        pos = self._index.get(id)
+        return None if pos is None else self._vectors[pos]["metadata"]
+
+    def update_metadata(self, id: str, metadata: dict) -> bool:
+        """Replace the metadata of a stored vector; returns False if ``id`` is unknown."""
+        if self._backend is not None:
+            return self._backend.update_metadata(id, metadata)
+        pos = self._index.get(id)
+        if pos is None:
+            return False
+        self._vectors[pos]["metadata"] = metadata
+        return True
 
     def clear(self):
         """Clear all vectors (useful to isolate per-request indexes)."""
+        if self._backend is not None:
+            return self._backend.clear()
         self._vectors = []
+        self._index = {}
+
+    def save(self, directory: str, **manifest):
+        """Persist the index to ``directory`` (numpy and faiss providers only)."""
+        if self._backend is None or not hasattr(self._backend, "save"):
+            raise NotImplementedError(
+                f"Vector provider '{self.provider}' does not support persistence"
+            )
+        return self._backend.save(directory, **manifest)
+
+    def load(self, directory: str) -> dict | None:
+        """Load a persisted index; returns its manifest or None if none is usable."""
+        if self._backend is None or not hasattr(self._backend, "load"):
+            raise NotImplementedError(
+                f"Vector provider '{self.provider}' does not support persistence"
+            )
+        return self._backend.load(directory)
+
+    def query(self, embedding: List[float], top_k: int = 5, filter=None):
+        """Return the ``top_k`` most similar vectors.
 
-    def query(self, embedding: List[float], top_k: int = 5):
+        ``filter`` is an optional ``filters.MetadataFilter``; rows that don't match
+        are excluded before scoring.
+        """
+        if self._backend is not None:
+            if filter is None:
+                return self._backend.query(embedding, top_k=top_k)
+            return self._backend.query(embedding, top_k=top_k, filter=filter)
         # naive cosine distance ranking
         from math import sqrt
 
@@ -47,8 +158,12 @@ class VectorStore:
         def norm(a):
             return sqrt(sum(x * x for x in a))
 
+        if filter is not None and filter.is_empty():
+            filter = None
         scored = []
         for v in self._vectors:
+            if filter is not None and not filter.matches(v["metadata"]):
+                continue
             score = dot(embedding, v["embedding"]) / (
                 norm(embedding) * norm(v["embedding"]) + 1e-12
             )
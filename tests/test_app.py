@@ -177,3 +177,184 @@ def test_chat_with_tool_calls(monkeypatch):
 
         assert answer == "Final answer."
         assert mock_client.chat.completions.create.call_count == 2
+
+
+def _retrieval_agent(monkeypatch, n_docs):
+    from tinychatbot import qa_service as qs
+    from tinychatbot.config import Config
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(Config, "PROMPT_MODE", "retrieval")
+    monkeypatch.setattr(Config, "PROMPT_TOP_K", 3)
+    monkeypatch.setattr(Config, "PROMPT_TOKEN_BUDGET", 100)
+    monkeypatch.setattr(Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    docs = [
+        {"path": f"content/doc{i}.txt", "text": f"Topic {i}. " + "filler " * 200}
+        for i in range(n_docs)
+    ]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+
+    class FakeLLM:
+        def embed(self, texts, **kwargs):
+            return [[1.0, float(len(t) % 7)] for t in texts]
+
+    monkeypatch.setattr(qs, "get_services", lambda: (VectorStore("numpy"), FakeLLM()))
+
+    agent = ContentAgent.__new__(ContentAgent)
+    agent.docs = {d["path"]: d["text"] for d in docs}
+    agent.content_dir = "content"
+    agent.persona_store = {}
+    agent.persona_id = "default"
+    return agent
+
+
+def test_system_prompt_retrieval_mode_has_constant_size(monkeypatch):
+    """PROMPT_MODE=retrieval includes only the retrieved chunks within the budget."""
+    small = _retrieval_agent(monkeypatch, 5).system_prompt("Topic 1?", [])
+    large = _retrieval_agent(monkeypatch, 200).system_prompt("Topic 1?", [])
+
+    assert "subject-matter expert" in large
+    assert large.count("--- doc") <= 3
+    # ~100 tokens of excerpts (4 chars/token without tiktoken) plus the instructions
+    assert abs(len(large) - len(small)) < 100
+    assert len(large) < 2000
+    # Without a message (e.g. callers of the old API) the full listing is kept
+    assert "doc199.txt" in _retrieval_agent(monkeypatch, 200).system_prompt()
+
+
+def test_retrieval_query_includes_previous_user_turns():
+    from tinychatbot.app import _retrieval_query
+
+    history = [
+        {"role": "user", "content": "Tell me about the X200 router"},
+        {"role": "assistant", "content": "It is a router."},
+    ]
+    assert _retrieval_query("and its price?", history) == (
+        "Tell me about the X200 router\nand its price?"
+    )
+
+
+def test_chat_with_citations_retrieves_once_and_completes_once(monkeypatch):
+    """The UI path shares one retrieval between the prompt and the citations."""
+    from tinychatbot import qa_service as qs
+    from tinychatbot.app import chat_with_citations
+    from tinychatbot.config import Config
+
+    monkeypatch.setattr(Config, "PROMPT_MODE", "retrieval")
+    hits = [
+        {
+            "metadata": {"source": "content/a.pdf", "page": 2, "para": 1},
+            "text": "Alpha excerpt.",
+        }
+    ]
+    calls = []
+    monkeypatch.setattr(qs, "retrieve", lambda q, top_k=5: calls.append(q) or hits)
+    monkeypatch.setattr(
+        qs, "get_services", MagicMock(side_effect=AssertionError("no qa() call"))
+    )
+
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "Answer."
+    mock_response.choices[0].finish_reason = "stop"
+    mock_client.chat.completions.create.return_value = mock_response
+
+    agent = ContentAgent.__new__(ContentAgent)
+    agent.openai = mock_client
+    agent.docs = {}
+    agent.content_dir = "content"
+    agent.persona_store = {}
+    agent.persona_id = "default"
+
+    answer = chat_with_citations(agent, "What is alpha?", [])
+
+    assert calls == ["What is alpha?"]
+    mock_client.chat.completions.create.assert_called_once()
+    system = mock_client.chat.completions.create.call_args.kwargs["messages"][0]
+    assert "Alpha excerpt." in system["content"]
+    assert answer.startswith("Answer.")
+    assert "a.pdf, page:2, para:1" in answer
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None):
+    from types import SimpleNamespace
+
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)]
+    )
+
+
+def _tool_part(index, id=None, name=None, arguments=None):
+    from types import SimpleNamespace
+
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=id, function=function)
+
+
+def test_chat_stream_yields_deltas_across_tool_calls():
+    """Tool-call fragments are assembled, executed, and streaming continues."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = [
+        iter(
+            [
+                _chunk(tool_calls=[_tool_part(0, "call_1", "record_unknown_question")]),
+                _chunk(tool_calls=[_tool_part(0, arguments='{"question": ')]),
+                _chunk(tool_calls=[_tool_part(0, arguments='"Unknown"}')]),
+                _chunk(finish_reason="tool_calls"),
+            ]
+        ),
+        iter([_chunk("I have "), _chunk("recorded it."), _chunk(finish_reason="stop")]),
+    ]
+
+    agent = ContentAgent.__new__(ContentAgent)
+    agent.openai = mock_client
+    agent.system_prompt = MagicMock(return_value="System prompt")
+
+    with patch("tinychatbot.app.record_unknown_question") as mock_record:
+        mock_record.return_value = {"recorded": "ok"}
+        deltas = list(agent.chat_stream("Test question", []))
+
+    assert deltas == ["I have ", "recorded it."]
+    mock_record.assert_called_once_with(question="Unknown")
+    second = mock_client.chat.completions.create.call_args_list[1].kwargs
+    assert second["stream"] is True
+    assert second["messages"][-2]["tool_calls"][0]["id"] == "call_1"
+    assert second["messages"][-1]["tool_call_id"] == "call_1"
+
+
+def test_chat_with_citations_stream_yields_growing_reply(monkeypatch):
+    from tinychatbot.app import chat_with_citations_stream
+
+    agent = ContentAgent.__new__(ContentAgent)
+    agent.content_dir = "content"
+    agent.retrieve = MagicMock(
+        return_value=[{"metadata": {"source": "content/a.txt", "page": 1}, "text": ""}]
+    )
+    agent.chat_stream = MagicMock(return_value=iter(["Hel", "lo"]))
+
+    replies = list(chat_with_citations_stream(agent, "Hi", []))
+
+    assert replies[:2] == ["Hel", "Hello"]
+    assert replies[-1].startswith("Hello\n\n\nCitations:")
+    assert "a.txt, page:1" in replies[-1]
+
+
+@pytest.mark.parametrize(
+    "personas", [{}, {"p": MagicMock(display_name="P", emoji="*")}]
+)
+def test_main_passes_a_generator_function_to_chat_interface(monkeypatch, personas):
+    import inspect
+
+    from tinychatbot import app
+
+    monkeypatch.setattr(app, "load_personas", lambda d: personas)
+    monkeypatch.setattr(app, "ContentAgent", MagicMock())
+    chat_interface = MagicMock()
+    monkeypatch.setattr(app.gr, "ChatInterface", chat_interface)
+    monkeypatch.setattr(app.gr, "Dropdown", MagicMock())
+
+    app.main()
+
+    assert inspect.isgeneratorfunction(chat_interface.call_args.kwargs["fn"])
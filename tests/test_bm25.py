@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tinychatbot import qa_service as qs
+
+pytest.importorskip("numpy")
+
+from tinychatbot.bm25 import BM25Index, reciprocal_rank_fusion, tokenize  # noqa: E402
+
+CHUNKS = {
+    "a": "Upgrading to PoggleBase v3.2.1 fixes the replication bug.",
+    "b": "PoggleBase v2.0 introduced replication across regions.",
+    "c": "Our cafeteria serves soup on Fridays.",
+}
+
+
+def test_tokenize_keeps_versions_and_codes():
+    assert tokenize("PoggleBase v3.2.1, x86-64!") == ["pogglebase", "v3.2.1", "x86-64"]
+
+
+def test_query_ranks_exact_version_first():
+    index = BM25Index()
+    index.add_many(list(CHUNKS), CHUNKS.values())
+
+    hits = index.query("PoggleBase v3.2.1", top_k=5)
+    assert [id for id, _ in hits] == ["a", "b"]
+    assert index.query("unrelated words", top_k=5) == []
+
+
+def test_delete_replace_and_compact():
+    index = BM25Index()
+    index.add_many(list(CHUNKS), CHUNKS.values())
+    assert index.delete("a")
+    assert not index.delete("a")
+    index.add("b", "soup of the day")
+    assert [id for id, _ in index.query("replication", 5)] == []
+
+    index.compact()
+    assert len(index) == 2
+    assert {id for id, _ in index.query("soup", 5)} == {"b", "c"}
+
+
+def test_save_and_load(tmp_path):
+    index = BM25Index()
+    index.add_many(list(CHUNKS), CHUNKS.values())
+    index.delete("c")
+    ids, postings = list(index._ids), dict(index._postings)
+    index.save(str(tmp_path))
+    # Saving writes a compacted copy and leaves the live index as it was
+    assert index._ids == ids and index._postings == postings
+
+    restored = BM25Index()
+    assert restored.load(str(tmp_path))
+    assert restored.query("PoggleBase v3.2.1", 5) == index.query("PoggleBase v3.2.1", 5)
+    assert not BM25Index().load(str(tmp_path / "missing"))
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["x", "y"], ["y", "z"]], k=60)
+    assert [id for id, _ in fused] == ["y", "x", "z"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def _answer(messages, **kwargs):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]
+    )
+
+
+def test_lexical_mode_skips_question_embedding(monkeypatch):
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "LEXICAL_INDEX", True)
+    docs = [{"path": f"{id}.txt", "text": text} for id, text in CHUNKS.items()]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    embedded = []
+
+    class RecordingLLM:
+        def embed(self, texts, **kwargs):
+            embedded.extend(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+        chat = staticmethod(_answer)
+
+    store = VectorStore(provider="numpy")
+    monkeypatch.setattr(qs, "get_services", lambda: (store, RecordingLLM()))
+
+    resp = qs.qa(qs.QARequest(question="PoggleBase v3.2.1", top_k=1, mode="lexical"))
+    assert [s["source"] for s in resp["sources"]] == ["a.txt"]
+    assert "PoggleBase v3.2.1" not in embedded
+
+    resp = qs.qa(qs.QARequest(question="PoggleBase v3.2.1", top_k=2, mode="hybrid"))
+    assert resp["sources"][0]["source"] == "a.txt"
+    assert embedded[-1] == "PoggleBase v3.2.1"
@@ -71,3 +71,100 @@ def test_qa_includes_metadata(monkeypatch):
     first = resp["sources"][0]
     assert "source" in first
     assert "page" in first or "snippet" in first
+
+
+class _CountingEncoder:
+    """Whitespace 'tokenizer' that records how often it is called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split(" ")
+
+    def decode(self, tokens):
+        self.calls += 1
+        return " ".join(tokens)
+
+    def encode_batch(self, texts):
+        self.calls += 1
+        return [t.split(" ") for t in texts]
+
+    def decode_batch(self, batch):
+        self.calls += 1
+        return [" ".join(tokens) for tokens in batch]
+
+
+def _reference_chunks(text, path, size, overlap):
+    # Per-paragraph chunking as done before the batched implementation
+    out = []
+    for p_idx, page in enumerate(text.split("\f"), start=1):
+        paras = [p for p in page.split("\n\n") if p.strip()]
+        for para_idx, para in enumerate(paras, start=1):
+            for sc_idx, sc in enumerate(qs.chunk_text(para, size, overlap)):
+                meta = {"source": path, "page": p_idx, "para": para_idx}
+                out.append((sc, {**meta, "chunk_index": sc_idx}))
+    return out
+
+
+def test_batched_chunking_matches_per_paragraph(monkeypatch):
+    enc = _CountingEncoder()
+    monkeypatch.setattr(qs, "_get_encoder", lambda model: enc)
+    words = " ".join(f"w{i}" for i in range(37))
+    text = f"{words}\n\nshort para\n\n  \f{words} {words}\n\nend"
+
+    expected = _reference_chunks(text, "/tmp/doc.txt", 10, 3)
+    enc.calls = 0
+    got = qs.chunk_with_metadata(text, "/tmp/doc.txt", 10, 3)
+
+    offsets = [(meta.pop("start"), meta.pop("end")) for _, meta in got]
+    assert got == expected
+    # Character offsets point back at each chunk's text in the document
+    assert [text[a:b] for a, b in offsets] == [chunk for chunk, _ in got]
+    # One encode_batch and one decode_batch for the whole document
+    assert enc.calls == 2
+
+
+def test_chunking_without_encoder_uses_characters(monkeypatch):
+    monkeypatch.setattr(qs, "_get_encoder", lambda model: None)
+    text = "a" * 25 + "\n\nbb"
+    got = qs.chunk_with_metadata(text, "/tmp/doc.txt", 10, 10)
+
+    offsets = [(meta.pop("start"), meta.pop("end")) for _, meta in got]
+    assert got == _reference_chunks(text, "/tmp/doc.txt", 10, 10)
+    assert [text[a:b] for a, b in offsets] == [chunk for chunk, _ in got]
+    # overlap >= size still advances one character per window
+    assert [c for c, m in got if m["para"] == 2] == ["bb", "b"]
+
+
+def test_packed_chunks_merge_paragraphs_with_ranges(monkeypatch):
+    monkeypatch.setattr(qs, "_get_encoder", lambda model: _CountingEncoder())
+    turns = [f"Speaker{i % 2}: turn {i}" for i in range(6)]  # 3 tokens each
+    long_para = " ".join(f"w{i}" for i in range(25))
+    text = "\n\n".join(turns) + "\n\n" + long_para + "\fnext page"
+
+    chunks = qs.chunk_with_metadata(text, "/tmp/t.txt", 10, 0, pack=True)
+
+    assert [(m["page"], m["para"], m["para_end"]) for _, m in chunks] == [
+        (1, 1, 2),
+        (1, 3, 4),
+        (1, 5, 6),
+        (1, 7, 7),
+        (1, 7, 7),
+        (1, 7, 7),
+        (2, 1, 1),
+    ]
+    assert chunks[0][0] == "Speaker0: turn 0\n\nSpeaker1: turn 1"
+    # The oversized paragraph is still windowed on its own
+    assert [m["chunk_index"] for _, m in chunks[3:6]] == [0, 1, 2]
+
+
+def test_packed_chunks_repeat_trailing_paragraphs_as_overlap(monkeypatch):
+    monkeypatch.setattr(qs, "_get_encoder", lambda model: None)
+    text = "\n\n".join(["aaaa", "bb", "cccc", "dd"])
+
+    chunks = qs.chunk_with_metadata(text, "/tmp/t.txt", 10, 3, pack=True)
+
+    assert [c for c, _ in chunks] == ["aaaa\n\nbb", "bb\n\ncccc\n\ndd"]
+    assert [(m["para"], m["para_end"]) for _, m in chunks] == [(1, 2), (2, 4)]
@@ -0,0 +1,160 @@
+import pytest
+
+from tinychatbot import qa_service as qs
+
+pytest.importorskip("numpy")
+
+from tinychatbot.dedup import ChunkDeduper  # noqa: E402
+
+FOOTER = "Confidential. Copyright 2024 Example Corp. All rights reserved worldwide."
+BODY = (
+    "the quick brown fox jumps over the lazy dog while the farmer watches "
+    "from the porch and the sun sets slowly behind the distant green hills"
+)
+
+
+def test_exact_duplicates_share_one_group():
+    deduper = ChunkDeduper()
+    vid, new = deduper.assign(FOOTER, {"source": "a.pdf", "page": 1})
+    again, again_new = deduper.assign(
+        "  confidential.  COPYRIGHT 2024 example corp. all rights reserved worldwide.",
+        {"source": "b.pdf", "page": 3},
+    )
+
+    assert new and not again_new
+    assert again == vid
+    sources = deduper.metadata(vid)["sources"]
+    assert sources == [{"source": "a.pdf", "page": 1}, {"source": "b.pdf", "page": 3}]
+
+    assert not deduper.release(vid, "a.pdf")
+    assert deduper.metadata(vid)["sources"] == [{"source": "b.pdf", "page": 3}]
+    assert deduper.release(vid, "b.pdf")
+    assert vid not in deduper
+
+
+def test_near_duplicates_need_lsh():
+    edited = BODY.replace("green", "blue")
+    exact = ChunkDeduper()
+    exact.assign(BODY, {"source": "a.txt"})
+    assert exact.assign(edited, {"source": "b.txt"})[1]
+
+    near = ChunkDeduper(near=True, threshold=0.7)
+    vid, _ = near.assign(BODY, {"source": "a.txt"})
+    assert near.assign(edited, {"source": "b.txt"}) == (vid, False)
+    # Unrelated text starts its own group
+    assert near.assign(FOOTER, {"source": "c.txt"})[1]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    deduper = ChunkDeduper(near=True, threshold=0.7)
+    vid, _ = deduper.assign(BODY, {"source": "a.txt"})
+    deduper.save(str(tmp_path))
+
+    restored = ChunkDeduper(near=True, threshold=0.7)
+    assert restored.load(str(tmp_path))
+    assert restored.metadata(vid) == deduper.metadata(vid)
+    assert restored.assign(BODY.replace("green", "blue"), {"source": "b.txt"}) == (
+        vid,
+        False,
+    )
+    assert not ChunkDeduper().load(str(tmp_path / "missing"))
+
+
+def test_rollback_restores_groups_and_signatures():
+    deduper = ChunkDeduper(near=True, threshold=0.7)
+    body, _ = deduper.assign(BODY, {"source": "a.txt"})
+    footer, _ = deduper.assign(FOOTER, {"source": "a.txt"})
+    before = {vid: deduper.metadata(vid) for vid in (body, footer)}
+
+    deduper.begin()
+    deduper.assign(FOOTER, {"source": "b.txt"})
+    assert deduper.release(body, "a.txt")
+    new, _ = deduper.assign("an entirely different sentence about tides", {})
+    deduper.rollback()
+
+    assert {vid: deduper.metadata(vid) for vid in (body, footer)} == before
+    assert new not in deduper and len(deduper) == 2
+    assert deduper.assign(BODY.replace("green", "blue"), {"source": "c.txt"}) == (
+        body,
+        False,
+    )
+
+
+def test_failed_live_update_leaves_the_deduper_untouched(monkeypatch):
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "DEDUP", "exact")
+    fail = []
+
+    class FlakyLLM:
+        def embed(self, texts, **kwargs):
+            if fail:
+                raise RuntimeError("provider down")
+            return [[float(len(t)), 1.0] for t in texts]
+
+    store = VectorStore(provider="numpy")
+    monkeypatch.setattr(qs, "_VSTORE", store)
+    docs = [{"path": "a.txt", "text": f"alpha body\n\n{FOOTER}"}]
+    qs._build_index_if_needed(docs, store, FlakyLLM())
+    deduper = qs._DEDUP
+    groups = {vid: deduper.metadata(vid) for vid in deduper._groups}
+
+    fail.append(True)
+    changed = [{"path": "a.txt", "text": f"alpha, revised\n\n{FOOTER}"}]
+    with pytest.raises(RuntimeError):
+        qs._build_index_if_needed(changed, store, FlakyLLM())
+    # Updated in place (no copy), and rolled back to match the live store
+    assert qs._DEDUP is deduper
+    assert {vid: deduper.metadata(vid) for vid in deduper._groups} == groups
+
+    fail.clear()
+    qs._build_index_if_needed(changed, store, FlakyLLM())
+    assert len(store) == 2 == len(qs._DEDUP)
+
+
+def test_index_build_embeds_duplicates_once(monkeypatch):
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "DEDUP", "exact")
+    embedded = []
+
+    class RecordingLLM:
+        def embed(self, texts, **kwargs):
+            embedded.extend(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+    store = VectorStore(provider="numpy")
+    docs = [
+        {"path": "a.txt", "text": f"alpha body\n\n{FOOTER}"},
+        {"path": "b.txt", "text": f"bravo body\n\n{FOOTER}"},
+    ]
+    texts = {d["path"]: d["text"] for d in docs}
+    qs._build_index_if_needed(docs, store, RecordingLLM())
+
+    assert embedded.count(FOOTER) == 1
+    assert len(store) == 3
+    hit = next(
+        h
+        for h in store.query([1.0, 1.0], top_k=10)
+        if qs._chunk_text(h["metadata"], texts) == FOOTER
+    )
+    assert [s["source"] for s in hit["metadata"]["sources"]] == ["a.txt", "b.txt"]
+
+    # Removing one copy keeps the shared vector for the other
+    embedded.clear()
+    qs._build_index_if_needed(docs[1:], store, RecordingLLM())
+    assert embedded == []
+    assert len(store) == 2
+    hit = next(
+        h
+        for h in store.query([1.0, 1.0], top_k=10)
+        if qs._chunk_text(h["metadata"], texts) == FOOTER
+    )
+    assert [s["source"] for s in hit["metadata"]["sources"]] == ["b.txt"]
+    # a.txt held the embedded copy: the vector now points into b.txt instead
+    assert hit["metadata"]["source"] == "b.txt"
+    assert qs._chunk_text(hit["metadata"], {"b.txt": texts["b.txt"]}) == FOOTER
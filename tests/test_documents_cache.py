@@ -0,0 +1,71 @@
+import os
+
+from tinychatbot.documents import CorpusCache
+from tinychatbot.io_utils import DocumentExtractor
+
+
+class CountingExtractor(DocumentExtractor):
+    def __init__(self):
+        super().__init__(enable_ocr=False)
+        self.extracted = []
+
+    def extract(self, path):
+        self.extracted.append(os.path.basename(path))
+        return super().extract(path)
+
+
+def test_corpus_cache_only_reextracts_changed_files(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    (tmp_path / "b.txt").write_text("bravo")
+    (tmp_path / "empty.txt").write_text("")
+    extractor = CountingExtractor()
+    cache = CorpusCache(str(tmp_path), extractor=extractor)
+
+    docs = cache.load()
+    assert sorted(os.path.basename(d["path"]) for d in docs) == ["a.txt", "b.txt"]
+    assert sorted(extractor.extracted) == ["a.txt", "b.txt", "empty.txt"]
+
+    extractor.extracted.clear()
+    assert cache.load() == docs
+    assert extractor.extracted == []
+
+    (tmp_path / "b.txt").write_text("BRAVO, longer")
+    (tmp_path / "a.txt").unlink()
+    docs = cache.load()
+    assert extractor.extracted == ["b.txt"]
+    assert [d["text"] for d in docs] == ["BRAVO, longer"]
+
+
+def test_corpus_cache_retries_failed_files(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    (tmp_path / "b.txt").write_text("bravo")
+
+    class FlakyExtractor(CountingExtractor):
+        def extract_many(self, paths):
+            texts = [self.extract(p) for p in paths]
+            self.failures = [(p, "timed out") for p in paths if p.endswith("b.txt")]
+            return [t if not p.endswith("b.txt") else "" for p, t in zip(paths, texts)]
+
+    extractor = FlakyExtractor()
+    cache = CorpusCache(str(tmp_path), extractor=extractor)
+    assert [os.path.basename(d["path"]) for d in cache.load()] == ["a.txt"]
+
+    # The failure was not cached: b.txt is extracted again on the next load
+    extractor.extracted.clear()
+    cache.load()
+    assert extractor.extracted == ["b.txt"]
+
+
+def test_cached_documents_carry_their_content_hash(tmp_path, monkeypatch):
+    from tinychatbot import qa_service as qs
+    from tinychatbot.documents import content_hash
+
+    (tmp_path / "a.txt").write_text("alpha")
+    docs = CorpusCache(str(tmp_path), extractor=CountingExtractor()).load()
+    assert docs[0]["hash"] == content_hash("alpha")
+
+    # The index fingerprint reuses the stored hash instead of re-reading the text
+    monkeypatch.setattr(qs, "_hash_text", lambda text: 1 / 0)
+    assert qs._fingerprint_documents(docs) == (
+        (docs[0]["path"], content_hash("alpha")),
+    )
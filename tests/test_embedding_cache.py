@@ -0,0 +1,57 @@
+from tinychatbot import qa_service as qs
+from tinychatbot.embedding_cache import EmbeddingCache
+
+
+def test_cache_roundtrip_is_keyed_by_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    cache.put_many("m1", ["a", "b"], [[0.5, 1.0], [2.0, 3.0]])
+
+    assert cache.get_many("m1", ["b", "x", "a"]) == [[2.0, 3.0], None, [0.5, 1.0]]
+    assert cache.get_many("m2", ["a"]) == [None]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put_many("m", ["a"], [[1.0]])
+    cache.put_many("m", ["b"], [[2.0]])
+    cache.get_many("m", ["a"])  # touch "a" so "b" becomes the LRU entry
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert len(cache) == 2
+    assert cache.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+def test_put_many_keeps_the_cap_across_processes_without_counting(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path, max_entries=3).put_many("m", ["a", "b"], [[1.0], [2.0]])
+
+    # Two handles on one file stand in for two worker processes
+    first = EmbeddingCache(path, max_entries=3)
+    second = EmbeddingCache(path, max_entries=3)
+    statements = []
+    first._conn.set_trace_callback(statements.append)
+    first.put_many("m", ["a", "b"], [[1.5], [2.0]])  # already cached: no growth
+    second.put_many("m", ["c", "c"], [[3.0], [3.0]])
+    first.get_many("m", ["a"])
+    first.put_many("m", ["d"], [[4.0]])
+
+    assert not any("COUNT" in sql for sql in statements)
+    assert len(first) == 3
+    assert first.get_many("m", ["a", "b", "c", "d"]) == [[1.5], None, [3.0], [4.0]]
+    second.put_many("m", ["e", "f"], [[5.0], [6.0]])
+    assert len(second) == 3
+
+
+def test_embed_only_sends_cache_misses(monkeypatch, tmp_path):
+    monkeypatch.setattr(qs.Config, "EMBED_CACHE", True)
+    monkeypatch.setattr(qs, "_EMBED_CACHE", EmbeddingCache(str(tmp_path / "c.db")))
+    sent = []
+
+    class FakeLLM:
+        def embed(self, texts, **kwargs):
+            sent.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    assert qs._embed(FakeLLM(), ["aa", "b", "aa"]) == [[2.0], [1.0], [2.0]]
+    assert qs._embed(FakeLLM(), ["b", "ccc"]) == [[1.0], [3.0]]
+    assert sent == [["aa", "b"], ["ccc"]]
@@ -0,0 +1,47 @@
+import os
+
+from tinychatbot.io_utils import DocumentExtractor
+
+
+def test_extraction_cache_skips_handlers_for_unchanged_files(tmp_path):
+    src = tmp_path / "notes.txt"
+    src.write_text("cached text")
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def handler(path):
+        calls.append(path)
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def make():
+        extractor = DocumentExtractor(enable_ocr=False, cache_dir=cache_dir)
+        extractor.register_handler(".txt", handler)
+        return extractor
+
+    assert make().extract(str(src)) == "cached text"
+    # A fresh extractor (e.g. after a restart) is served from disk
+    assert make().extract(str(src)) == "cached text"
+    assert len(calls) == 1
+
+    # Touching the file without changing content is still a hit (content hash matches)
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    assert make().extract(str(src)) == "cached text"
+    assert len(calls) == 1
+
+    src.write_text("changed text!")
+    assert make().extract(str(src)) == "changed text!"
+    assert len(calls) == 2
+
+
+def test_extraction_cache_is_keyed_by_settings(tmp_path):
+    src = tmp_path / "doc.txt"
+    src.write_text("hello")
+    cache_dir = str(tmp_path / "cache")
+    extractor = DocumentExtractor(enable_ocr=False, cache_dir=cache_dir)
+    extractor.extract(str(src))
+
+    other = DocumentExtractor(enable_ocr=True, cache_dir=cache_dir)
+    assert other.cache.get(str(src), other.cache_settings(str(src))) is None
+    assert extractor.cache.get(str(src), extractor.cache_settings(str(src))) == "hello"
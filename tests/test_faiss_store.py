@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from tinychatbot.faiss_store import FaissVectorStore  # noqa: E402
+from tinychatbot.vector_store import VectorStore  # noqa: E402
+
+
+def make_vectors(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_index_types_find_exact_match(index_type):
+    vecs = make_vectors()
+    store = FaissVectorStore(index_type=index_type, nlist=4, nprobe=4, train_min=50)
+    ids = [f"c{i}" for i in range(len(vecs))]
+    store.upsert_many(ids, vecs, [{"n": i} for i in range(len(vecs))])
+
+    hits = store.query(vecs[7], top_k=3)
+    assert hits[0]["id"] == "c7"
+    assert hits[0]["metadata"] == {"n": 7}
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-4)
+    assert len(hits[0]["embedding"]) == vecs.shape[1]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_upsert_and_delete(index_type):
+    vecs = make_vectors(n=60)
+    store = FaissVectorStore(index_type=index_type, nlist=2, train_min=40)
+    store.upsert_many([f"c{i}" for i in range(60)], vecs)
+
+    assert store.delete("c3") is True
+    assert store.delete("c3") is False
+    store.upsert("c4", vecs[5], {"n": "replaced"})
+    assert len(store) == 59
+
+    hits = store.query(vecs[5], top_k=5)
+    ids = [h["id"] for h in hits]
+    assert "c3" not in ids
+    assert ids.count("c4") == 1
+    assert {"c4", "c5"} <= set(ids[:2])
+
+
+def test_faiss_hnsw_compacts_tombstones():
+    vecs = make_vectors(n=100)
+    store = FaissVectorStore(index_type="hnsw")
+    ids = [f"c{i}" for i in range(100)]
+    store.upsert_many(ids, vecs, [{"n": i} for i in range(100)])
+
+    # Re-upserting everything tombstones every node; the graph is rebuilt instead
+    for _ in range(3):
+        store.upsert_many(ids, vecs[::-1], [{"n": i} for i in range(100)])
+    assert len(store._tombstones) <= 0.2 * len(store)
+    assert store._index.ntotal <= 1.2 * len(store)
+
+    # Compaction starts once tombstones exceed 20% of the live vectors
+    for i in range(16):
+        store.delete(f"c{i}")
+    assert len(store._tombstones) == 16
+    store.delete("c16")
+    assert not store._tombstones and store._index.ntotal == 83
+
+    hits = store.query(vecs[50], top_k=1)
+    assert hits[0]["id"] == "c49"
+    assert hits[0]["metadata"] == {"n": 49}
+
+
+def test_vector_store_faiss_provider():
+    vecs = make_vectors(n=10)
+    store = VectorStore(provider="faiss")
+    store.upsert_many([str(i) for i in range(10)], vecs.tolist())
+    assert store.provider == "faiss"
+    assert store.query(vecs[2].tolist(), top_k=1)[0]["id"] == "2"
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_save_and_load(tmp_path, index_type):
+    vecs = make_vectors(n=80)
+    store = FaissVectorStore(index_type=index_type, nlist=2, train_min=40)
+    store.upsert_many([f"c{i}" for i in range(80)], vecs, [{"n": i} for i in range(80)])
+    store.delete("c1")
+    store.save(str(tmp_path))
+
+    loaded = FaissVectorStore(index_type=index_type, nlist=2, train_min=40)
+    assert loaded.load(str(tmp_path))["count"] == 79
+    assert loaded.query(vecs[9], top_k=1)[0]["metadata"] == {"n": 9}
+    assert "c1" not in [h["id"] for h in loaded.query(vecs[1], top_k=5)]
+    # The loaded store keeps accepting writes with fresh FAISS ids
+    loaded.upsert("new", vecs[1])
+    assert loaded.query(vecs[1], top_k=1)[0]["id"] == "new"
+
+
+def test_faiss_untrained_ivf_saves_pending_vectors_as_binary(tmp_path):
+    import json
+
+    from tinychatbot.faiss_store import PENDING_FILE, SIDECAR_FILE
+
+    vecs = make_vectors(n=30)
+    store = FaissVectorStore(index_type="ivf", nlist=2, train_min=100)
+    store.upsert_many([f"c{i}" for i in range(30)], vecs)
+    store.save(str(tmp_path))
+
+    assert (tmp_path / PENDING_FILE).stat().st_size == 30 * 16 * 4
+    sidecar = json.loads((tmp_path / SIDECAR_FILE).read_text())
+    assert "pending" not in sidecar and len(sidecar["pending_ids"]) == 30
+
+    loaded = FaissVectorStore(index_type="ivf", nlist=2, train_min=100)
+    assert loaded.load(str(tmp_path))["count"] == 30
+    assert loaded.query(vecs[4], top_k=1)[0]["id"] == "c4"
+    # Still untrained: training happens once enough vectors have arrived
+    loaded.upsert_many([f"d{i}" for i in range(70)], make_vectors(n=70, seed=1))
+    assert not loaded._pending and loaded.query(vecs[4], top_k=1)[0]["id"] == "c4"
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_filtered_query(index_type):
+    from tinychatbot.filters import MetadataFilter
+
+    vecs = make_vectors(n=400)
+    store = FaissVectorStore(index_type=index_type, nlist=4, nprobe=1, train_min=50)
+    metas = [{"source": f"doc{i % 4}.pdf", "page": i % 8} for i in range(len(vecs))]
+    store.upsert_many([f"c{i}" for i in range(len(vecs))], vecs, metas)
+
+    flt = MetadataFilter(sources=["doc1.pdf"], page_min=5)
+    hits = store.query(vecs[0], top_k=10, filter=flt)
+    allowed = [i for i, m in enumerate(metas) if flt.matches(m)]
+    assert len(hits) == min(10, len(allowed))
+    assert all(flt.matches(h["metadata"]) for h in hits)
+    # Rows outside the filter are never returned, even the query vector itself
+    assert "c0" not in {h["id"] for h in hits}
@@ -0,0 +1,161 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import tinychatbot.qa_service as qs
+from tinychatbot.filters import FilterIndex, MetadataFilter
+from tinychatbot.ivf_store import IVFVectorStore
+from tinychatbot.numpy_store import NumpyVectorStore
+from tinychatbot.vector_store import VectorStore
+
+
+def make_rows(n=600, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    metas = [
+        {
+            "source": f"docs/{'manuals' if i % 3 == 0 else 'notes'}/f{i % 7}."
+            + ("pdf" if i % 2 else "txt"),
+            "page": i % 10,
+        }
+        for i in range(n)
+    ]
+    return [str(i) for i in range(n)], vecs, metas
+
+
+def test_metadata_filter_matching():
+    flt = MetadataFilter(prefix="docs/manuals", file_types=["PDF"], page_max=3)
+    assert flt.matches({"source": "docs/manuals/a.pdf", "page": 2})
+    assert not flt.matches({"source": "docs/manuals2/a.pdf", "page": 2})
+    assert not flt.matches({"source": "docs/manuals/a.txt", "page": 2})
+    assert not flt.matches({"source": "docs/manuals/a.pdf", "page": 4})
+    assert not flt.matches({"source": "docs/manuals/a.pdf"})
+    # Deduplicated chunks match if any member source does
+    shared = {"source": "x.txt", "sources": [{"source": "x.txt"}, {"source": "y.pdf"}]}
+    assert MetadataFilter(sources=["y.pdf"]).matches(shared)
+    assert MetadataFilter().is_empty()
+
+
+def test_filter_index_select_move_remove():
+    index = FilterIndex()
+    index.add(0, {"source": "a.pdf", "page": 1})
+    index.add(1, {"source": "b.pdf", "page": 5})
+    index.add(2, {"source": "a.pdf", "page": 7})
+    flt = MetadataFilter(sources=["a.pdf"], page_min=2)
+    assert index.select(flt, np.arange(3)).tolist() == [2]
+    index.remove(0)
+    index.move(2, 0)
+    assert index.select(flt, np.arange(2)).tolist() == [0]
+    assert index.select(MetadataFilter(page_max=5), np.arange(2)).tolist() == [1]
+
+
+def test_filters_match_any_copy_of_deduplicated_chunk():
+    shared = {
+        "source": "a.pdf",
+        "page": 1,
+        "sources": [{"source": "a.pdf", "page": 1}, {"source": "b.pdf", "page": 9}],
+    }
+    pages = MetadataFilter(page_min=5, page_max=10)
+    a_late = MetadataFilter(sources=["a.pdf"], page_min=5)
+    assert pages.matches(shared)
+    assert MetadataFilter(sources=["b.pdf"], page_min=5).matches(shared)
+    assert not a_late.matches(shared)
+
+    index = FilterIndex()
+    index.add(0, {"source": "a.pdf", "page": 2})
+    index.add(1, shared)
+    index.move(1, 3)
+    keys = np.array([0, 3])
+    assert index.select(pages, keys).tolist() == [3]
+    assert index.select(a_late, keys).tolist() == []
+    assert index.select(MetadataFilter(sources=["./b.pdf"]), keys).tolist() == [3]
+    assert index.select(MetadataFilter(sources=["./a.pdf"]), keys).tolist() == [0, 3]
+    index.remove(3)
+    assert index.select(pages, keys[:1]).tolist() == []
+
+
+@pytest.mark.parametrize(
+    "make_store",
+    [
+        lambda: VectorStore(provider="memory"),
+        lambda: NumpyVectorStore(),
+        lambda: IVFVectorStore(nprobe=2, min_train=100),
+    ],
+)
+def test_filtered_query_matches_brute_force(make_store):
+    ids, vecs, metas = make_rows()
+    store = make_store()
+    store.upsert_many(ids, vecs, metas)
+    for i in range(0, 600, 5):
+        store.delete(str(i))
+    alive = [i for i in range(600) if i % 5]
+    flt = MetadataFilter(prefix="docs/manuals", file_types=["pdf"], page_min=3)
+
+    q = vecs[1]
+    hits = store.query(q, top_k=5, filter=flt)
+    allowed = [i for i in alive if flt.matches(metas[i])]
+    unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    scores = unit[allowed] @ (q / np.linalg.norm(q))
+    expected = [str(allowed[j]) for j in np.argsort(-scores)[:5]]
+    assert [h["id"] for h in hits] == expected
+    assert all(flt.matches(h["metadata"]) for h in hits)
+
+
+def test_filtered_query_after_persist(tmp_path):
+    ids, vecs, metas = make_rows(n=200)
+    store = NumpyVectorStore()
+    store.upsert_many(ids, vecs, metas)
+    store.save(str(tmp_path))
+    loaded = NumpyVectorStore()
+    assert loaded.load(str(tmp_path)) is not None
+    flt = MetadataFilter(sources=["docs/notes/f1.pdf"])
+    hits = loaded.query(vecs[0], top_k=50, filter=flt)
+    assert hits and all(h["metadata"]["source"] == "docs/notes/f1.pdf" for h in hits)
+    assert loaded.query(vecs[0], top_k=5, filter=MetadataFilter(sources=["no"])) == []
+
+
+def _answer(messages, **kwargs):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]
+    )
+
+
+class FakeLLM:
+    def embed(self, texts, **kwargs):
+        return [[1.0, float(len(t) % 5)] for t in texts]
+
+    chat = staticmethod(_answer)
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid", "lexical"])
+def test_qa_request_filters(monkeypatch, mode):
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "LEXICAL_INDEX", True)
+    monkeypatch.setattr(qs.Config, "CONTENT_DIR", "content")
+    docs = [
+        {"path": "content/guides/setup.pdf", "text": "Install the widget firmware."},
+        {"path": "content/notes/setup.txt", "text": "Install the widget firmware now."},
+    ]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    store = VectorStore(provider="numpy")
+    monkeypatch.setattr(qs, "get_services", lambda: (store, FakeLLM()))
+
+    req = qs.QARequest(
+        question="install widget firmware",
+        top_k=5,
+        mode=mode,
+        filters=qs.QAFilters(prefix="notes"),
+    )
+    resp = qs.qa(req)
+    assert [s["source"] for s in resp["sources"]] == ["content/notes/setup.txt"]
+
+
+def test_request_paths_are_normalized(monkeypatch):
+    monkeypatch.setattr(qs.Config, "CONTENT_DIR", "content")
+    meta = {"source": "content/notes/setup.txt"}
+    for path in ("notes/setup.txt", "./notes/setup.txt", "notes/../notes/setup.txt"):
+        flt = qs._metadata_filter(qs.QAFilters(sources=[path]))
+        assert flt.matches(meta)
+    assert qs._metadata_filter(qs.QAFilters(prefix="./notes/")).matches(meta)
@@ -40,3 +40,83 @@ def test_docx_extraction_includes_header_footer_and_table(tmp_path):
     assert "FOOTER_TEXT_456" in text
     assert "Hello world paragraph" in text
     assert "r0c0" in text and "r1c1" in text
+
+
+def slow_handler(path):
+    import time
+
+    if "slow" in path:
+        time.sleep(10)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_load_folder_parallel_keeps_order_and_times_out(tmp_path):
+    for name in ("a.txt", "slow.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text(f"text of {name}")
+
+    serial = DocumentExtractor(enable_ocr=False).load_folder(str(tmp_path))
+
+    extractor = DocumentExtractor(enable_ocr=False, workers=2, timeout=1)
+    extractor.register_handler(".txt", slow_handler)
+    docs = extractor.load_folder(str(tmp_path))
+
+    # Same deterministic order as the serial walk
+    assert [d["path"] for d in docs] == [d["path"] for d in serial]
+    by_name = {d["path"].rsplit("/", 1)[-1]: d["text"] for d in docs}
+    assert by_name["a.txt"] == "text of a.txt"
+    assert by_name["c.txt"] == "text of c.txt"
+    assert by_name["slow.txt"] == ""
+    assert [p.rsplit("/", 1)[-1] for p, _ in extractor.failures] == ["slow.txt"]
+
+
+def test_timeouts_restart_workers_and_spare_queued_files(tmp_path):
+    names = ("0slow.txt", "1slow.txt", "a.txt", "b.txt", "c.txt", "d.txt")
+    for name in names:
+        (tmp_path / name).write_text(f"text of {name}")
+
+    extractor = DocumentExtractor(enable_ocr=False, workers=2, timeout=1)
+    extractor.register_handler(".txt", slow_handler)
+    texts = extractor.extract_many([str(tmp_path / n) for n in names])
+
+    # As many stuck files as workers: the files queued behind them still succeed
+    assert texts[:2] == ["", ""]
+    assert texts[2:] == [f"text of {n}" for n in names[2:]]
+    assert sorted(p.rsplit("/", 1)[-1] for p, _ in extractor.failures) == [
+        "0slow.txt",
+        "1slow.txt",
+    ]
+
+
+def test_parallel_extraction_reuses_its_pool_and_rebuilds_the_extractor(tmp_path):
+    paths = []
+    for name in ("a.txt", "b.txt", "c.md"):
+        (tmp_path / name).write_text(f"text of {name}")
+        paths.append(str(tmp_path / name))
+
+    extractor = DocumentExtractor(enable_ocr=False, workers=2)
+    extractor.register_handler(".txt", slow_handler)
+    try:
+        assert extractor.extract_many(paths) == [
+            "text of a.txt",
+            "text of b.txt",
+            "text of c.md",
+        ]
+        pool = extractor._pool.pool
+        assert extractor.extract_many(paths[:2]) == ["text of a.txt", "text of b.txt"]
+        assert extractor._pool.pool is pool
+    finally:
+        extractor.close()
+    assert extractor._pool is None
+
+
+def test_unpicklable_handler_extracts_in_process(tmp_path):
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / name).write_text(f"text of {name}")
+
+    extractor = DocumentExtractor(enable_ocr=False, workers=2)
+    extractor.register_handler(".txt", lambda path: path.rsplit("/", 1)[-1].upper())
+    docs = extractor.load_folder(str(tmp_path))
+
+    assert sorted(d["text"] for d in docs) == ["A.TXT", "B.TXT"]
+    assert extractor._pool is None and not extractor.failures
@@ -0,0 +1,79 @@
+import numpy as np
+
+from tinychatbot.ivf_store import IVFVectorStore
+from tinychatbot.numpy_store import NumpyVectorStore
+from tinychatbot.vector_store import VectorStore
+
+
+def make_clustered(n=2000, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    return centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def assert_lists_consistent(store):
+    assert sum(len(members) for members in store._lists) == len(store)
+    for lst, members in enumerate(store._lists):
+        for pos, slot in enumerate(members):
+            assert store._assign[slot] == lst
+            assert store._list_pos[slot] == pos
+
+
+def test_ivf_trains_and_matches_exact_search():
+    vecs = make_clustered()
+    ids = [str(i) for i in range(len(vecs))]
+    exact = NumpyVectorStore()
+    exact.upsert_many(ids, vecs)
+    store = IVFVectorStore(nprobe=8, min_train=500)
+    store.upsert_many(ids[:400], vecs[:400])
+    assert not store.trained
+    store.upsert_many(ids[400:], vecs[400:])
+    assert store.trained
+    assert_lists_consistent(store)
+
+    queries = vecs[:20] + 0.05
+    recall = np.mean(
+        [
+            len(
+                {h["id"] for h in store.query(q, 10)}
+                & {h["id"] for h in exact.query(q, 10)}
+            )
+            / 10
+            for q in queries
+        ]
+    )
+    assert recall >= 0.9
+    # Only the probed lists are scored
+    assert len(store._candidates(exact._normalize(queries[0]), 10, None)) < len(store)
+
+
+def test_ivf_insert_delete_and_persist(tmp_path):
+    vecs = make_clustered(n=800)
+    store = IVFVectorStore(nprobe=4, min_train=100)
+    store.upsert_many(
+        [str(i) for i in range(800)], vecs, [{"n": i} for i in range(800)]
+    )
+    for i in range(0, 800, 3):
+        assert store.delete(str(i))
+    store.upsert("1", vecs[0], {"n": "moved"})
+    store.upsert("new", vecs[5], {"n": "new"})
+    assert_lists_consistent(store)
+    assert store.query(vecs[0], 1)[0]["metadata"] == {"n": "moved"}
+
+    store.save(str(tmp_path))
+    loaded = IVFVectorStore(nprobe=4)
+    manifest = loaded.load(str(tmp_path))
+    assert manifest["provider"] == "ivf"
+    assert_lists_consistent(loaded)
+    assert [h["id"] for h in loaded.query(vecs[5], 3)] == [
+        h["id"] for h in store.query(vecs[5], 3)
+    ]
+    # A plain numpy store does not pick up an IVF index (and vice versa)
+    assert NumpyVectorStore().load(str(tmp_path)) is None
+
+
+def test_ivf_provider_is_selectable():
+    store = VectorStore(provider="ivf")
+    store.upsert("a", [1.0, 0.0], {"n": 1})
+    assert store.query([1.0, 0.1], top_k=1)[0]["id"] == "a"
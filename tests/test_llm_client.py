@@ -0,0 +1,154 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from tinychatbot import llm_client
+from tinychatbot.llm_client import LLMClient, plan_batches
+
+
+def rate_limit_error():
+    import httpx
+    import openai
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return openai.RateLimitError(
+        "rate limited", response=httpx.Response(429, request=request), body=None
+    )
+
+
+def make_client(fail_once=(), error=rate_limit_error):
+    """LLMClient wired to a fake OpenAI embeddings API that records each request."""
+    calls = []
+    failed = set()
+    lock = threading.Lock()
+
+    def create(input, model):
+        with lock:
+            calls.append(list(input))
+            if input[0] in fail_once and input[0] not in failed:
+                failed.add(input[0])
+                raise error()
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(t))]) for t in input]
+        )
+
+    client = LLMClient.__new__(LLMClient)
+    client.provider = "openai"
+    client.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    return client, calls
+
+
+def test_plan_batches_respects_count_and_token_budget():
+    texts = ["a" * 30] * 5 + ["b" * 300]
+    assert plan_batches(texts, max_items=2, max_tokens=1000) == [(0, 2), (2, 4), (4, 6)]
+    # 30 chars ~ 11 tokens each, so only two fit under a 25-token budget
+    assert plan_batches(texts, max_items=10, max_tokens=25)[0] == (0, 2)
+    # An oversized single text still gets its own batch
+    assert plan_batches(["x" * 900], max_items=10, max_tokens=10) == [(0, 1)]
+
+
+def test_embed_batches_concurrently_and_preserves_order(monkeypatch):
+    monkeypatch.setattr(llm_client.time, "sleep", lambda s: None)
+    client, calls = make_client(fail_once={"ccc"})
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    vectors = client.embed(texts, batch_size=2, concurrency=3, max_retries=1)
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    # three batches plus one retry of the batch that failed
+    assert len(calls) == 4
+    assert sorted(map(tuple, calls)).count(("ccc", "dddd")) == 2
+
+
+def test_embed_raises_after_retries_exhausted(monkeypatch):
+    monkeypatch.setattr(llm_client.time, "sleep", lambda s: None)
+    import openai
+
+    client, _ = make_client(fail_once={"a"})
+    with pytest.raises(openai.RateLimitError):
+        client.embed(["a", "b"], batch_size=1, concurrency=2, max_retries=0)
+
+
+def test_embed_does_not_retry_permanent_errors(monkeypatch):
+    monkeypatch.setattr(llm_client.time, "sleep", lambda s: None)
+    client, calls = make_client(fail_once={"a"}, error=lambda: ValueError("bad input"))
+    with pytest.raises(ValueError):
+        client.embed(["a"], max_retries=3)
+    assert len(calls) == 1
+
+
+def test_chat_stream_yields_content_deltas():
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return iter(
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=c))])
+            for c in ["Hi", None, " there"]
+        )
+
+    client = LLMClient.__new__(LLMClient)
+    client.provider = "openai"
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    assert list(client.chat_stream([{"role": "user", "content": "x"}])) == [
+        "Hi",
+        " there",
+    ]
+    assert requests[0]["stream"] is True
+    assert requests[0]["model"]
+
+
+def test_aembed_limits_concurrency_and_preserves_order():
+    import asyncio
+
+    in_flight, peak = 0, 0
+
+    async def create(input, model):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(t))]) for t in input]
+        )
+
+    client = LLMClient.__new__(LLMClient)
+    client.provider = "openai"
+    client._async_client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+
+    texts = ["a" * n for n in range(1, 11)]
+    vectors = asyncio.run(client.aembed(texts, batch_size=1, concurrency=3))
+
+    assert vectors == [[float(n)] for n in range(1, 11)]
+    assert peak == 3
+
+
+def test_embed_rejects_responses_with_the_wrong_number_of_vectors(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(llm_client.time, "sleep", lambda s: None)
+    calls = []
+
+    def create(input, model):
+        calls.append(input)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0])])
+
+    async def acreate(input, model):
+        return create(input, model)
+
+    client = LLMClient.__new__(LLMClient)
+    client.provider = "openai"
+    client.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    client._async_client = SimpleNamespace(embeddings=SimpleNamespace(create=acreate))
+
+    with pytest.raises(ValueError, match="1 vectors for 2 texts"):
+        client.embed(["a", "b"], batch_size=2, max_retries=3)
+    with pytest.raises(ValueError, match="1 vectors for 2 texts"):
+        asyncio.run(client.aembed(["a", "b"], batch_size=2, max_retries=3))
+    # Not a transient error: neither path retried it
+    assert len(calls) == 2
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import tinychatbot.qa_service as qs
+from tinychatbot.metadata_table import MetadataTable
+from tinychatbot.numpy_store import NumpyVectorStore
+from tinychatbot.vector_store import VectorStore
+
+
+def test_columns_extras_and_interning():
+    table = MetadataTable()
+    chunk = {"source": "a.pdf", "page": 2, "para": 1, "chunk_index": 0, "start": 5}
+    table.set(0, chunk)
+    table.set(1, {**chunk, "page": None, "sources": [{"source": "b.pdf"}]})
+    table.set(3000, {"n": "free-form", "flag": True})
+
+    assert table.get(0) == chunk
+    # None and non-column values round-trip through the per-row extras
+    assert table.get(1) == {**chunk, "page": None, "sources": [{"source": "b.pdf"}]}
+    assert table.get(3000) == {"n": "free-form", "flag": True}
+    assert table.get(2) is None
+    assert len(table) == 3
+    assert table._sources == ["a.pdf"]
+
+
+def test_move_remove_and_persist(tmp_path):
+    table = MetadataTable()
+    for row in range(5):
+        table.set(row, {"source": f"d{row % 2}.txt", "page": row, "extra": row})
+    table.remove(1)
+    table.move(4, 1)
+    assert 4 not in table
+    assert table.get(1) == {"source": "d0.txt", "page": 4, "extra": 4}
+
+    path = tmp_path / "meta.npz"
+    with open(path, "wb") as fh:
+        table.save(fh, ids=["x"])
+    loaded = MetadataTable()
+    assert loaded.load(str(path)) == {"ids": ["x"]}
+    assert dict(loaded.items()) == dict(table.items())
+    assert MetadataTable().load(str(tmp_path / "missing.npz")) is None
+
+
+def test_numpy_store_keeps_metadata_columnar(tmp_path):
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore()
+    metas = [{"source": "doc.pdf", "page": i, "start": 10 * i} for i in range(50)]
+    store.upsert_many([str(i) for i in range(50)], rng.normal(size=(50, 8)), metas)
+    store.delete("3")
+    assert not store._metadata._extra
+    store.save(str(tmp_path))
+
+    loaded = NumpyVectorStore()
+    assert loaded.load(str(tmp_path)) is not None
+    assert loaded.get_metadata("49") == metas[49]
+    assert loaded.get_metadata("3") is None
+
+
+def test_qa_slices_snippets_from_document_text(monkeypatch):
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    body = "Alpha paragraph about widgets.\n\n" + "Beta " * 100
+    docs = [{"path": "a.txt", "text": body}]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    prompts = []
+
+    class FakeLLM:
+        def embed(self, texts, **kwargs):
+            return [[1.0, float("Alpha" in t)] for t in texts]
+
+        def chat(self, messages, **kwargs):
+            prompts.append(messages[-1]["content"])
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]
+            )
+
+    store = VectorStore(provider="numpy")
+    monkeypatch.setattr(qs, "get_services", lambda: (store, FakeLLM()))
+
+    resp = qs.qa(qs.QARequest(question="Alpha widgets", top_k=2))
+    snippets = [s["snippet"] for s in resp["sources"]]
+    assert snippets[0] == "Alpha paragraph about widgets."
+    assert snippets[1] == body[32 : 32 + qs.SNIPPET_CHARS]
+    assert "Alpha paragraph about widgets." in prompts[0]
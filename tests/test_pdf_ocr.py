@@ -0,0 +1,49 @@
+import sys
+from types import SimpleNamespace
+
+from tinychatbot import io_utils
+from tinychatbot.io_utils import DocumentExtractor, _page_windows
+
+
+def test_page_windows_are_contiguous_and_bounded():
+    assert _page_windows([2, 3, 4, 5, 9, 10], 3) == [[2, 3, 4], [5], [9, 10]]
+    assert _page_windows([], 3) == []
+
+
+def test_pdf_ocr_only_pages_without_text_layer(monkeypatch):
+    monkeypatch.setattr(
+        io_utils, "_extract_pdf_pages", lambda path: ["p1 text", "", "", "p4 text", ""]
+    )
+    rendered = []
+
+    def convert_from_path(path, dpi, first_page, last_page, thread_count):
+        rendered.append((first_page, last_page))
+        return [f"img{n}" for n in range(first_page, last_page + 1)]
+
+    monkeypatch.setitem(
+        sys.modules, "pdf2image", SimpleNamespace(convert_from_path=convert_from_path)
+    )
+    monkeypatch.setitem(
+        sys.modules,
+        "pytesseract",
+        SimpleNamespace(image_to_string=lambda img: f"ocr {img}"),
+    )
+
+    extractor = DocumentExtractor(enable_ocr=True, ocr_workers=2, ocr_page_window=1)
+    text = extractor.extract("scan.pdf")
+
+    assert text.split("\f") == [
+        "p1 text",
+        "ocr img2",
+        "ocr img3",
+        "p4 text",
+        "ocr img5",
+    ]
+    # Only text-less pages are rasterized, one window (here: one page) at a time
+    assert rendered == [(2, 2), (3, 3), (5, 5)]
+
+
+def test_pdf_without_ocr_keeps_page_breaks(monkeypatch):
+    monkeypatch.setattr(io_utils, "_extract_pdf_pages", lambda path: ["a", "", "b"])
+    text = DocumentExtractor(enable_ocr=False).extract("doc.pdf")
+    assert text == "a\f\fb"
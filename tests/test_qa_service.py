@@ -56,3 +56,400 @@ def test_qa_logic_with_mocks(monkeypatch):
     assert resp["answer"] == "Mocked answer"
     # sources now contain metadata dicts; assert the path appears in one of them
     assert any(s.get("source") == "/tmp/doc.txt" for s in resp["sources"])
+
+    # The sources-only endpoint retrieves without a chat completion
+    fake_l.chat = None
+    resp = qs.qa_sources(req)
+    assert resp["sources"][0]["snippet"] == docs[0]["text"]
+
+
+def test_persisted_index_skips_reembedding(monkeypatch, tmp_path):
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [{"path": "/tmp/doc.txt", "text": "Persisted index content."}]
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", True)
+    monkeypatch.setattr(qs.Config, "INDEX_DIR", str(tmp_path))
+
+    class CountingLLM:
+        calls = 0
+
+        def embed(self, texts, **kwargs):
+            CountingLLM.calls += 1
+            return [[1.0, 0.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    qs._build_index_if_needed(docs, VectorStore(provider="numpy"), CountingLLM())
+    assert CountingLLM.calls == 1
+
+    # Simulate a process restart: module state is empty, the on-disk index is reused
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    fresh = VectorStore(provider="numpy")
+    qs._build_index_if_needed(docs, fresh, CountingLLM())
+    assert CountingLLM.calls == 1
+    assert len(fresh) == 1
+
+
+def test_index_saves_are_published_as_whole_versions(monkeypatch, tmp_path):
+    import os
+
+    from tinychatbot.persistence import CURRENT_NAME, current_version
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", True)
+    monkeypatch.setattr(qs.Config, "INDEX_DIR", str(tmp_path))
+
+    class FakeLLM:
+        def embed(self, texts, **kwargs):
+            return [[1.0, float(len(t))] for t in texts]
+
+    published = []
+    for n in range(3):
+        monkeypatch.setattr(qs, "_INDEX_READY", False)
+        docs = [{"path": "/tmp/doc.txt", "text": "x" * (n + 1)}]
+        qs._build_index_if_needed(docs, VectorStore(provider="numpy"), FakeLLM())
+        published.append(current_version(str(tmp_path)))
+
+    # Each save got its own directory; only the current and previous ones remain
+    assert len(set(published)) == 3
+    versions = sorted(e for e in os.listdir(tmp_path) if e.startswith("v-"))
+    assert [os.path.join(tmp_path, v) for v in versions] == published[1:]
+
+    # A save that fails part-way is discarded and the pointer does not move
+    store = VectorStore(provider="numpy")
+    store.upsert("a", [1.0, 0.0], {"source": "a"})
+
+    def broken_save(directory, **manifest):
+        open(os.path.join(directory, "embeddings.f32"), "wb").close()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "save", broken_save)
+    qs._persist_index(store, (), {})
+    assert current_version(str(tmp_path)) == published[-1]
+    assert len([e for e in os.listdir(tmp_path) if e.startswith("v-")]) == 2
+    with open(tmp_path / CURRENT_NAME) as f:
+        assert os.path.join(tmp_path, f.read()) == published[-1]
+
+
+def test_incremental_reindex_only_embeds_changed_documents(monkeypatch):
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    embedded = []
+
+    class RecordingLLM:
+        def embed(self, texts, **kwargs):
+            embedded.extend(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+    store = VectorStore(provider="numpy")
+    docs = [
+        {"path": "a.txt", "text": "alpha text"},
+        {"path": "b.txt", "text": "bravo text"},
+        {"path": "c.txt", "text": "charlie"},
+    ]
+    qs._build_index_if_needed(docs, store, RecordingLLM())
+    assert len(store) == 3
+
+    # Same-length edit of b, removal of c, addition of d
+    embedded.clear()
+    docs = [
+        {"path": "a.txt", "text": "alpha text"},
+        {"path": "b.txt", "text": "BRAVO text"},
+        {"path": "d.txt", "text": "delta"},
+    ]
+    qs._build_index_if_needed(docs, store, RecordingLLM())
+
+    assert embedded == ["BRAVO text", "delta"]
+    sources = {h["metadata"]["source"] for h in store.query([1.0, 1.0], top_k=10)}
+    assert sources == {"a.txt", "b.txt", "d.txt"}
+
+
+def test_streaming_index_build_embeds_in_bounded_batches(monkeypatch, tmp_path):
+    from tinychatbot.documents import iter_documents
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "INDEX_BATCH_SIZE", 2)
+    for i in range(5):
+        (tmp_path / f"doc{i}.txt").write_text(f"document number {i}")
+    (tmp_path / "empty.txt").write_text("   ")
+
+    events = []
+
+    def docs():
+        for doc in iter_documents(str(tmp_path)):
+            events.append("read")
+            yield doc
+
+    class RecordingLLM:
+        def embed(self, texts, **kwargs):
+            events.append(len(texts))
+            return [[1.0, float(i)] for i in range(len(texts))]
+
+    store = VectorStore(provider="numpy")
+    qs._build_index_if_needed(docs(), store, RecordingLLM())
+
+    assert len(store) == 5
+    assert max(e for e in events if e != "read") <= 2
+    # Embedding starts before the whole corpus has been read
+    assert events.index(2) < len(events) - 1 - events[::-1].index("read")
+
+
+def test_qa_stream_emits_tokens_then_sources(monkeypatch):
+    import json
+
+    from fastapi.testclient import TestClient
+
+    hits = [{"metadata": {"source": "/tmp/doc.txt", "page": 1}, "text": "Body"}]
+
+    async def aretrieve(*args, **kwargs):
+        return hits
+
+    monkeypatch.setattr(qs, "aretrieve", aretrieve)
+
+    class StreamingLLM:
+        async def achat_stream(self, messages, **kwargs):
+            assert "Body" in messages[-1]["content"]
+            for delta in ["Hello", " world\n"]:
+                yield delta
+
+    monkeypatch.setattr(qs, "get_services", lambda: (None, StreamingLLM()))
+
+    with TestClient(qs.app) as client:
+        resp = client.post("/qa/stream", json={"question": "hi"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: ")))
+        for lines in (block.split("\n") for block in resp.text.strip().split("\n\n"))
+    ]
+    assert events == [
+        ("token", "Hello"),
+        ("token", " world\n"),
+        ("sources", [{"source": "/tmp/doc.txt", "page": 1, "snippet": "Body"}]),
+    ]
+
+
+def test_async_qa_serves_concurrent_requests_on_one_loop(monkeypatch):
+    import asyncio
+    import time
+
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [{"path": "/tmp/doc.txt", "text": "Async content.\n\nMore content."}]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+
+    class AsyncLLM:
+        def embed(self, texts, **kwargs):
+            return [[1.0, float(len(t))] for t in texts]
+
+        async def aembed(self, texts, **kwargs):
+            await asyncio.sleep(0.05)
+            return [[1.0, float(len(t))] for t in texts]
+
+        async def achat(self, messages, **kwargs):
+            await asyncio.sleep(0.2)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="Async"))]
+            )
+
+        def chat(self, messages, **kwargs):
+            raise AssertionError("the async endpoint must not block on chat()")
+
+    services = (VectorStore("numpy"), AsyncLLM())
+    monkeypatch.setattr(qs, "get_services", lambda: services)
+    # Build the index once so the timed requests only wait on the (fake) network
+    qs._build_index_if_needed(docs, *services)
+
+    async def run():
+        req = qs.QARequest(question="content?", top_k=1)
+        return await asyncio.gather(*(qs.aqa(req) for _ in range(100)))
+
+    start = time.perf_counter()
+    responses = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert all(r["answer"] == "Async" for r in responses)
+    assert responses[0]["sources"][0]["source"] == "/tmp/doc.txt"
+    # 100 requests x 0.25s of network waits overlap instead of queueing
+    assert elapsed < 5
+
+
+def test_concurrent_callers_share_one_index_build(monkeypatch):
+    import threading
+    import time
+
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [{"path": "/tmp/doc.txt", "text": "Shared build content."}]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+
+    class SlowLLM:
+        calls = 0
+
+        def embed(self, texts, **kwargs):
+            SlowLLM.calls += 1
+            time.sleep(0.2)
+            return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(qs, "_VSTORE", VectorStore("numpy"))
+    monkeypatch.setattr(qs, "_LLM", SlowLLM())
+
+    # Cold start: nothing to serve yet, so every caller waits for the one build
+    threads = [
+        threading.Thread(target=qs._refresh_index, args=qs.get_services())
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert SlowLLM.calls == 1
+    assert len(qs._VSTORE) == 1
+
+
+def test_queries_use_the_old_index_while_an_update_runs(monkeypatch):
+    import threading
+
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [
+        {"path": "/tmp/a.txt", "text": "Alpha."},
+        {"path": "/tmp/b.txt", "text": "Beta."},
+    ]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: list(docs))
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+
+    embedding = threading.Event()
+    release = threading.Event()
+
+    class GatedLLM:
+        def embed(self, texts, **kwargs):
+            if any("revised" in t for t in texts):
+                embedding.set()
+                release.wait(5)
+            return [[1.0, float(len(t))] for t in texts]
+
+    live = VectorStore("numpy")
+    monkeypatch.setattr(qs, "_VSTORE", live)
+    monkeypatch.setattr(qs, "_LLM", GatedLLM())
+    qs._refresh_index(*qs.get_services())
+
+    # Change one document and remove the other; the update blocks while embedding
+    docs[:] = [{"path": "/tmp/a.txt", "text": "Alpha, revised."}]
+    worker = threading.Thread(target=qs._refresh_index, args=qs.get_services())
+    worker.start()
+    assert embedding.wait(5)
+
+    # Mid-update a question is answered from the complete old index at once
+    hits = qs.retrieve("anything", top_k=5)
+    assert {h["text"] for h in hits} == {"Alpha.", "Beta."}
+    assert len(live) == 2
+
+    release.set()
+    worker.join()
+    hits = qs.retrieve("anything", top_k=5)
+    assert [h["text"] for h in hits] == ["Alpha, revised."]
+    # The update was applied to the live store rather than to a copy
+    assert qs._VSTORE is live
+
+
+def test_question_is_embedded_before_taking_the_read_lock(monkeypatch):
+    import threading
+
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [{"path": "/tmp/a.txt", "text": "Alpha."}]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: list(docs))
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+
+    embedding = threading.Event()
+    release = threading.Event()
+
+    class SlowQuestionLLM:
+        def embed(self, texts, **kwargs):
+            if texts == ["question"]:
+                embedding.set()
+                release.wait(5)
+            return [[1.0, float(len(t))] for t in texts]
+
+    monkeypatch.setattr(qs, "_VSTORE", VectorStore("numpy"))
+    monkeypatch.setattr(qs, "_LLM", SlowQuestionLLM())
+    qs._refresh_index(*qs.get_services())
+
+    reader = threading.Thread(target=qs.retrieve, args=("question",))
+    reader.start()
+    assert embedding.wait(5)
+
+    # A publish is not held up by a question that is still being embedded
+    published = threading.Event()
+
+    def publish():
+        with qs._LIVE_LOCK.writing():
+            published.set()
+
+    writer = threading.Thread(target=publish)
+    writer.start()
+    writer.join(2)
+    release.set()
+    reader.join()
+    assert published.is_set()
+
+
+def test_stale_store_reference_updates_the_current_store(monkeypatch):
+    from tinychatbot.vector_store import VectorStore
+
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+
+    class FakeLLM:
+        def embed(self, texts, **kwargs):
+            return [[1.0, float(len(t))] for t in texts]
+
+    old = VectorStore("numpy")
+    monkeypatch.setattr(qs, "_VSTORE", old)
+    docs = [{"path": "/tmp/a.txt", "text": "Alpha."}]
+    qs._build_index_if_needed(docs, old, FakeLLM())
+    # A forced rebuild of the served index fills a new store and swaps it in
+    qs._build_index_if_needed(docs, old, FakeLLM(), force=True)
+    current = qs._VSTORE
+    assert current is not old and len(current) == 1
+
+    # A caller still holding the replaced store updates the current one
+    docs = docs + [{"path": "/tmp/c.txt", "text": "Gamma."}]
+    assert qs._build_index_if_needed(docs, old, FakeLLM()) is current
+    assert current.get_metadata("/tmp/c.txt::0") is not None
+    assert old.get_metadata("/tmp/c.txt::0") is None
+
+
+def test_index_warmup_builds_in_background_on_startup(monkeypatch):
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from tinychatbot.vector_store import VectorStore
+
+    docs = [{"path": "/tmp/doc.txt", "text": "Warm content."}]
+    monkeypatch.setattr(qs, "read_documents", lambda content_dir: docs)
+    monkeypatch.setattr(qs, "_INDEX_READY", False)
+    monkeypatch.setattr(qs.Config, "PERSIST_INDEX", False)
+    monkeypatch.setattr(qs.Config, "INDEX_WARMUP", True)
+    monkeypatch.setattr(qs, "_VSTORE", VectorStore("numpy"))
+    monkeypatch.setattr(
+        qs, "_LLM", SimpleNamespace(embed=lambda texts: [[1.0] for _ in texts])
+    )
+
+    with TestClient(qs.app):
+        deadline = time.monotonic() + 5
+        while not qs._INDEX_READY and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert qs._INDEX_READY
+    assert len(qs._VSTORE) == 1
@@ -0,0 +1,151 @@
+import numpy as np
+
+from tinychatbot.numpy_store import NumpyVectorStore
+from tinychatbot.vector_store import VectorStore
+
+
+def make_vectors(n=50, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_numpy_provider_matches_memory_ranking():
+    vecs = make_vectors()
+    mem = VectorStore(provider="memory")
+    fast = VectorStore(provider="numpy")
+    for i, v in enumerate(vecs):
+        mem.upsert(str(i), v.tolist(), {"n": i})
+        fast.upsert(str(i), v.tolist(), {"n": i})
+
+    q = vecs[3] + 0.1
+    expected = [h["id"] for h in mem.query(q.tolist(), top_k=5)]
+    hits = fast.query(q.tolist(), top_k=5)
+
+    assert [h["id"] for h in hits] == expected
+    assert hits[0]["metadata"] == {"n": int(expected[0])}
+    assert set(hits[0]) >= {"id", "embedding", "metadata"}
+
+
+def test_numpy_store_upsert_replaces_and_grows():
+    store = NumpyVectorStore(initial_capacity=2)
+    vecs = make_vectors(n=10, dim=4)
+    for i, v in enumerate(vecs):
+        store.upsert(str(i), v, {"n": i})
+    assert len(store) == 10
+
+    # Re-upserting an id replaces the vector and metadata in place
+    store.upsert("0", vecs[9], {"n": "replaced"})
+    assert len(store) == 10
+    hits = store.query(vecs[9], top_k=2)
+    assert {h["id"] for h in hits} == {"0", "9"}
+    assert any(h["metadata"] == {"n": "replaced"} for h in hits)
+
+    store.clear()
+    assert len(store) == 0
+    assert store.query(vecs[0]) == []
+
+
+def test_upsert_many_and_delete_keep_storage_compact():
+    vecs = make_vectors(n=6, dim=4)
+    for provider in ("memory", "numpy"):
+        store = VectorStore(provider=provider)
+        ids = [f"c{i}" for i in range(6)]
+        store.upsert_many(ids, [v.tolist() for v in vecs], [{"n": i} for i in range(6)])
+
+        assert store.delete("c1") is True
+        assert store.delete("c1") is False
+        # Upserting after a delete must not resurrect or duplicate entries
+        store.upsert("c5", vecs[0].tolist(), {"n": "moved"})
+
+        hits = store.query(vecs[0].tolist(), top_k=10)
+        assert sorted(h["id"] for h in hits) == ["c0", "c2", "c3", "c4", "c5"]
+        assert {h["id"]: h["metadata"] for h in hits}["c5"] == {"n": "moved"}
+
+
+def test_numpy_store_save_and_memmap_load(tmp_path):
+    vecs = make_vectors(n=5, dim=4)
+    store = NumpyVectorStore()
+    store.upsert_many([f"c{i}" for i in range(5)], vecs, [{"n": i} for i in range(5)])
+    store.save(str(tmp_path), fingerprint=[["a.txt", 3]])
+
+    loaded = NumpyVectorStore()
+    manifest = loaded.load(str(tmp_path))
+    assert manifest["count"] == 5
+    assert manifest["fingerprint"] == [["a.txt", 3]]
+    assert isinstance(loaded._matrix, np.memmap)
+    assert loaded.query(vecs[2], top_k=1)[0]["metadata"] == {"n": 2}
+
+    # Mutations after loading must not write through to the shared file
+    loaded.upsert("c2", vecs[0], {"n": "changed"})
+    loaded.upsert("c9", vecs[4])
+    fresh = NumpyVectorStore()
+    fresh.load(str(tmp_path))
+    assert len(fresh) == 5
+    assert fresh.query(vecs[2], top_k=1)[0]["metadata"] == {"n": 2}
+
+
+def test_load_returns_none_without_index(tmp_path):
+    store = NumpyVectorStore()
+    assert store.load(str(tmp_path)) is None
+
+
+def test_quantized_stores_keep_ranking_and_shrink_storage(tmp_path):
+    import pytest
+
+    vecs = make_vectors(n=300, dim=256, seed=1)
+    ids = [f"c{i}" for i in range(300)]
+    exact = NumpyVectorStore()
+    exact.upsert_many(ids, vecs)
+    queries = vecs[:10] + 0.05
+    expected = [[h["id"] for h in exact.query(q, top_k=5)] for q in queries]
+
+    sizes = {}
+    for quantization, rescore in [
+        ("float16", False),
+        ("int8", False),
+        ("int8", True),
+        ("binary", True),
+    ]:
+        store = NumpyVectorStore(quantization=quantization, rescore=rescore)
+        store.upsert_many(ids, vecs, [{"n": i} for i in range(300)])
+        got = [[h["id"] for h in store.query(q, top_k=5)] for q in queries]
+        assert [g[0] for g in got] == [e[0] for e in expected]
+        if rescore:
+            top = store.query(queries[0], top_k=1)[0]
+            assert top["score"] == pytest.approx(exact.query(queries[0], 1)[0]["score"])
+        sizes[quantization, rescore] = store.nbytes
+
+        store.save(str(tmp_path / f"{quantization}-{rescore}"))
+        loaded = NumpyVectorStore(quantization=quantization, rescore=rescore)
+        assert loaded.load(str(tmp_path / f"{quantization}-{rescore}"))
+        assert [h["id"] for h in loaded.query(queries[0], 5)] == got[0]
+        # An index saved with another encoding is not reused
+        assert (
+            NumpyVectorStore().load(str(tmp_path / f"{quantization}-{rescore}")) is None
+        )
+
+    assert sizes["float16", False] * 2 == exact.nbytes
+    assert sizes["int8", False] < exact.nbytes / 3
+
+
+def test_quantized_scores_are_computed_on_the_codes(monkeypatch):
+    from tinychatbot import numpy_store
+
+    vecs = make_vectors(n=200, dim=100, seed=2)
+    q = vecs[7] / np.linalg.norm(vecs[7])
+    for quantization, tolerance in [("float16", 1e-3), ("int8", 0.03)]:
+        store = NumpyVectorStore(quantization=quantization)
+        store.upsert_many([str(i) for i in range(200)], vecs)
+        decoded = store._decode(np.arange(200)) @ q
+        np.testing.assert_allclose(
+            store._approximate_scores(q), decoded, atol=tolerance
+        )
+
+    store = NumpyVectorStore(quantization="binary")
+    store.upsert_many([str(i) for i in range(200)], vecs)
+    scores = store._approximate_scores(q)
+    signs = np.where(vecs > 0, 1.0, -1.0) @ np.where(q > 0, 1.0, -1.0) / 100
+    np.testing.assert_allclose(scores, signs, atol=1e-6)
+    # Byte lookup table used when np.bitwise_count is unavailable (NumPy < 2.0)
+    monkeypatch.delattr(numpy_store.np, "bitwise_count", raising=False)
+    np.testing.assert_array_equal(store._approximate_scores(q), scores)